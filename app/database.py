@@ -1,12 +1,21 @@
 # Import =====================================
 
 import os
-from typing import Literal
+import csv
+import codecs
+import time
+from io import StringIO, TextIOBase
+from typing import Iterator, Literal
 import psycopg2
 import psycopg2.extras
+import psycopg2.errors
 from psycopg2 import sql  # Importing sql module for safe SQL composition
 import pandas as pd
 import github as git
+import github_graphql as gql
+import usercache as uc
+import dbpool
+import planner as pl
 from dotenv import load_dotenv
 
 # =========================================== app setup ===========================================
@@ -16,16 +25,28 @@ load_dotenv()
 POSTGRES_URL = os.getenv('POSTGRES_URL')
 TEST_GITHUB_PAT = os.getenv('TEST_GITHUB_PAT')
 SPARK_GITHUB_PAT = os.getenv('SPARK_GITHUB_PAT')
+POSTGRES_FETCH_SIZE = int(os.getenv('POSTGRES_FETCH_SIZE', 2000))
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 1000))
+POSTGRES_COPY_CHUNK_ROWS = int(os.getenv('POSTGRES_COPY_CHUNK_ROWS', 5000))
+POSTGRES_COPY_READ_SIZE = int(os.getenv('POSTGRES_COPY_READ_SIZE', 65536))
 
 # app
 github = git.Github(SPARK_GITHUB_PAT, 'BU-Spark')
+graphql = gql.GithubGraphQL(SPARK_GITHUB_PAT, 'BU-Spark')
 
 # const
 status = Literal['started', 'pull', 'push']
 
 # =========================================== database  ==========================================
 
-def connect(): return psycopg2.connect(POSTGRES_URL)
+# one pool per process, every function below checks its connection out of it and close() hands it back
+pool = dbpool.ConnectionPool(POSTGRES_URL)
+
+def connect(): return pool.getconn()
+
+# persist github user lookups across restarts / workers if asked to
+if os.getenv('GITHUB_USER_CACHE_PERSIST'): uc.default_user_cache.store = uc.PostgresUserStore(connect)
 
 def nuke():
     """Nukes the csv table."""
@@ -66,20 +87,150 @@ def dump(table_name):
         cursor.close()
         conn.close()
 
+def invalid_github_usernames(usernames) -> set[str]:
+    """
+    Checks a whole roster of GitHub usernames in a few batched GraphQL queries (see GithubGraphQL.check_users_exist)
+    and returns the ones that do not exist. The answers are cached, so later per-user checks don't call GitHub again.
+    If the batch lookup fails, nothing is flagged and the per-user checks decide as before.
+    """
+    
+    try:
+        exists = graphql.check_users_exist(usernames, github.users)
+    except Exception as e:
+        print(f"Bulk GitHub username validation failed: {e}")
+        return set()
+    return {username for username, found in exists.items() if not found}
+
 def ingest():
-    """Ingests data from the 'csv' table to the 'user', 'project', 'semester', and 'user_project' tables."""
+    """
+    Ingests data from the 'csv' table to the 'user', 'project', 'semester', and 'user_project' tables.
+
+    Works on the whole table at once: the rows are copied to a staging table, a few INSERT ... SELECT ... ON CONFLICT
+    statements create the missing users, projects and user_projects, and every row's outcome is written back to
+    csv.status in one UPDATE. As before, users are matched by email, projects by name, new projects are only created
+    in semesters that already exist. Rows with a GitHub username that doesn't exist are still ingested, their csv.status
+    says so instead of 'all systems operational', and process() skips inviting them.
+    Falls back to ingest_row_by_row() if the set-based statements fail.
+    """
     print("INGESTING")
     conn = connect()
     cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE ingest_stage ON COMMIT DROP AS "
+            "SELECT id AS csv_id, semester, project, full_name AS name, email, buid, github_username, project_github_url, "
+            "NULL::integer AS user_id, NULL::integer AS project_id, NULL::text AS error, NULL::text AS flag, NULL::text AS outcome FROM csv"
+        )
+        cursor.execute("ANALYZE ingest_stage")
+
+        # rows whose github username doesn't exist are ingested all the same, flagged in their status
+        cursor.execute("SELECT DISTINCT github_username FROM ingest_stage WHERE github_username IS NOT NULL")
+        invalid = invalid_github_usernames([row[0] for row in cursor.fetchall()])
+        cursor.execute(
+            "UPDATE ingest_stage SET flag = 'github user ' || github_username || ' does not exist' "
+            "WHERE github_username = ANY(%s)",
+            (list(invalid),)
+        )
+        cursor.execute(
+            "UPDATE ingest_stage SET error = CASE WHEN email IS NULL THEN 'missing email' ELSE 'missing buid' END "
+            "WHERE email IS NULL OR buid IS NULL"
+        )
+
+        # users are matched by email; a new user whose buid or github belongs to someone else is not created
+        cursor.execute(
+            'INSERT INTO "user" (buid, name, email, github) '
+            "SELECT DISTINCT ON (email) buid, name, email, github_username FROM ingest_stage "
+            "WHERE error IS NULL ORDER BY email, csv_id "
+            "ON CONFLICT DO NOTHING"
+        )
+        cursor.execute(
+            'UPDATE ingest_stage s SET user_id = u.user_id FROM "user" u WHERE u.email = s.email AND s.error IS NULL'
+        )
+        cursor.execute(
+            "UPDATE ingest_stage SET error = 'buid or github username of ' || email || ' belongs to another user' "
+            "WHERE error IS NULL AND user_id IS NULL"
+        )
+
+        # projects are matched by name, new ones take the semester and github url of their first row
+        cursor.execute(
+            "INSERT INTO project (project_name, semester_id, github_url) "
+            "SELECT DISTINCT ON (s.project) s.project, sem.semester_id, NULLIF(s.project_github_url, '') "
+            "FROM ingest_stage s JOIN semester sem ON sem.semester_name = s.semester "
+            "WHERE s.error IS NULL AND NOT EXISTS (SELECT 1 FROM project p WHERE p.project_name = s.project) "
+            "ORDER BY s.project, s.csv_id "
+            "ON CONFLICT (project_name) DO NOTHING"
+        )
+        cursor.execute(
+            "UPDATE ingest_stage s SET project_id = p.project_id FROM project p "
+            "WHERE p.project_name = s.project AND s.error IS NULL"
+        )
+        cursor.execute(
+            "UPDATE ingest_stage SET error = CASE WHEN project IS NULL THEN 'missing project' "
+            "ELSE format('Semester ''%s'' not found.', semester) END "
+            "WHERE error IS NULL AND project_id IS NULL"
+        )
+
+        # link users to projects; pairs that were already linked, or repeat within the csv, are left as they are
+        cursor.execute(
+            "WITH inserted AS ("
+            " INSERT INTO user_project (project_id, user_id, status)"
+            " SELECT project_id, user_id, 'started' FROM (SELECT DISTINCT project_id, user_id FROM ingest_stage WHERE error IS NULL) pairs"
+            " ON CONFLICT (project_id, user_id) DO NOTHING"
+            " RETURNING project_id, user_id"
+            "), firsts AS ("
+            " SELECT min(s.csv_id) AS csv_id FROM ingest_stage s JOIN inserted i USING (project_id, user_id)"
+            " WHERE s.error IS NULL GROUP BY s.project_id, s.user_id"
+            ") "
+            "UPDATE ingest_stage SET outcome = CASE WHEN csv_id IN (SELECT csv_id FROM firsts) "
+            "THEN 'all systems operational' ELSE 'already ingested' END "
+            "WHERE error IS NULL"
+        )
+
+        cursor.execute(
+            "UPDATE csv c SET status = COALESCE(s.error, s.flag, s.outcome) FROM ingest_stage s WHERE c.id = s.csv_id"
+        )
+        cursor.execute(
+            "SELECT count(*) FILTER (WHERE outcome = 'all systems operational'), "
+            "count(*) FILTER (WHERE outcome = 'already ingested'), count(*) FILTER (WHERE error IS NOT NULL), "
+            "count(*) FILTER (WHERE error IS NULL AND flag IS NOT NULL) "
+            "FROM ingest_stage"
+        )
+        ingested, existing, failed, flagged = cursor.fetchone()
+        conn.commit()
+        print(f"INGESTED {ingested} ROWS, {existing} ALREADY INGESTED, {failed} FAILED, {flagged} WITH AN INVALID GITHUB USERNAME")
+    except psycopg2.Error as e:
+        print(f"Set-based ingest failed, falling back to row by row: {e}")
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        return ingest_row_by_row()
+
+    cursor.close()
+    conn.close()
+
+def ingest_row_by_row():
+    """Ingests the 'csv' table one row, and one transaction, at a time. The fallback for ingest()."""
+    print("INGESTING ROW BY ROW")
+    conn = connect()
+    cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM csv")
     rows = cursor.fetchall()
     
+    # validate every github username up front, rows with one that doesn't exist are ingested but flagged in their status
+    invalid = invalid_github_usernames(row[12] for row in rows if row[12])
+    
     for row in rows:
         try:
             print("---")
             print("ROW:", row[:-1])
             csvid, semester, course, project, organization, team, role, fname, lname, name, email, buid, github_username, process_status, project_github_url = row
+            
+            status = 'all systems operational'
+            if github_username in invalid:
+                print("- INVALID GITHUB USERNAME", github_username)
+                status = f'github user {github_username} does not exist'
         
             # try to find the user in the user table, if not found, insert it
             user_id = None
@@ -143,7 +294,7 @@ def ingest():
             print("- UPDATING CSV WITH SUCCESS", csvid)
             cursor.execute(
                 "UPDATE csv SET status = %s WHERE id = %s",
-                ('all systems operational', csvid)
+                (status, csvid)
             )
 
             conn.commit()  # Commit the transaction
@@ -270,6 +421,12 @@ def process():
         conn.close()
         return ["No user_projects with 'started' status to process."]
     
+    invalid = flag_invalid_github_usernames(cursor)
+    conn.commit()
+    
+    # one collaborator / invitation snapshot per repository, shared by every user added to it
+    accesses: dict[str, git.RepoAccess] = {}
+    
     for user_project in user_projects:
         try:
             project_id = user_project[0]
@@ -289,9 +446,17 @@ def process():
             if not github_url:
                 result.append(f"SKIPPED ADDING {github_username} TO {project_name} - NO GITHUB URL")
                 continue
+            
+            if github_username in invalid:
+                result.append(f"FAILED ADDING {github_username} TO {project_name} - User {github_username} does not exist")
+                continue
+                
+            if github_url not in accesses:
+                accesses[github_url] = github.get_repo_access(github_url)
+            access = accesses[github_url]
                 
             # check if the user is already a collaborator, or has been invited to the project
-            if github.check_user_is_collaborator(github_url, github_username):
+            if access.is_collaborator(github_username):
                 result.append(f"SKIPPED ADDING {github_username} TO {project_name} - ALREADY COLLABORATOR")
                 cursor.execute(
                     "UPDATE user_project SET status = %s WHERE project_id = %s AND user_id = %s",
@@ -301,7 +466,7 @@ def process():
                 continue
                 
             # check if the user is already invited to the project
-            if github_username in github.get_users_invited_on_repo(github_url):
+            if access.is_invited(github_username):
                 result.append(f"SKIPPED ADDING {github_username} TO {project_name} - ALREADY INVITED")
                 cursor.execute(
                     "UPDATE user_project SET status = %s WHERE project_id = %s AND user_id = %s",
@@ -330,7 +495,42 @@ def process():
             conn.rollback()
             result.append(f"ERROR ADDING {github_username} TO {project_name} - {e}")
     
-    # persist the results in the database results table which looks like (id, result)
+    cursor.close()
+    conn.close()
+    
+    save_results(result)
+    return result
+
+def started_github_usernames(cursor) -> list[str]:
+    """Returns the GitHub usernames of every user with a 'started' user_project."""
+    
+    cursor.execute(
+        "SELECT DISTINCT u.github FROM user_project up JOIN \"user\" u ON u.user_id = up.user_id "
+        "WHERE up.status = 'started' AND u.github IS NOT NULL"
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def flag_invalid_github_usernames(cursor) -> set[str]:
+    """
+    Validates the GitHub usernames of every 'started' user_project in bulk and marks the csv rows of the ones that don't
+    exist, before any invitation is sent.
+    
+    Returns: set[str]: The usernames that do not exist.
+    """
+    
+    invalid = invalid_github_usernames(started_github_usernames(cursor))
+    for username in invalid:
+        cursor.execute(
+            "UPDATE csv SET status = %s WHERE github_username = %s",
+            (f'github user {username} does not exist', username)
+        )
+    return invalid
+
+def save_results(result: list[str]):
+    """Persists results in the database results table which looks like (id, result)."""
+    conn = connect()
+    cursor = conn.cursor()
+    
     try:
         print("persisting results")
         for res in result:
@@ -339,111 +539,263 @@ def process():
     except Exception as e:
         print(f"An error occurred: {e}")
         conn.rollback()
-            
+    
     cursor.close()
     conn.close()
+
+def plan_process() -> pl.BulkPlan:
+    """
+    Works out what process() would do without inviting anyone or changing any statuses.
     
-    return result
-        
-def information():
-    """Returns a list of dictionaries containing information about the users, projects, and semesters."""
+    Users that are already collaborators or invited only get a 'status' operation (database only); everyone else gets an
+    'add' (one invitation). Whether each GitHub user exists is checked now, so typos show up as errors in the plan and the
+    checks are cached for when it is executed.
+    """
     
-    result = []
+    plan = pl.BulkPlan('process')
+    before = github.transport.requests
     
     conn = connect()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM \"user\"")
-    users = cursor.fetchall()
+    # every started membership with its project and user in one query
+    cursor.execute(
+        "SELECT p.project_name, p.github_url, u.github, u.email FROM user_project up "
+        "JOIN project p ON p.project_id = up.project_id JOIN \"user\" u ON u.user_id = up.user_id "
+        "WHERE up.status = 'started' ORDER BY up.project_id, up.user_id"
+    )
+    user_projects = cursor.fetchall()
+    
+    # checked in bulk up front so the per-user checks below are answered from the user cache
+    invalid_github_usernames(started_github_usernames(cursor))
     
-    for user in users:
-        print("=====================================")
-        user_id = user[0]
-        print("- USER:", user)
+    for project_name, github_url, github_username, email in user_projects:
+        if not github_url:
+            plan.errors.append((project_name, f"SKIPPED ADDING {github_username or email} TO {project_name} - NO GITHUB URL"))
+            continue
+        if not github_username:
+            plan.errors.append((project_name, f"SKIPPED ADDING {email} TO {project_name} - NO GITHUB USERNAME"))
+            continue
         
-        cursor.execute("SELECT * FROM user_project WHERE user_id = %s", (user_id,))
-        user_projects = cursor.fetchall()
+        try:
+            if github_url not in plan.accesses:
+                plan.accesses[github_url] = github.get_repo_access(github_url)
+            access = plan.accesses[github_url]
+        except Exception as e:
+            plan.errors.append((project_name, f"ERROR ADDING {github_username} TO {project_name} - {e}"))
+            continue
         
-        for user_project in user_projects:
-            project_id = user_project[0]
-            status = user_project[2]
-            print("- USER_PROJECT:", user_project)
-            
-            cursor.execute("SELECT * FROM project WHERE project_id = %s", (project_id,))
-            project = cursor.fetchone()
-            print("- PROJECT:", project)
-            
-            project_name = project[1]
-            semester_id = project[2]
-            github_url = project[3]
-            
-            cursor.execute("SELECT * FROM semester WHERE semester_id = %s", (semester_id,))
-            semester = cursor.fetchone()
-            print("- SEMESTER:", semester)
-            
-            result.append({
-                "buid": user[3],
-                "name": user[1],
-                "email": user[2],
-                "github": user[4],
-                "project_name": project_name,
-                "github_url": github_url if github_url else "???",
-                "semester": semester[1],
-                "status": status
-            })
+        if access.is_collaborator(github_username):
+            plan.operations.append(pl.Operation('status', github_username, 'push', 'collaborator', github_url, project_name))
+        elif access.is_invited(github_username):
+            plan.operations.append(pl.Operation('status', github_username, 'push', 'invited', github_url, project_name))
+        elif not github.check_user_exists(github_username):
+            plan.errors.append((project_name, f"FAILED ADDING {github_username} TO {project_name} - User {github_username} does not exist"))
+        else:
+            plan.operations.append(pl.Operation('add', github_username, 'push', None, github_url, project_name))
     
+    conn.commit()
     cursor.close()
     conn.close()
-    return result    
-    
-def projects():
-    """Returns a list of dictionaries containing the data from the 'project' table."""
-    conn = connect()
-    cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM project")
-    rows = cursor.fetchall()
+    plan.planning_calls = github.transport.requests - before
+    return plan
 
-    result = []
-    for row in rows:
+def execute_process_plan(plan: pl.BulkPlan) -> list[str]:
+    """Applies exactly the operations of a plan from plan_process, reporting and persisting results the way process() does."""
+    
+    result = [error for where, error in plan.errors]
+    
+    for operation in plan.operations:
+        user, project_name = operation.user, operation.project
+        if operation.action == 'status':
+            result.append(f"SKIPPED ADDING {user} TO {project_name} - ALREADY {operation.current.upper()}")
+        else:
+            status_code, msg = github.add_user_to_repo(operation.repo, user, operation.permission)
+            if status_code != 201:
+                result.append(f"FAILED ADDING {user} TO {project_name} - {status_code} {msg}")
+                continue
+            result.append(f"ADDED {user} TO {project_name} - {status_code} {msg}")
         
-        # get the semester name from the semester id 
-        cursor.execute("SELECT * FROM semester WHERE semester_id = %s", (row[2],))
-        semester = cursor.fetchone()
+        db_status, db_msg = change_users_project_status(project_name, user, 'push')
+        if db_status != 200: result.append(f"ERROR ADDING {user} TO {project_name} - {db_msg}")
+    
+    save_results(result)
+    return result
         
-        result.append({
-            "id": row[0],
-            "name": row[1],
-            "semester": semester[1],
-            "github_url": row[3]
-        })
+def keyset(keys: list[str], filters: list[tuple[str, object]], after: tuple = None, limit: int = None) -> tuple[str, list]:
+    """
+    Builds the WHERE / ORDER BY / LIMIT tail of a keyset-paginated query, so a page costs the same however deep it is.
+    
+    Args:
+        keys (list[str]): The columns the rows are ordered (and paged) by, unique together.
+        filters (list[tuple[str, object]]): (condition with one %s, value) pairs, skipped when the value is None.
+        after (tuple): The keys of the last row of the previous page, None for the first page.
+        limit (int): The page size, None for every remaining row.
+    Returns: tuple[str, list]: The query tail and its parameters.
+    """
     
+    clauses = [condition for condition, value in filters if value is not None]
+    params = [value for condition, value in filters if value is not None]
+    if after is not None:
+        clauses.append(f"({', '.join(keys)}) > ({', '.join(['%s'] * len(keys))})")
+        params.extend(after)
+    tail = (" WHERE " + " AND ".join(clauses) if clauses else "") + f" ORDER BY {', '.join(keys)}"
+    if limit is not None:
+        tail += " LIMIT %s"
+        params.append(limit)
+    return tail, params
+
+INFORMATION_QUERY = (
+    "SELECT u.user_id, up.project_id, u.buid, u.name, u.email, u.github, p.project_name, p.github_url, s.semester_name, up.status "
+    "FROM \"user\" u "
+    "JOIN user_project up ON up.user_id = u.user_id "
+    "JOIN project p ON p.project_id = up.project_id "
+    "LEFT JOIN semester s ON s.semester_id = p.semester_id"
+)
+
+def information_query(after: str = None, limit: int = None, semester: str = None, project: str = None,
+                      status: str = None) -> tuple[str, list]:
+    # an information row is keyed by its membership, the page cursor is "<user_id>:<project_id>"
+    tail, params = keyset(
+        ["u.user_id", "up.project_id"],
+        [("s.semester_name = %s", semester), ("p.project_name = %s", project), ("up.status::text = %s", status)],
+        tuple(int(key) for key in after.split(':')) if after else None,
+        limit,
+    )
+    return INFORMATION_QUERY + tail, params
+
+def information_row(row) -> dict:
+    user_id, project_id, buid, name, email, github_username, project_name, github_url, semester, project_status = row
+    return {
+        "buid": buid,
+        "name": name,
+        "email": email,
+        "github": github_username,
+        "project_name": project_name,
+        "github_url": github_url if github_url else "???",
+        "semester": semester,
+        "status": project_status
+    }
+
+def iter_information(semester: str = None, project: str = None, status: str = None,
+                     batch_size: int = POSTGRES_FETCH_SIZE) -> Iterator[dict]:
+    """
+    Streams the user / project / semester rows behind information() from a single JOIN, read through a server-side
+    cursor `batch_size` rows at a time, so memory stays flat however many semesters the tables hold.
+    
+    The query runs when this is called (so errors surface here); the connection is returned to the pool once the
+    iterator is exhausted or closed.
+    """
+    
+    query, params = information_query(semester=semester, project=project, status=status)
+    conn = connect()
+    cursor = conn.cursor(name='information')
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        cursor.close()
+        conn.close()
+        raise
+    
+    def rows():
+        try:
+            for row in cursor: yield information_row(row)
+        finally:
+            cursor.close()
+            conn.close()
+    
+    return rows()
+
+def information_page(after: str = None, limit: int = PAGE_SIZE, semester: str = None, project: str = None,
+                     status: str = None) -> tuple[list[dict], str]:
+    """
+    Returns one page of information(), optionally filtered by semester, project and status.
+    
+    Args:
+        after (str): The cursor returned with the previous page, None for the first page.
+        limit (int): The page size.
+    Returns: tuple[list[dict], str]: The rows, and the cursor of the next page (None after the last page).
+    """
+    
+    query, params = information_query(after, limit, semester, project, status)
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
     cursor.close()
     conn.close()
-    return result
+    
+    after = f"{rows[-1][0]}:{rows[-1][1]}" if limit and len(rows) == limit else None
+    return [information_row(row) for row in rows], after
+
+def information():
+    """Returns a list of dictionaries containing information about the users, projects, and semesters."""
+    return list(iter_information())
 
-def results():
-    """Returns a list of dictionaries containing the data from the 'results' table."""
+def projects():
+    """Returns a list of dictionaries containing the data from the 'project' table."""
     conn = connect()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM results")
-    rows = cursor.fetchall()
-    
-    result = [{ "id": row[0], "result": row[1] } for row in rows]
+    # the semester name comes from the same query instead of one lookup per project
+    cursor.execute(
+        "SELECT p.project_id, p.project_name, s.semester_name, p.github_url "
+        "FROM project p LEFT JOIN semester s ON s.semester_id = p.semester_id ORDER BY p.project_id"
+    )
+    result = [{ "id": row[0], "name": row[1], "semester": row[2], "github_url": row[3] } for row in cursor.fetchall()]
     
     cursor.close()
     conn.close()
-    
     return result
 
-def gcsv():
-    """Returns a list of dictionaries containing the data from the 'csv' table."""
+def fetch_page(query: str, filters: list[tuple[str, object]], after: int = None, limit: int = None) -> list[tuple]:
+    """Runs a single-table query keyset-paginated on its id column (see keyset)."""
+    
+    tail, params = keyset(["id"], filters, (after,) if after is not None else None, limit)
     conn = connect()
     cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM csv")
+    cursor.execute(query + tail, params)
     rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+def results(after: int = None, limit: int = None, project: str = None, status: str = None):
+    """
+    Returns a list of dictionaries containing the data from the 'results' table, in id order.
+    
+    Args:
+        after (int): Only results with a greater id (the last id of the previous page).
+        limit (int): The page size, None for all of them.
+        project (str): Only results that mention this project.
+        status (str): Only results starting with this, e.g. "PROCESSED" or "FAILED".
+    """
+    
+    rows = fetch_page(
+        "SELECT id, result FROM results",
+        [("strpos(result, %s) > 0", project), ("result LIKE %s || '%%'", status)],
+        after, limit,
+    )
+    return [{ "id": row[0], "result": row[1] } for row in rows]
+
+def gcsv(after: int = None, limit: int = None, semester: str = None, project: str = None, status: str = None):
+    """
+    Returns a list of dictionaries containing the data from the 'csv' table, in id order.
+    
+    Args:
+        after (int): Only rows with a greater id (the last id of the previous page).
+        limit (int): The page size, None for all of them.
+        semester, project, status (str): Only rows with exactly this semester / project / status.
+    """
+    
+    rows = fetch_page(
+        "SELECT id, semester, course, project, organization, team, role, first_name, last_name, full_name, email, buid, "
+        "github_username, status, project_github_url FROM csv",
+        [("semester = %s", semester), ("project = %s", project), ("status = %s", status)],
+        after, limit,
+    )
     
     result = []
     for row in rows:
@@ -464,131 +816,247 @@ def gcsv():
             "status": row[13],
             "project_github_url": row[14]
         })
-    
-    cursor.close()
-    conn.close()
-    
     return result
 
-def gcsvprojects():
-    """Returns a list of dictionaries containing the data from the 'csv_projects' table."""
-    conn = connect()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM csv_projects")
-    rows = cursor.fetchall()
+def gcsvprojects(after: int = None, limit: int = None, semester: str = None, project: str = None, status: str = None):
+    """Returns a list of dictionaries containing the data from the 'csv_projects' table, paged and filtered like gcsv()."""
     
-    result = [{ "id": row[0], "semester": row[1], "project": row[2], "project_github_url": row[3], "status": row[4] } for row in rows]
+    rows = fetch_page(
+        "SELECT id, semester, project, project_github_url, status FROM csv_projects",
+        [("semester = %s", semester), ("project = %s", project), ("status = %s", status)],
+        after, limit,
+    )
+    return [{ "id": row[0], "semester": row[1], "project": row[2], "project_github_url": row[3], "status": row[4] } for row in rows]
+
+# COPY isn't allowed through some proxies / for some roles, those uploads fall back to batched INSERTs
+COPY_UNAVAILABLE = (psycopg2.NotSupportedError, psycopg2.errors.InsufficientPrivilege)
+
+class DataFrameCSV:
+    """
+    A read-only text file over a DataFrame, rendered as CSV `chunk_rows` rows at a time as COPY reads it, so neither
+    per-row tuples nor the whole CSV text are ever built.
+    """
     
-    cursor.close()
-    conn.close()
+    def __init__(self, dataframe, chunk_rows: int = POSTGRES_COPY_CHUNK_ROWS):
+        self.dataframe = dataframe
+        self.chunk_rows = chunk_rows
+        self.position = 0
+        self.current = StringIO()
     
-    return result
+    def read(self, size: int = -1) -> str:
+        while True:
+            data = self.current.read(size)
+            if data or self.position >= len(self.dataframe): return data
+            chunk = self.dataframe.iloc[self.position:self.position + self.chunk_rows]
+            self.current = StringIO(chunk.to_csv(index=False, header=False))
+            self.position += self.chunk_rows
 
-def upload(dataframe, table_name, colmap):
-    """Inserts data from a pandas DataFrame to a specified PostgreSQL table."""
-    conn = connect()
-    cursor = conn.cursor()
+def copy_rows(cursor, file, table_name: str, columns: list[str]) -> int:
+    """
+    Streams CSV rows (no header) from a file-like object into a table with COPY FROM STDIN.
     
-    dataframe.rename(columns=colmap, inplace=True)
+    Args:
+        cursor: The cursor to copy with; the caller commits.
+        file: Anything with read(size) returning CSV text.
+        table_name (str): The table to load.
+        columns (list[str]): The table columns, in the order of the CSV fields.
+    Returns: int: The number of rows copied.
+    """
+    
+    copy_query = sql.SQL("COPY {table} ({fields}) FROM STDIN WITH (FORMAT csv)").format(
+        table=sql.Identifier(table_name),
+        fields=sql.SQL(', ').join(map(sql.Identifier, columns)),
+    )
+    cursor.copy_expert(copy_query, file, size=POSTGRES_COPY_READ_SIZE)
+    return cursor.rowcount
+
+def insert_rows(cursor, dataframe, table_name: str, columns: list[str]) -> int:
+    """Inserts the rows of a DataFrame with batched INSERT statements, the fallback for copy_rows()."""
     
     # Convert NaNs to None
     dataframe = dataframe.where(pd.notna(dataframe), None)
     
     # Constructing the SQL INSERT statement dynamically based on DataFrame columns
-    columns = list(dataframe.columns)
     placeholders = [sql.Placeholder()] * len(columns)
     insert_query = sql.SQL("INSERT INTO {table} ({fields}) VALUES ({values})").format(
         table=sql.Identifier(table_name),
         fields=sql.SQL(', ').join(map(sql.Identifier, columns)),
         values=sql.SQL(', ').join(placeholders)
     )
+    
+    psycopg2.extras.execute_batch(cursor, insert_query, [tuple(x) for x in dataframe.to_numpy()], page_size=1000)
+    return len(dataframe)
 
-    print(insert_query)
-
-    # Preparing data tuples from the dataframe
-    records_list = [tuple(x) for x in dataframe.to_numpy()]
+def upload_report(table_name: str, rows: int, start: float, method: str, error: str = None) -> dict:
+    seconds = time.time() - start
+    report = {
+        "table": table_name,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds > 0 else None,
+        "method": method,
+    }
+    if error: report["error"] = error
+    print(f"UPLOADED {rows} ROWS TO {table_name} IN {report['seconds']}s ({report['rows_per_second']} ROWS/S, {method.upper()})")
+    return report
 
+def upload(dataframe, table_name, colmap):
+    """
+    Loads a pandas DataFrame into a specified PostgreSQL table with COPY, falling back to batched INSERTs only where
+    COPY is unavailable.
+    
+    Returns: dict: The table, rows loaded, seconds, rows per second and method ('copy' or 'insert'), plus the error if
+        the load failed (and was rolled back).
+    """
+    
+    start = time.time()
+    dataframe.rename(columns=colmap, inplace=True)
+    columns = list(dataframe.columns)
+    method, rows = 'copy', 0
+    
+    conn = connect()
+    cursor = conn.cursor()
     try:
-        # Execute the SQL statement
-        psycopg2.extras.execute_batch(cursor, insert_query, records_list)
+        try:
+            copy_rows(cursor, DataFrameCSV(dataframe), table_name, columns)
+        except COPY_UNAVAILABLE as e:
+            print(f"COPY unavailable, falling back to batched INSERT: {e}")
+            conn.rollback()
+            method = 'insert'
+            insert_rows(cursor, dataframe, table_name, columns)
         conn.commit()
+        rows = len(dataframe)
     except psycopg2.DatabaseError as e:
         print(f"An error occurred: {e}")
         conn.rollback()
+        return upload_report(table_name, 0, start, method, str(e))
     finally:
         cursor.close()
         conn.close()
     
-def ucsv(dataframe):
-    """Inserts data from a pandas DataFrame to the 'csv' PostgreSQL table."""
+    return upload_report(table_name, rows, start, method)
     
-    colmap = {
-        'Semester': 'semester',
-        'Course': 'course',
-        'Project': 'project',
-        'Organization': 'organization',
-        'Team': 'team',
-        'Role': 'role',
-        'First Name': 'first_name',
-        'Last Name': 'last_name',
-        'Full Name': 'full_name',
-        'Email': 'email',
-        'BUID': 'buid',
-        'Github Username': 'github_username',
-        'Project Github Url': 'project_github_url',
-    }
+def upload_csv(file, table_name: str, colmap: dict) -> dict:
+    """
+    Streams a CSV file (header row first) into a table without loading it: the header is mapped to table columns with
+    `colmap` and the rest of the file is COPYed POSTGRES_COPY_READ_SIZE characters at a time, so memory use stays the
+    same however big the file is. Where COPY is unavailable, the file is re-read with pandas POSTGRES_COPY_CHUNK_ROWS
+    rows at a time and INSERTed chunk by chunk instead.
     
-    upload(dataframe, 'csv', colmap)
+    Args:
+        file: A binary or text file object, seekable for the INSERT fallback.
+        table_name (str): The table to load.
+        colmap (dict): CSV header -> table column, other headers are used as they are (like upload()).
+    Returns: dict: The same report as upload().
+    """
     
-def uprojects(dataframe):
-    """Inserts data from a pandas DataFrame to the 'csv_projects' PostgreSQL table."""
+    start = time.time()
+    if not isinstance(file, TextIOBase): file = codecs.getreader('utf-8-sig')(file)
+    columns = [colmap.get(name, name) for name in next(csv.reader([file.readline()]), [])]
+    method, rows = 'copy', 0
     
-    colmap = {
-        'Semester': 'semester',
-        'Project': 'project',
-        'Project Github Url': 'project_github_url',
-    }
-
-    upload(dataframe, 'csv_projects', colmap)
-
-def get_users_in_project(project_name):
-    """Returns a list of dictionaries containing the users from a specified project."""
     conn = connect()
     cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM project WHERE project_name = %s", (project_name,))
-    project = cursor.fetchone()
-    
-    if not project:
+    try:
+        try:
+            rows = copy_rows(cursor, file, table_name, columns)
+        except COPY_UNAVAILABLE as e:
+            print(f"COPY unavailable, falling back to batched INSERT: {e}")
+            conn.rollback()
+            method, rows = 'insert', 0
+            file.seek(0)
+            for chunk in pd.read_csv(file, chunksize=POSTGRES_COPY_CHUNK_ROWS):
+                chunk.rename(columns=colmap, inplace=True)
+                rows += insert_rows(cursor, chunk, table_name, list(chunk.columns))
+        conn.commit()
+    except psycopg2.DatabaseError as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+        return upload_report(table_name, 0, start, method, str(e))
+    finally:
         cursor.close()
         conn.close()
-        return []
     
-    project_id = project[0]
+    return upload_report(table_name, rows, start, method)
+
+CSV_COLUMNS = {
+    'Semester': 'semester',
+    'Course': 'course',
+    'Project': 'project',
+    'Organization': 'organization',
+    'Team': 'team',
+    'Role': 'role',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Full Name': 'full_name',
+    'Email': 'email',
+    'BUID': 'buid',
+    'Github Username': 'github_username',
+    'Project Github Url': 'project_github_url',
+}
+
+CSV_PROJECTS_COLUMNS = {
+    'Semester': 'semester',
+    'Project': 'project',
+    'Project Github Url': 'project_github_url',
+}
+
+def ucsv(dataframe):
+    """Inserts data from a pandas DataFrame to the 'csv' PostgreSQL table."""
+    return upload(dataframe, 'csv', CSV_COLUMNS)
     
-    cursor.execute("SELECT * FROM user_project WHERE project_id = %s", (project_id,))
-    user_projects = cursor.fetchall()
+def uprojects(dataframe):
+    """Inserts data from a pandas DataFrame to the 'csv_projects' PostgreSQL table."""
+    return upload(dataframe, 'csv_projects', CSV_PROJECTS_COLUMNS)
+
+def ucsv_file(file):
+    """Streams a CSV file to the 'csv' PostgreSQL table."""
+    return upload_csv(file, 'csv', CSV_COLUMNS)
+
+def uprojects_file(file):
+    """Streams a CSV file to the 'csv_projects' PostgreSQL table."""
+    return upload_csv(file, 'csv_projects', CSV_PROJECTS_COLUMNS)
+
+def get_users_in_projects(project_names: list[str]) -> dict[str, list[dict]]:
+    """
+    Returns the users of every project in a list, in one query.
     
-    result = []
-    for user_project in user_projects:
-        user_id = user_project[1]
-        
-        cursor.execute("SELECT * FROM \"user\" WHERE user_id = %s", (user_id,))
-        user = cursor.fetchone()
-        
-        result.append({
-            "buid": user[1],
-            "name": user[2],
-            "email": user[3],
-            "github": user[4],
-            "status": user_project[2]
+    Args: project_names (list[str]): The project names.
+    Returns: dict[str, list[dict]]: The users of each project (buid, name, email, github, status), an empty list for
+        projects that don't exist.
+    """
+    
+    result = {project_name: [] for project_name in project_names}
+    if not result: return result
+    
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT p.project_name, u.buid, u.name, u.email, u.github, up.status "
+        "FROM project p "
+        "JOIN user_project up ON up.project_id = p.project_id "
+        "JOIN \"user\" u ON u.user_id = up.user_id "
+        "WHERE p.project_name = ANY(%s) ORDER BY p.project_name, u.user_id",
+        (list(result),)
+    )
+    for project_name, buid, name, email, github_username, project_status in cursor.fetchall():
+        result[project_name].append({
+            "buid": buid,
+            "name": name,
+            "email": email,
+            "github": github_username,
+            "status": project_status
         })
     
     cursor.close()
     conn.close()
     return result
 
+def get_users_in_project(project_name):
+    """Returns a list of dictionaries containing the users from a specified project."""
+    return get_users_in_projects([project_name])[project_name]
+
 def change_users_project_status(project_name: str, user_github: str, status: status) -> tuple[int, str]:
     """Changes the status of a user in a project."""
 
@@ -606,7 +1074,7 @@ def change_users_project_status(project_name: str, user_github: str, status: sta
 
         project_id = project_row[0]
 
-        cursor.execute("SELECT * FROM \"user\" WHERE github = %s", (user_github,))
+        cursor.execute("SELECT user_id FROM \"user\" WHERE github = %s", (user_github,))
         user_row = cursor.fetchone()
 
         if not user_row:
@@ -632,6 +1100,106 @@ def change_users_project_status(project_name: str, user_github: str, status: sta
         conn.close()
         return 500, str(e)
 
+# =========================================== jobs ================================================
+
+def create_job(job_id: str, kind: str, workers: int):
+    """Records a new job in the 'queued' state."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "INSERT INTO job (job_id, kind, status, workers) VALUES (%s, %s, 'queued', %s)",
+        (job_id, kind, workers)
+    )
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+
+def set_job_status(job_id: str, status: str, error: str = None):
+    """Moves a job to a new status ('running', 'done', 'failed')."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute("UPDATE job SET status = %s, error = %s, updated_at = now() WHERE job_id = %s", (status, error, job_id))
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+
+def checkpoint_job(job_id: str, item: str, result):
+    """Marks one item (e.g. a repository) of a job as finished, storing its result."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "INSERT INTO job_checkpoint (job_id, item, result) VALUES (%s, %s, %s) "
+        "ON CONFLICT (job_id, item) DO UPDATE SET result = EXCLUDED.result, done_at = now()",
+        (job_id, item, psycopg2.extras.Json(result))
+    )
+    cursor.execute("UPDATE job SET updated_at = now() WHERE job_id = %s", (job_id,))
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+
+def job_checkpoints(job_id: str) -> set[str]:
+    """Returns the items of a job that are already finished."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT item FROM job_checkpoint WHERE job_id = %s", (job_id,))
+    items = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+    return items
+
+def get_job(job_id: str):
+    """Returns a job with the results of its finished items, or None if there is no such job."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT job_id, kind, status, workers, error, created_at, updated_at FROM job WHERE job_id = %s", (job_id,))
+    row = cursor.fetchone()
+    if not row:
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return None
+    
+    cursor.execute("SELECT item, result FROM job_checkpoint WHERE job_id = %s ORDER BY done_at", (job_id,))
+    checkpoints = cursor.fetchall()
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+    return {
+        "job_id": row[0],
+        "kind": row[1],
+        "status": row[2],
+        "workers": row[3],
+        "error": row[4],
+        "created_at": row[5].isoformat(),
+        "updated_at": row[6].isoformat(),
+        "done": len(checkpoints),
+        "results": {item: result for item, result in checkpoints},
+    }
+
+def unfinished_jobs(kind: str) -> list[tuple[str, int]]:
+    """Returns (job_id, workers) for every job of a kind that was queued or running when the app last stopped."""
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT job_id, workers FROM job WHERE kind = %s AND status IN ('queued', 'running') ORDER BY created_at", (kind,))
+    rows = cursor.fetchall()
+    conn.commit()
+    
+    cursor.close()
+    conn.close()
+    return rows
+
 # ========================================
 
 if __name__ == "__main__":
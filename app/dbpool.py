@@ -0,0 +1,207 @@
+# =========================================== imports =============================================
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+POSTGRES_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', 1))
+POSTGRES_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', 10))
+POSTGRES_POOL_TIMEOUT = float(os.getenv('POSTGRES_POOL_TIMEOUT', 30))
+POSTGRES_POOL_CHECK_IDLE = float(os.getenv('POSTGRES_POOL_CHECK_IDLE', 30))
+
+# =========================================== pool ================================================
+
+class PooledConnection:
+    """
+    A connection checked out of a ConnectionPool. Behaves like the psycopg2 connection it wraps, except that close()
+    hands it back to the pool (rolling back anything left uncommitted) instead of closing it.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name): return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc): return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn, self._conn = self.__dict__.get('_conn'), None
+        if conn is not None: self._pool.release(conn)
+
+    def __del__(self):
+        # a function that raised before closing its connection still gives it back once the connection is dropped
+        if self.__dict__.get('_conn') is not None:
+            print("Database connection was not closed, returning it to the pool")
+            self.close()
+
+class ConnectionPool:
+    """
+    A process-wide pool of Postgres connections, so each database call reuses an open connection instead of paying
+    a fresh TCP + auth handshake.
+
+    Holds at most `max_size` connections, opening `min_size` of them on first use. Checking out a connection when all
+    of them are busy waits up to `timeout` seconds for one to be returned. Connections that have been idle longer than
+    `check_idle` seconds are pinged before being handed out, and replaced if they are broken.
+    """
+
+    def __init__(self, dsn: Optional[str], min_size: int = POSTGRES_POOL_MIN, max_size: int = POSTGRES_POOL_MAX,
+                 timeout: float = POSTGRES_POOL_TIMEOUT, check_idle: float = POSTGRES_POOL_CHECK_IDLE):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.idle: list[tuple[object, float]] = []
+        self.size = 0
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.warmed = False
+
+    def open(self):
+        conn = psycopg2.connect(self.dsn)
+        with self.condition: self.created += 1
+        return conn
+
+    def healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed: return False
+        if time.time() - idle_since < self.check_idle: return True
+        try:
+            with conn.cursor() as cursor: cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def discard(self, conn):
+        try: conn.close()
+        except Exception: pass
+        with self.condition:
+            self.size -= 1
+            self.discarded += 1
+            self.condition.notify()
+
+    def getconn(self) -> PooledConnection:
+        """
+        Checks a connection out of the pool.
+
+        Returns: PooledConnection: The connection; close() returns it to the pool.
+        Raises:
+            TimeoutError: If no connection became free within the timeout.
+            psycopg2.Error: If a new connection could not be opened.
+        """
+
+        start = time.time()
+        with self.condition:
+            # warm up to min_size on first use, the blocking connects happen outside the lock below
+            warm = 0 if self.warmed else max(self.min_size - self.size - 1, 0)
+            self.warmed = True
+            waited = False
+            while not self.idle and self.size >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.time() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise TimeoutError(f"No database connection became free within {self.timeout}s ({self.max_size} in use)")
+                self.condition.wait(remaining)
+            conn, idle_since = self.idle.pop() if self.idle else (None, 0.0)
+            if conn is None: self.size += 1
+            self.in_use += 1
+            self.checkouts += 1
+            waited_for = time.time() - start
+            if waited: self.waits += 1
+            self.wait_time += waited_for
+            self.max_wait = max(self.max_wait, waited_for)
+
+        try:
+            if conn is not None and not self.healthy(conn, idle_since):
+                self.discard(conn)
+                with self.condition: self.size += 1
+                conn = None
+            if conn is None: conn = self.open()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        for _ in range(warm):
+            try: spare = self.open()
+            except psycopg2.Error: break
+            with self.condition:
+                if self.size >= self.max_size:
+                    spare.close()
+                    break
+                self.size += 1
+                self.idle.append((spare, time.time()))
+                self.condition.notify()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolled back to a clean state; broken connections are dropped."""
+
+        with self.condition: self.in_use -= 1
+        try:
+            if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            pass
+        if conn.closed or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self.discard(conn)
+            return
+        with self.condition:
+            self.idle.append((conn, time.time()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Checks a connection out for the duration of a with block and returns it afterwards, even on errors."""
+        conn = self.getconn()
+        try: yield conn
+        finally: conn.close()
+
+    def closeall(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for conn, _ in idle:
+            try: conn.close()
+            except Exception: pass
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": len(self.idle),
+                "max_size": self.max_size,
+                "utilization": round(self.in_use / self.max_size, 3),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_time, 3),
+                "max_wait_seconds": round(self.max_wait, 3),
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+            }
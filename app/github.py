@@ -1,10 +1,153 @@
 # =========================================== imports =============================================
 
 import json
-from typing import Literal, Optional
+import time
+import threading
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Literal, Optional
 import requests
 import csv
 import os
+import transport as tp
+import usercache as uc
+from dotenv import load_dotenv
+
+# env
+load_dotenv()
+GITHUB_REPO_INDEX_TTL = float(os.getenv('GITHUB_REPO_INDEX_TTL', 900))
+
+# =========================================== RepoAccess ==========================================
+
+# collaborator listings report role names, the collaborator endpoints take permission names
+ROLE_TO_PERMISSION = {'read': 'pull', 'write': 'push'}
+
+@dataclass
+class RepoAccess:
+    """
+    A snapshot of who has access to a repository, fetched once and reused for a whole bulk operation.
+
+    collaborators maps each collaborator to their permission ("pull" | "triage" | "push" | "maintain" | "admin"),
+    invitations maps each pending invitee to the invitation id, and expired holds the invitees whose invitation expired.
+    Logins are stored lowercased because GitHub logins are case-insensitive; logins keeps the original spelling.
+    """
+
+    repo_url: str
+    collaborators: dict[str, str] = field(default_factory=dict)
+    invitations: dict[str, int] = field(default_factory=dict)
+    expired: set[str] = field(default_factory=set)
+    logins: dict[str, str] = field(default_factory=dict)
+
+    def add_collaborator(self, login: str, permission: str):
+        self.logins[login.lower()] = login
+        self.collaborators[login.lower()] = permission
+
+    def add_invitation(self, login: str, invitation_id: int, expired: bool = False):
+        self.logins[login.lower()] = login
+        self.invitations[login.lower()] = invitation_id
+        if expired: self.expired.add(login.lower())
+
+    def remove_invitation(self, login: str):
+        self.invitations.pop(login.lower(), None)
+        self.expired.discard(login.lower())
+
+    def is_collaborator(self, login: str) -> bool: return login.lower() in self.collaborators
+    def is_invited(self, login: str) -> bool: return login.lower() in self.invitations
+    def permission(self, login: str) -> Optional[str]: return self.collaborators.get(login.lower())
+    def invitation_id(self, login: str) -> Optional[int]: return self.invitations.get(login.lower())
+
+    def users(self) -> set[str]:
+        return {self.logins[login] for login in set(self.collaborators) | set(self.invitations)}
+
+    def expired_users(self) -> set[str]:
+        return {self.logins[login] for login in self.expired}
+
+def build_repo_access(repo_url: str, collaborators: Iterable[dict], invitations: Iterable[dict]) -> RepoAccess:
+    """
+    Assembles a RepoAccess from the two REST listings of a repository, shared by every client's get_repo_access.
+
+    Args:
+        repo_url (str): The URL the access is recorded under.
+        collaborators (Iterable[dict]): Entries of GET /repos/{owner}/{repo}/collaborators.
+        invitations (Iterable[dict]): Entries of GET /repos/{owner}/{repo}/invitations.
+    Returns: RepoAccess: The collaborators (with permissions) and pending invitations (with ids) on the repository.
+    """
+
+    access = RepoAccess(repo_url)
+    for collaborator in collaborators:
+        role = collaborator.get('role_name', 'write')
+        access.add_collaborator(collaborator['login'], ROLE_TO_PERMISSION.get(role, role))
+    for invitation in invitations:
+        access.add_invitation(invitation['invitee']['login'], invitation['id'], invitation['expired'])
+    return access
+
+# =========================================== RepoIndex ===========================================
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parses a GitHub ISO 8601 timestamp (or a datetime); naive values are taken as UTC."""
+    if value is None or value == '': return None
+    if not isinstance(value, datetime): value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+@dataclass
+class RepoRecord:
+    """The parts of an org repository listing entry that bulk operations need."""
+
+    name: str
+    ssh_url: str
+    html_url: str
+    id: Optional[int] = None
+    pushed_at: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, repo: dict) -> 'RepoRecord':
+        return cls(repo['name'], repo['ssh_url'], repo['html_url'], repo.get('id'), repo.get('pushed_at'))
+
+    def changed_since(self, since) -> bool:
+        """
+        True if the repository was pushed to after `since` (or if either timestamp is unknown).
+
+        pushed_at only moves on a git push: collaborators added and invitations expiring don't count as changes.
+        """
+        since, pushed_at = parse_timestamp(since), parse_timestamp(self.pushed_at)
+        return since is None or pushed_at is None or pushed_at > since
+
+class RepoIndex:
+    """
+    Repository records from the last org listing, indexed by name, SSH URL and HTTPS URL (all case-insensitive).
+
+    A listing is considered current for GITHUB_REPO_INDEX_TTL seconds; lookups still answer from older data,
+    callers that need a full, current listing check fresh() and re-list.
+    """
+
+    def __init__(self, ttl: float = GITHUB_REPO_INDEX_TTL):
+        self.ttl = ttl
+        self.by_key = {}
+        self.names = []
+        self.listed_at = None
+        self.lock = threading.Lock()
+
+    def keys(self, record: RepoRecord) -> list[str]:
+        return [key.lower() for key in (record.name, record.ssh_url, record.html_url, record.html_url + '.git') if key]
+
+    def add(self, record: RepoRecord):
+        with self.lock:
+            for key in self.keys(record): self.by_key[key] = record
+
+    def replace(self, records: list[RepoRecord]):
+        """Swaps in a complete org listing."""
+        with self.lock:
+            self.by_key = {key: record for record in records for key in self.keys(record)}
+            self.names = [record.name for record in records]
+            self.listed_at = time.time()
+
+    def get(self, repo: str) -> Optional[RepoRecord]: return self.by_key.get(repo.rstrip('/').lower())
+    def fresh(self) -> bool: return self.listed_at is not None and time.time() - self.listed_at < self.ttl
+    def records(self) -> list[RepoRecord]: return [self.by_key[name.lower()] for name in self.names]
+
+    def clear(self):
+        with self.lock:
+            self.by_key, self.names, self.listed_at = {}, [], None
 
 # ============================================= Github ============================================
 
@@ -12,11 +155,16 @@ class Github:
     GITHUB_PAT = None
     HEADERS = None
     ORG_NAME = None
+    transport = None
+    users = None
+    mirror = None
     perms = Literal['pull', 'triage', 'push', 'maintain', 'admin']
     
-    def __init__(self, GITHUB_PAT: str, ORG_NAME: str):
+    def __init__(self, GITHUB_PAT: str, ORG_NAME: str, transport: Optional[tp.Transport] = None, users: Optional[uc.UserCache] = None):
         self.GITHUB_PAT = GITHUB_PAT
         self.ORG_NAME = ORG_NAME
+        self.transport = transport or tp.default_transport
+        self.users = users or uc.default_user_cache
         self.HEADERS = {
             'Accept': 'application/vnd.github+json',
             'Authorization': f'Bearer {GITHUB_PAT}',
@@ -45,20 +193,27 @@ class Github:
         
     def check_user_exists(self, user: str) -> bool:
         """
-        Checks if a GitHub user exists.
+        Checks if a GitHub user exists. Answers are memoized in the user cache.
 
         Args: user (str): The username of the GitHub user to check.
         Returns: bool: True if the user exists, False otherwise.
         """
 
-        response = requests.get(
-            f'https://api.github.com/users/{user}', headers=self.HEADERS, timeout=2)
-        if response.status_code == 200: return True
-        else: return False
+        cached = self.users.get(user)
+        if cached is not None: return cached[0]
+
+        response = self.transport.get(
+            f'{tp.GITHUB_API_URL}/users/{user}', headers=self.HEADERS, timeout=2)
+        if response.status_code == 200:
+            self.users.put(user, True, response.json().get('id'))
+            return True
+        elif response.status_code == 404:
+            self.users.put(user, False)
+        return False
     
     def check_user_is_collaborator(self, repo_url: str, user: str) -> bool:
         """
-        Checks if a GitHub user is a collaborator on a given repository.
+        Checks if a GitHub user is a collaborator on a given repository, from the webhook mirror when it knows the repository.
 
         Args: 
             repo_url (str): The URL of the GitHub repository.
@@ -66,12 +221,15 @@ class Github:
         Returns: bool: True if the user is a collaborator, False otherwise.
         """
         
+        mirrored = self.mirror.is_collaborator(repo_url, user) if self.mirror else None
+        if mirrored is not None: return mirrored
+        
         ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
         username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
         
         try:
-            response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
+            response = self.transport.get(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
                 headers=self.HEADERS,
                 timeout=2
             )
@@ -99,51 +257,115 @@ class Github:
         if not exists: return 404, f"User {user} does not exist"
         
         try:
-            response = requests.put(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
+            response = self.transport.put(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
                 headers=self.HEADERS,
                 json={'permission': permission},
                 timeout=2
             )
             
-            if response.status_code == 201: return 201, f"Successfully added {user} to the repository with {permission} permission"
+            if response.status_code == 201: return 201, tp.note_retries(f"Successfully added {user} to the repository with {permission} permission", response)
             else: return response.status_code, response.json()
         except Exception as e:
             return 500, str(e)
     
+    def iter_users_on_repo(self, repo_url: str) -> Iterator[str]:
+        """
+        Yields the GitHub usernames of the collaborators on a given repository, page by page.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: Iterator[str]: The GitHub usernames of the collaborators, as each page arrives.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+        
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators',
+            headers=self.HEADERS,
+            timeout=10
+        )
+
+        while True:
+            try:
+                collaborators_response = next(pages, None)
+            except Exception as e:
+                raise Exception(f"Failed to fetch collaborators: {str(e)}")
+            if collaborators_response is None: return
+
+            if collaborators_response.status_code == 200:
+                for collaborator in collaborators_response.json(): yield collaborator['login']
+            elif collaborators_response.status_code == 404:
+                raise Exception("The repository was not found.")
+            elif collaborators_response.status_code == 403:
+                raise Exception("Access to the repository is forbidden.")
+            else:
+                raise Exception(f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+    
     def get_users_on_repo(self, repo_url: str) -> set[str]:
         """
-        Retrieves a set of GitHub usernames who are collaborators on a given repository.
+        Retrieves a set of GitHub usernames who are collaborators on a given repository, from the webhook mirror when it knows the repository.
 
         Args: repo_url (str): The URL of the GitHub repository.
         Returns: set[str]: A set of GitHub usernames who are collaborators on the repository.
         Raises: Exception: If an error occurs during the API request or while processing the response.
         """
         
+        mirrored = self.mirror.collaborators(repo_url) if self.mirror else None
+        if mirrored is not None: return mirrored
+        return set(self.iter_users_on_repo(repo_url))
+    
+    def iter_invitations_on_repo(self, repo_url: str) -> Iterator[dict]:
+        """
+        Yields the pending invitations on a given repository, page by page.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: Iterator[dict]: The invitation objects returned by the GitHub API, as each page arrives.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+        
         ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
         username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
+            headers=self.HEADERS,
+            timeout=10
+        )
+        
+        while True:
+            try:
+                invitations_response = next(pages, None)
+            except Exception as e:
+                raise Exception(f"Failed to fetch invitations: {str(e)}")
+            if invitations_response is None: return
+        
+            if invitations_response.status_code == 200:
+                yield from invitations_response.json()
+            elif invitations_response.status_code == 404:
+                raise Exception("The repository was not found.")
+            elif invitations_response.status_code == 403:
+                raise Exception("Access to the repository is forbidden.")
+            else:
+                raise Exception(f"Failed to fetch invitations: {invitations_response.json().get('message', 'Unknown error')}")
+    
+    def iter_users_invited_on_repo(self, repo_url: str, check_expired: bool = False) -> Iterator[str]:
+        """
+        Yields the GitHub usernames who are invited to collaborate on a given repository, page by page.
 
-        try:
-            collaborators_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators',
-                headers=self.HEADERS,
-                timeout=10
-            )
-        except Exception as e:
-            raise Exception(f"Failed to fetch collaborators: {str(e)}")
-
-        if collaborators_response.status_code == 200:
-            return {collaborator['login'] for collaborator in collaborators_response.json()}
-        elif collaborators_response.status_code == 404:
-            raise Exception("The repository was not found.")
-        elif collaborators_response.status_code == 403:
-            raise Exception("Access to the repository is forbidden.")
-        else:
-            raise Exception(f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+        Args:
+            repo_url (str): The URL of the GitHub repository.
+            check_expired (bool): If True, only yield the usernames of users with expired invitations.
+        Returns: Iterator[str]: The GitHub usernames of the invitees, as each page arrives.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+        
+        for invitation in self.iter_invitations_on_repo(repo_url):
+            if not check_expired or invitation["expired"]: yield invitation['invitee']['login']
     
     def get_users_invited_on_repo(self, repo_url: str, check_expired: bool = False ) -> set[str]:
         """
         Retrieves a set of GitHub usernames who are invited to collaborate on a given repository.
+        Pending invitations come from the webhook mirror when it knows the repository; expiry is always checked live.
 
         Args:
             repo_url (str): The URL of the GitHub repository.
@@ -152,63 +374,90 @@ class Github:
         Raises: Exception: If an error occurs during the API request or while processing the response.
         """
         
+        mirrored = self.mirror.invitees(repo_url) if self.mirror and not check_expired else None
+        if mirrored is not None: return mirrored
+        return set(self.iter_users_invited_on_repo(repo_url, check_expired))
+        
+    def get_repo_access(self, repo_url: str) -> RepoAccess:
+        """
+        Fetches a snapshot of a repository's collaborators (with permissions) and pending invitations (with ids).
+
+        Costs one paginated collaborator listing and one paginated invitation listing, however many users are on the repository.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: RepoAccess: The collaborators and invitations on the repository.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+        
         ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
         username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        collaborators = []
+        for collaborators_response in self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators',
+            headers=self.HEADERS,
+            timeout=10
+        ):
+            if collaborators_response.status_code == 404:
+                raise Exception("The repository was not found.")
+            elif collaborators_response.status_code == 403:
+                raise Exception("Access to the repository is forbidden.")
+            elif collaborators_response.status_code != 200:
+                raise Exception(f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+            collaborators.extend(collaborators_response.json())
         
-        try:
-            invitations_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/invitations',
-                headers=self.HEADERS,
-                timeout=10
-            )
-        except Exception as e:
-            raise Exception(f"Failed to fetch invitations: {str(e)}")
-        
-        if invitations_response.status_code == 200:
-            if check_expired:
-                return {invited_collaborators['invitee']['login'] if invited_collaborators["expired"] else None
-                                        for invited_collaborators in invitations_response.json()} - {None}
-            else:
-                return {invitation['invitee']['login'] for invitation in invitations_response.json()}
-        elif invitations_response.status_code == 404:
-            raise Exception("The repository was not found.")
-        elif invitations_response.status_code == 403:
-            raise Exception("Access to the repository is forbidden.")
-        else:
-            raise Exception(f"Failed to fetch invitations: {invitations_response.json().get('message', 'Unknown error')}")
+        return build_repo_access(repo_url, collaborators, self.iter_invitations_on_repo(repo_url))
         
-    def revoke_user_invitation_on_repo(self, repo_url: str, user: str) -> tuple[int, str]:
+    def revoke_user_invitation_on_repo(self, repo_url: str, user: str, access: Optional[RepoAccess] = None) -> tuple[int, str]:
         """
         Revokes an invitation to collaborate on a GitHub repository.
 
         Args: 
             repo_url (str): The URL of the GitHub repository.
             user (str): The username of the GitHub user.
+            access (Optional[RepoAccess]): A snapshot of the repository; when given, the invitation id is taken from it.
         Returns: Tuple[int, str]: A tuple containing the status code and message.
         """
         
         ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
         username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
         
+        if access is not None:
+            if not access.is_invited(user): return 404, f"User {user} has no pending invitation"
+            try:
+                response = self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{access.invitation_id(user)}',
+                    headers=self.HEADERS,
+                    timeout=2
+                )
+                if response.status_code == 204:
+                    access.remove_invitation(user)
+                    return 204, tp.note_retries(f"Successfully revoked invitation for {user}", response)
+                else:
+                    return response.status_code, response.json()
+            except Exception as e:
+                return 500, str(e)
+        
         try:
-            invitations_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/invitations',
+            invitation = None
+            for invitations_response in self.transport.paginate(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
                 headers=self.HEADERS,
                 timeout=10
-            )
-            
-            if invitations_response.status_code != 200:
-                return invitations_response.status_code, 'Failed to fetch invited collaborators'
+            ):
+                if invitations_response.status_code != 200:
+                    return invitations_response.status_code, 'Failed to fetch invited collaborators'
+                
+                invitation = next((inv for inv in invitations_response.json() if inv['invitee']['login'] == user), None)
+                if invitation: break
             
-            invitation = next((inv for inv in invitations_response.json() if inv['invitee']['login'] == user), None)
             if invitation:
-                response = requests.delete(
-                    f'https://api.github.com/repos/{username}/{repo_name}/invitations/{invitation["id"]}',
+                response = self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{invitation["id"]}',
                     headers=self.HEADERS,
                     timeout=2
                 )
                 if response.status_code == 204:
-                    return 204, f"Successfully revoked invitation for {user}"
+                    return 204, tp.note_retries(f"Successfully revoked invitation for {user}", response)
                 else:
                     return response.status_code, response.json()
             else:
@@ -226,19 +475,18 @@ class Github:
         
         results = []
         try:
-            expired_users = self.get_users_invited_on_repo(repo_url, check_expired=True)
-            print(f"Expired users: {expired_users}")
-            for user in expired_users:
-                result = []
-                status, msg = self.revoke_user_invitation_on_repo(repo_url, user)
+            access = self.get_repo_access(repo_url)
+            print(f"Expired users: {access.expired_users()}")
+            for user in access.expired_users():
+                status, msg = self.revoke_user_invitation_on_repo(repo_url, user, access)
                 status, msg = self.add_user_to_repo(repo_url, user, "push")
-                result.append((status, msg))
+                results.append((status, msg))
             return results
         except Exception as e:
             return [(500, str(e))]             
                                                     
         
-    def change_user_permission_on_repo(self, repo_url: str, user: str, permission: perms) -> tuple[int, str]:
+    def change_user_permission_on_repo(self, repo_url: str, user: str, permission: perms, access: Optional[RepoAccess] = None) -> tuple[int, str]:
         """
         Changes the permission level of a user on a GitHub repository.
         
@@ -246,60 +494,65 @@ class Github:
             repo_url (str): The HTTPS URL of the GitHub repository.
             user (str): The username of the GitHub user.
             permission ("pull" | "triage" | "push" | "maintain" | "admin"): The new permission level for the user.
+            access (Optional[RepoAccess]): A snapshot of the repository from get_repo_access. When given, the collaborator
+                and invitation lookups are answered from it, so the change costs exactly one write call.
         Returns: Tuple[int, str]: A tuple containing the status code and message.
         """
         
         try:
             ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
             username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
-            exists = self.check_user_exists(user)
             
-            if not exists: return 404, f"User {user} does not exist"
+            if access is not None:
+                is_collaborator, missing_status = access.is_collaborator(user), 404
+            else:
+                exists = self.check_user_exists(user)
+                
+                if not exists: return 404, f"User {user} does not exist"
 
-            # Check if the user has permissions on the specified repository
-            collaborator_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
-                headers=self.HEADERS
-            )
-            
-            print(f"collaborator_response: {collaborator_response.status_code} for {user} on {repo_name}")
+                # Check if the user has permissions on the specified repository
+                collaborator_response = self.transport.get(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                    headers=self.HEADERS
+                )
+                
+                print(f"collaborator_response: {collaborator_response.status_code} for {user} on {repo_name}")
+                is_collaborator, missing_status = collaborator_response.status_code == 204, collaborator_response.status_code
             
-            if collaborator_response.status_code == 204:
+            if is_collaborator:
                 # Change the user's permission level
-                change_permission_response = requests.put(
-                    f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
+                change_permission_response = self.transport.put(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
                     headers=self.HEADERS,
                     json={'permission': permission},
                     timeout=2
                 )
                 
                 if change_permission_response.status_code == 200 or change_permission_response.status_code == 204:
-                    return change_permission_response.status_code, f"Successfully changed {user}'s permission to {permission}"
+                    if access is not None: access.add_collaborator(user, permission)
+                    return change_permission_response.status_code, tp.note_retries(f"Successfully changed {user}'s permission to {permission}", change_permission_response)
                 else:
                     return change_permission_response.status_code, change_permission_response.json()
                 
             else:
-                invitations_response = requests.get(
-                    f'https://api.github.com/repos/{username}/{repo_name}/invitations',
-                    headers=self.HEADERS
-                )
-
-                invitations = invitations_response.json()
-                invitation = next((inv for inv in invitations if inv['invitee']['login'] == user), None)
+                if access is not None:
+                    invitation_id = access.invitation_id(user)
+                else:
+                    invitation_id = next((inv['id'] for inv in self.iter_invitations_on_repo(repo_url) if inv['invitee']['login'] == user), None)
 
-                if invitation:
+                if invitation_id is not None:
                     # Update the invitation if exists
-                    update_invitation_response = requests.patch(
-                        f'https://api.github.com/repos/{username}/{repo_name}/invitations/{invitation["id"]}',
+                    update_invitation_response = self.transport.patch(
+                        f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{invitation_id}',
                         headers=self.HEADERS,
                         json={'permissions': permission}
                     )
                     if update_invitation_response.status_code == 200:
-                        return 200, f"Successfully updated {user}'s invitation to {permission}"
+                        return 200, tp.note_retries(f"Successfully updated {user}'s invitation to {permission}", update_invitation_response)
                     else:
                         return update_invitation_response.status_code, update_invitation_response.json()
                 else:
-                    return collaborator_response.status_code, f'User {user} is not a collaborator or invited on the repository'
+                    return missing_status, f'User {user} is not a collaborator or invited on the repository'
 
         except Exception as e:
             return 500, str(e)
@@ -317,16 +570,30 @@ class Github:
         results = []
         try:
             ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
-            users = self.get_users_on_repo(repo_url)
-            invited_users = self.get_users_invited_on_repo(repo_url)
+            access = self.get_repo_access(repo_url)
             
-            for user in users.union(invited_users):
-                status, msg = self.change_user_permission_on_repo(ssh_url, user, permission)
+            for user in access.users():
+                status, msg = self.change_user_permission_on_repo(ssh_url, user, permission, access)
                 results.append((status, msg))
             return results
         except Exception as e:
             return [(500, str(e))]
 
+    def iter_all_repos(self) -> Iterator[tuple[str, str]]:
+        """
+        Yields the (name, ssh_url) of every repository in the organization, page by page.
+        
+        Returns: Iterator[tuple[str, str]]: The name and SSH URL of each repository, as each page arrives.
+        """
+        
+        for response in self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/orgs/{self.ORG_NAME}/repos',
+            headers=self.HEADERS,
+            timeout=10
+        ):
+            if response.status_code != 200: return
+            for repo in response.json(): yield repo['name'], repo['ssh_url']
+
     def get_all_repos(self) -> list[str]:
         """
         Retrieves a list of all repositories in the organization.
@@ -335,16 +602,7 @@ class Github:
         """
         
         try:
-            response = requests.get(
-                f'https://api.github.com/orgs/{self.ORG_NAME}/repos',
-                headers=self.HEADERS,
-                timeout=10
-            )
-            #print(response.json())
-            if response.status_code == 200:
-                return [(repo['name'], repo['ssh_url']) for repo in response.json()]
-            else:
-                return []
+            return list(self.iter_all_repos())
         except Exception as e:
             return []
 
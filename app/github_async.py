@@ -0,0 +1,462 @@
+# =========================================== imports =============================================
+
+import asyncio
+from typing import AsyncIterator, Literal, Optional
+import transport as tp
+import usercache as uc
+from github import RepoAccess, build_repo_access
+
+# =========================================== AsyncGithub =========================================
+
+class AsyncGithub:
+    """
+    asyncio-native version of github.Github with the same methods, so bulk permission
+    changes can fan out concurrently instead of waiting on one round trip at a time.
+    """
+
+    GITHUB_PAT = None
+    HEADERS = None
+    ORG_NAME = None
+    transport = None
+    users = None
+    mirror = None
+    perms = Literal['pull', 'triage', 'push', 'maintain', 'admin']
+
+    def __init__(self, GITHUB_PAT: str, ORG_NAME: str, transport: Optional[tp.AsyncTransport] = None, users: Optional[uc.UserCache] = None):
+        self.GITHUB_PAT = GITHUB_PAT
+        self.ORG_NAME = ORG_NAME
+        self.transport = transport or tp.default_async_transport
+        self.users = users or uc.default_user_cache
+        self.HEADERS = {
+            'Accept': 'application/vnd.github+json',
+            'Authorization': f'Bearer {GITHUB_PAT}',
+            'X-GitHub-Api-Version': '2022-11-28'
+        }
+        print(f"AsyncGithub initialized with {ORG_NAME}")
+
+    def extract_user_repo_from_ssh_url(self, ssh_url: str) -> tuple[str, str]:
+        """
+        Extracts the username and repository name from a given SSH URL.
+
+        Args: ssh_url (str): The SSH URL of the GitHub repository.
+        Returns: Tuple[str, str]: A tuple containing the username and repository name.
+        Raises: ValueError: If the SSH URL does not start with "git@github.com" or is missing required parts.
+        """
+
+        if not ssh_url.startswith("git@github.com:"):
+            raise ValueError("Invalid SSH URL format")
+        try:
+            ssh_url_parts = ssh_url.split(':')[-1].split('/')
+            username = ssh_url_parts[0]
+            repo_name = ssh_url_parts[1].split('.')[0]
+            return username, repo_name
+        except Exception as e:
+            raise ValueError("Invalid SSH URL format")
+
+    async def check_user_exists(self, user: str) -> bool:
+        """
+        Checks if a GitHub user exists. Answers are memoized in the user cache.
+
+        Args: user (str): The username of the GitHub user to check.
+        Returns: bool: True if the user exists, False otherwise.
+        """
+
+        # a persistent store means a database round trip, keep it off the event loop
+        if self.users.store is None: cached = self.users.get(user)
+        else: cached = await asyncio.to_thread(self.users.get, user)
+        if cached is not None: return cached[0]
+
+        response = await self.transport.get(
+            f'{tp.GITHUB_API_URL}/users/{user}', headers=self.HEADERS, timeout=2)
+        if response.status_code == 200:
+            await asyncio.to_thread(self.users.put, user, True, response.json().get('id'))
+            return True
+        elif response.status_code == 404:
+            await asyncio.to_thread(self.users.put, user, False)
+        return False
+
+    async def check_user_is_collaborator(self, repo_url: str, user: str) -> bool:
+        """
+        Checks if a GitHub user is a collaborator on a given repository, from the webhook mirror when it knows the repository.
+
+        Args:
+            repo_url (str): The URL of the GitHub repository.
+            user (str): The username of the GitHub user.
+        Returns: bool: True if the user is a collaborator, False otherwise.
+        """
+
+        mirrored = self.mirror.is_collaborator(repo_url, user) if self.mirror else None
+        if mirrored is not None: return mirrored
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+
+        try:
+            response = await self.transport.get(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                headers=self.HEADERS,
+                timeout=2
+            )
+
+            if response.status_code == 204: return True
+            else: return False
+        except Exception as e:
+            raise Exception(f"Failed to check if user is a collaborator: {str(e)}")
+
+    async def add_user_to_repo(self, repo_url: str, user: str, permission: perms) -> tuple[int, str]:
+        """
+        Adds a GitHub user to a repository with the specified permission level.
+
+        Args:
+            repo_url (str): The URL of the GitHub repository.
+            user (str): The username of the GitHub user.
+            permission ("pull" | "triage" | "push" | "maintain" | "admin"): The permission level for the user.
+        Returns: Tuple[int, str]: A tuple containing the status code and message.
+        """
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        exists = await self.check_user_exists(user)
+
+        if not exists: return 404, f"User {user} does not exist"
+
+        try:
+            response = await self.transport.put(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                headers=self.HEADERS,
+                json={'permission': permission},
+                timeout=2
+            )
+
+            if response.status_code == 201: return 201, tp.note_retries(f"Successfully added {user} to the repository with {permission} permission", response)
+            else: return response.status_code, response.json()
+        except Exception as e:
+            return 500, str(e)
+
+    async def iter_users_on_repo(self, repo_url: str) -> AsyncIterator[str]:
+        """
+        Yields the GitHub usernames of the collaborators on a given repository, page by page.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: AsyncIterator[str]: The GitHub usernames of the collaborators, as each page arrives.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators',
+            headers=self.HEADERS,
+            timeout=10
+        )
+
+        while True:
+            try:
+                collaborators_response = await pages.__anext__()
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                raise Exception(f"Failed to fetch collaborators: {str(e)}")
+
+            if collaborators_response.status_code == 200:
+                for collaborator in collaborators_response.json(): yield collaborator['login']
+            elif collaborators_response.status_code == 404:
+                raise Exception("The repository was not found.")
+            elif collaborators_response.status_code == 403:
+                raise Exception("Access to the repository is forbidden.")
+            else:
+                raise Exception(f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+
+    async def get_users_on_repo(self, repo_url: str) -> set[str]:
+        """
+        Retrieves a set of GitHub usernames who are collaborators on a given repository, from the webhook mirror when it knows the repository.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: set[str]: A set of GitHub usernames who are collaborators on the repository.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+
+        mirrored = self.mirror.collaborators(repo_url) if self.mirror else None
+        if mirrored is not None: return mirrored
+        return {user async for user in self.iter_users_on_repo(repo_url)}
+
+    async def iter_invitations_on_repo(self, repo_url: str) -> AsyncIterator[dict]:
+        """
+        Yields the pending invitations on a given repository, page by page.
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: AsyncIterator[dict]: The invitation objects returned by the GitHub API, as each page arrives.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
+            headers=self.HEADERS,
+            timeout=10
+        )
+
+        while True:
+            try:
+                invitations_response = await pages.__anext__()
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                raise Exception(f"Failed to fetch invitations: {str(e)}")
+
+            if invitations_response.status_code == 200:
+                for invitation in invitations_response.json(): yield invitation
+            elif invitations_response.status_code == 404:
+                raise Exception("The repository was not found.")
+            elif invitations_response.status_code == 403:
+                raise Exception("Access to the repository is forbidden.")
+            else:
+                raise Exception(f"Failed to fetch invitations: {invitations_response.json().get('message', 'Unknown error')}")
+
+    async def get_users_invited_on_repo(self, repo_url: str, check_expired: bool = False) -> set[str]:
+        """
+        Retrieves a set of GitHub usernames who are invited to collaborate on a given repository.
+        Pending invitations come from the webhook mirror when it knows the repository; expiry is always checked live.
+
+        Args:
+            repo_url (str): The URL of the GitHub repository.
+            check_expired (bool): If True, only return the usernames of users with expired invitations.
+        Returns: set[str]: A set of GitHub usernames who are invited to collaborate on the repository.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+
+        mirrored = self.mirror.invitees(repo_url) if self.mirror and not check_expired else None
+        if mirrored is not None: return mirrored
+        return {
+            invitation['invitee']['login'] async for invitation in self.iter_invitations_on_repo(repo_url)
+            if not check_expired or invitation["expired"]
+        }
+
+    async def get_repo_access(self, repo_url: str) -> RepoAccess:
+        """
+        Fetches a snapshot of a repository's collaborators (with permissions) and pending invitations (with ids).
+
+        Args: repo_url (str): The URL of the GitHub repository.
+        Returns: RepoAccess: The collaborators and invitations on the repository.
+        Raises: Exception: If an error occurs during the API request or while processing the response.
+        """
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+
+        async def collaborators() -> list[dict]:
+            result = []
+            async for collaborators_response in self.transport.paginate(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators',
+                headers=self.HEADERS,
+                timeout=10
+            ):
+                if collaborators_response.status_code == 404:
+                    raise Exception("The repository was not found.")
+                elif collaborators_response.status_code == 403:
+                    raise Exception("Access to the repository is forbidden.")
+                elif collaborators_response.status_code != 200:
+                    raise Exception(f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+                result.extend(collaborators_response.json())
+            return result
+
+        async def invitations() -> list[dict]:
+            return [invitation async for invitation in self.iter_invitations_on_repo(repo_url)]
+
+        return build_repo_access(repo_url, *await asyncio.gather(collaborators(), invitations()))
+
+    async def revoke_user_invitation_on_repo(self, repo_url: str, user: str, access: Optional[RepoAccess] = None) -> tuple[int, str]:
+        """
+        Revokes an invitation to collaborate on a GitHub repository.
+
+        Args:
+            repo_url (str): The URL of the GitHub repository.
+            user (str): The username of the GitHub user.
+            access (Optional[RepoAccess]): A snapshot of the repository; when given, the invitation id is taken from it.
+        Returns: Tuple[int, str]: A tuple containing the status code and message.
+        """
+
+        ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+        username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+
+        if access is not None:
+            if not access.is_invited(user): return 404, f"User {user} has no pending invitation"
+            try:
+                response = await self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{access.invitation_id(user)}',
+                    headers=self.HEADERS,
+                    timeout=2
+                )
+                if response.status_code == 204:
+                    access.remove_invitation(user)
+                    return 204, tp.note_retries(f"Successfully revoked invitation for {user}", response)
+                else:
+                    return response.status_code, response.json()
+            except Exception as e:
+                return 500, str(e)
+
+        try:
+            invitation = None
+            async for invitations_response in self.transport.paginate(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
+                headers=self.HEADERS,
+                timeout=10
+            ):
+                if invitations_response.status_code != 200:
+                    return invitations_response.status_code, 'Failed to fetch invited collaborators'
+
+                invitation = next((inv for inv in invitations_response.json() if inv['invitee']['login'] == user), None)
+                if invitation: break
+
+            if invitation:
+                response = await self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{invitation["id"]}',
+                    headers=self.HEADERS,
+                    timeout=2
+                )
+                if response.status_code == 204:
+                    return 204, tp.note_retries(f"Successfully revoked invitation for {user}", response)
+                else:
+                    return response.status_code, response.json()
+            else:
+                return invitations_response.status_code, invitations_response.json()
+        except Exception as e:
+            return 500, str(e)
+
+    async def reinvite_expired_users_on_repo(self, repo_url: str) -> list[tuple[int, str]]:
+        """
+        Re-invites users who have expired invitations on a GitHub repository.
+
+        Args: repo_url (str): The HTTPS URL of the GitHub repository.
+        Returns: list[tuple[int, str]]: A list of tuples containing the status code and message.
+        """
+
+        results = []
+        try:
+            access = await self.get_repo_access(repo_url)
+            for user in access.expired_users():
+                await self.revoke_user_invitation_on_repo(repo_url, user, access)
+                results.append(await self.add_user_to_repo(repo_url, user, "push"))
+            return results
+        except Exception as e:
+            return [(500, str(e))]
+
+    async def change_user_permission_on_repo(self, repo_url: str, user: str, permission: perms, access: Optional[RepoAccess] = None) -> tuple[int, str]:
+        """
+        Changes the permission level of a user on a GitHub repository.
+
+        Args:
+            repo_url (str): The HTTPS URL of the GitHub repository.
+            user (str): The username of the GitHub user.
+            permission ("pull" | "triage" | "push" | "maintain" | "admin"): The new permission level for the user.
+            access (Optional[RepoAccess]): A snapshot of the repository from get_repo_access. When given, the collaborator
+                and invitation lookups are answered from it, so the change costs exactly one write call.
+        Returns: Tuple[int, str]: A tuple containing the status code and message.
+        """
+
+        try:
+            ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+            username, repo_name = self.extract_user_repo_from_ssh_url(ssh_url)
+
+            if access is not None:
+                is_collaborator, missing_status = access.is_collaborator(user), 404
+            else:
+                exists = await self.check_user_exists(user)
+
+                if not exists: return 404, f"User {user} does not exist"
+
+                # Check if the user has permissions on the specified repository
+                collaborator_response = await self.transport.get(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                    headers=self.HEADERS
+                )
+                is_collaborator, missing_status = collaborator_response.status_code == 204, collaborator_response.status_code
+
+            if is_collaborator:
+                # Change the user's permission level
+                change_permission_response = await self.transport.put(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                    headers=self.HEADERS,
+                    json={'permission': permission},
+                    timeout=2
+                )
+
+                if change_permission_response.status_code == 200 or change_permission_response.status_code == 204:
+                    if access is not None: access.add_collaborator(user, permission)
+                    return change_permission_response.status_code, tp.note_retries(f"Successfully changed {user}'s permission to {permission}", change_permission_response)
+                else:
+                    return change_permission_response.status_code, change_permission_response.json()
+
+            else:
+                invitation_id = access.invitation_id(user) if access is not None else None
+                if access is None:
+                    async for inv in self.iter_invitations_on_repo(repo_url):
+                        if inv['invitee']['login'] == user: invitation_id = inv['id'] ; break
+
+                if invitation_id is not None:
+                    # Update the invitation if exists
+                    update_invitation_response = await self.transport.patch(
+                        f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{invitation_id}',
+                        headers=self.HEADERS,
+                        json={'permissions': permission}
+                    )
+                    if update_invitation_response.status_code == 200:
+                        return 200, tp.note_retries(f"Successfully updated {user}'s invitation to {permission}", update_invitation_response)
+                    else:
+                        return update_invitation_response.status_code, update_invitation_response.json()
+                else:
+                    return missing_status, f'User {user} is not a collaborator or invited on the repository'
+
+        except Exception as e:
+            return 500, str(e)
+
+    async def change_all_user_permission_on_repo(self, repo_url: str, permission: perms, semaphore: Optional[asyncio.Semaphore] = None) -> list[tuple[int, str]]:
+        """
+        Changes the permission level of all users on a GitHub repository, concurrently.
+
+        Args:
+            repo_url (str): The HTTPS URL of the GitHub repository.
+            permission ("pull" | "triage" | "push" | "maintain" | "admin"): The new permission level for the users.
+            semaphore (Optional[asyncio.Semaphore]): Caps how many users are changed at once, unbounded if not given.
+        Returns: list[tuple[int, str]]: A list of tuples containing the status code and message.
+        """
+
+        try:
+            ssh_url = repo_url.replace("https://github.com/", "git@github.com:")
+            access = await self.get_repo_access(repo_url)
+
+            async def change(user: str) -> tuple[int, str]:
+                if semaphore is None: return await self.change_user_permission_on_repo(ssh_url, user, permission, access)
+                async with semaphore: return await self.change_user_permission_on_repo(ssh_url, user, permission, access)
+
+            return list(await asyncio.gather(*[change(user) for user in access.users()]))
+        except Exception as e:
+            return [(500, str(e))]
+
+    async def iter_all_repos(self) -> AsyncIterator[tuple[str, str]]:
+        """
+        Yields the (name, ssh_url) of every repository in the organization, page by page.
+
+        Returns: AsyncIterator[tuple[str, str]]: The name and SSH URL of each repository, as each page arrives.
+        """
+
+        async for response in self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/orgs/{self.ORG_NAME}/repos',
+            headers=self.HEADERS,
+            timeout=10
+        ):
+            if response.status_code != 200: return
+            for repo in response.json(): yield repo['name'], repo['ssh_url']
+
+    async def get_all_repos(self) -> list[str]:
+        """
+        Retrieves a list of all repositories in the organization.
+
+        Returns: list[str]: A list of all repositories in the organization.
+        """
+
+        try:
+            return [repo async for repo in self.iter_all_repos()]
+        except Exception as e:
+            return []
@@ -0,0 +1,313 @@
+# =========================================== imports =============================================
+
+import os
+import re
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+from dotenv import load_dotenv
+import transport as tp
+import usercache as uc
+from github import RepoAccess, RepoRecord, ROLE_TO_PERMISSION
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_GRAPHQL_PAGE_SIZE = int(os.getenv('GITHUB_GRAPHQL_PAGE_SIZE', 50))
+GITHUB_SNAPSHOT_TTL = float(os.getenv('GITHUB_SNAPSHOT_TTL', 300))
+GITHUB_LOGIN_BATCH_SIZE = int(os.getenv('GITHUB_LOGIN_BATCH_SIZE', 100))
+
+# const
+GRAPHQL_URL = f'{tp.GITHUB_API_URL}/graphql'
+
+REPOSITORIES_QUERY = """
+query($org: String!, $after: String, $repos: Int!, $collaborators: Int!) {
+  organization(login: $org) {
+    repositories(first: $repos, after: $after, orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        sshUrl
+        url
+        databaseId
+        pushedAt
+        collaborators(first: $collaborators) {
+          pageInfo { hasNextPage endCursor }
+          edges { permission node { login } }
+        }
+      }
+    }
+  }
+}
+"""
+
+COLLABORATORS_QUERY = """
+query($org: String!, $name: String!, $after: String) {
+  repository(owner: $org, name: $name) {
+    collaborators(first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      edges { permission node { login } }
+    }
+  }
+}
+"""
+
+# alphanumerics and single inner hyphens, at most 39 characters: anything else cannot be a GitHub login
+LOGIN_PATTERN = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9]|-(?=[A-Za-z0-9])){0,38}$')
+
+def users_query(count: int) -> str:
+    """Builds a query looking up `count` logins at once, one aliased user(login:) field per login (u0, u1, ...)."""
+    variables = ', '.join(f'$l{index}: String!' for index in range(count))
+    fields = '\n'.join(f'  u{index}: user(login: $l{index}) {{ login databaseId }}' for index in range(count))
+    return f"query({variables}) {{\n{fields}\n}}"
+
+# =========================================== snapshot ============================================
+
+@dataclass
+class OrgSnapshot:
+    """
+    An in-memory index of every repository in the organization and who has access to it.
+
+    repos maps each lowercased repository name to its RepoAccess, records maps it to the repository's RepoRecord,
+    and errors maps the repositories whose collaborators could not be read (e.g. no admin rights) to the reason.
+    Bulk operations look repositories up here instead of asking the API repo by repo.
+    """
+
+    org: str
+    repos: dict[str, RepoAccess] = field(default_factory=dict)
+    records: dict[str, RepoRecord] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    invitations: bool = False
+    taken_at: float = field(default_factory=time.time)
+
+    def name(self, repo: str) -> str:
+        """
+        Normalizes a repository name, HTTPS URL or SSH URL to the key used by the index.
+
+        Args: repo (str): The repository name, HTTPS URL or SSH URL.
+        Returns: str: The lowercased repository name.
+        """
+
+        repo = repo.rstrip('/')
+        if repo.endswith('.git'): repo = repo[:-4]
+        return repo.replace(':', '/').split('/')[-1].lower()
+
+    def access(self, repo: str) -> Optional[RepoAccess]: return self.repos.get(self.name(repo))
+    def record(self, repo: str) -> Optional[RepoRecord]: return self.records.get(self.name(repo))
+
+    def ssh_url(self, repo: str) -> Optional[str]:
+        record = self.record(repo)
+        return record.ssh_url if record else None
+
+    def age(self) -> float: return time.time() - self.taken_at
+
+# =========================================== graphql =============================================
+
+class GithubGraphQL:
+    GITHUB_PAT = None
+    HEADERS = None
+    ORG_NAME = None
+    transport = None
+
+    def __init__(self, GITHUB_PAT: str, ORG_NAME: str, transport: Optional[tp.Transport] = None, ttl: float = GITHUB_SNAPSHOT_TTL):
+        self.GITHUB_PAT = GITHUB_PAT
+        self.ORG_NAME = ORG_NAME
+        self.transport = transport or tp.default_transport
+        self.ttl = ttl
+        self.cached = None
+        self.lock = threading.Lock()
+        self.HEADERS = {
+            'Accept': 'application/vnd.github+json',
+            'Authorization': f'Bearer {GITHUB_PAT}',
+            'X-GitHub-Api-Version': '2022-11-28'
+        }
+
+    def query(self, query: str, variables: dict) -> tuple[dict, list[dict]]:
+        """
+        Runs a GraphQL query against the GitHub API.
+
+        Args:
+            query (str): The GraphQL query.
+            variables (dict): The query variables.
+        Returns: tuple[dict, list[dict]]: The data and the (possibly empty) list of errors GitHub reported alongside it.
+        Raises: Exception: If the request fails or GitHub returns no data at all.
+        """
+
+        response = self.transport.post(GRAPHQL_URL, headers=self.HEADERS, json={'query': query, 'variables': variables},
+                                       timeout=30, idempotent=True)
+        if response.status_code == 401:
+            raise PermissionError("Unauthorized: Invalid GitHub PAT.")
+        elif response.status_code != 200:
+            raise Exception(f"GraphQL request failed with status {response.status_code}")
+
+        body = response.json()
+        errors = body.get('errors') or []
+        if not body.get('data'):
+            raise Exception(f"GraphQL query failed: {errors[0].get('message') if errors else 'no data returned'}")
+        return body['data'], errors
+
+    def add_collaborators(self, access: RepoAccess, edges: list[dict]):
+        for edge in edges:
+            permission = edge['permission'].lower()
+            access.add_collaborator(edge['node']['login'], ROLE_TO_PERMISSION.get(permission, permission))
+
+    def iter_repo_access(self) -> Iterator[tuple[RepoRecord, Optional[RepoAccess], Optional[str]]]:
+        """
+        Yields every repository in the organization with its collaborators and their permissions, a page of repositories per query.
+
+        Repositories with more collaborators than fit on the first page get follow-up queries of their own.
+
+        Returns: Iterator[tuple[RepoRecord, Optional[RepoAccess], Optional[str]]]: (record, access, error) per repository;
+            access is None and error is set when the collaborators could not be read.
+        Raises: Exception: If the organization cannot be listed.
+        """
+
+        after = None
+        while True:
+            data, errors = self.query(REPOSITORIES_QUERY, {
+                'org': self.ORG_NAME, 'after': after, 'repos': GITHUB_GRAPHQL_PAGE_SIZE, 'collaborators': 100,
+            })
+            if not data.get('organization'):
+                raise FileNotFoundError(f"Organization '{self.ORG_NAME}' not found.")
+            repositories = data['organization']['repositories']
+
+            # errors on a single repository come back with a path pointing at its node
+            failed = {
+                error['path'][3]: error.get('message', 'Unknown error')
+                for error in errors if len(error.get('path') or []) > 3
+            }
+
+            for index, node in enumerate(repositories['nodes']):
+                record = RepoRecord(node['name'], node['sshUrl'], node['url'], node.get('databaseId'), node.get('pushedAt'))
+                if node['collaborators'] is None:
+                    yield record, None, failed.get(index, 'Collaborators are not readable')
+                    continue
+
+                access = RepoAccess(node['url'])
+                self.add_collaborators(access, node['collaborators']['edges'])
+                page = node['collaborators']['pageInfo']
+                while page['hasNextPage']:
+                    more, _ = self.query(COLLABORATORS_QUERY, {'org': self.ORG_NAME, 'name': node['name'], 'after': page['endCursor']})
+                    self.add_collaborators(access, more['repository']['collaborators']['edges'])
+                    page = more['repository']['collaborators']['pageInfo']
+                yield record, access, None
+
+            if not repositories['pageInfo']['hasNextPage']: return
+            after = repositories['pageInfo']['endCursor']
+
+    def add_invitations(self, name: str, access: RepoAccess):
+        """
+        Adds the pending invitations of a repository to its access snapshot.
+
+        The GraphQL API does not expose repository invitations, so these come from the paginated REST listing.
+
+        Args:
+            name (str): The repository name.
+            access (RepoAccess): The snapshot to add the invitations to.
+        Raises: Exception: If the invitations could not be listed.
+        """
+
+        for response in self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{self.ORG_NAME}/{name}/invitations',
+            headers=self.HEADERS,
+            timeout=10
+        ):
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch invitations: {response.json().get('message', 'Unknown error')}")
+            for invitation in response.json():
+                access.add_invitation(invitation['invitee']['login'], invitation['id'], invitation['expired'])
+
+    def snapshot(self, invitations: bool = True, refresh: bool = False) -> OrgSnapshot:
+        """
+        Builds (or reuses) an index of every repository, collaborator and pending invitation in the organization.
+
+        Collaborators for the whole organization cost one GraphQL query per GITHUB_GRAPHQL_PAGE_SIZE repositories.
+        Invitations add one REST listing per repository, so leave them out when only collaborators are needed.
+        A snapshot younger than GITHUB_SNAPSHOT_TTL seconds is reused unless refresh is set.
+
+        Args:
+            invitations (bool): Whether pending invitations are needed.
+            refresh (bool): Ignore any cached snapshot.
+        Returns: OrgSnapshot: The index.
+        Raises: Exception: If the organization cannot be listed.
+        """
+
+        with self.lock:
+            cached = self.cached
+            if (cached is not None and not refresh and cached.age() < self.ttl
+                    and (cached.invitations or not invitations)):
+                return cached
+
+            snapshot = OrgSnapshot(self.ORG_NAME, invitations=invitations)
+            for record, access, error in self.iter_repo_access():
+                name = record.name.lower()
+                snapshot.records[name] = record
+                if access is None:
+                    snapshot.errors[name] = error
+                    continue
+                if invitations:
+                    try: self.add_invitations(record.name, access)
+                    except Exception as e:
+                        snapshot.errors[name] = str(e)
+                        continue
+                snapshot.repos[name] = access
+
+            print(f"Snapshot of {self.ORG_NAME}: {len(snapshot.repos)} repos, {len(snapshot.errors)} unreadable")
+            self.cached = snapshot
+            return snapshot
+
+    def resolve_logins(self, logins: Iterable[str]) -> dict[str, Optional[int]]:
+        """
+        Looks logins up in batches of GITHUB_LOGIN_BATCH_SIZE per GraphQL query instead of one REST call each.
+
+        Args: logins (Iterable[str]): The logins to look up.
+        Returns: dict[str, Optional[int]]: The user id of every login that exists, None for those that do not.
+            Logins whose lookup failed for another reason are left out.
+        Raises: Exception: If a batch could not be queried at all.
+        """
+
+        logins = list(dict.fromkeys(logins))
+        resolved = {login: None for login in logins if not LOGIN_PATTERN.match(login)}
+        logins = [login for login in logins if login not in resolved]
+
+        for start in range(0, len(logins), GITHUB_LOGIN_BATCH_SIZE):
+            batch = logins[start:start + GITHUB_LOGIN_BATCH_SIZE]
+            data, errors = self.query(users_query(len(batch)), {f'l{index}': login for index, login in enumerate(batch)})
+            missing = {error['path'][0] for error in errors if error.get('type') == 'NOT_FOUND' and error.get('path')}
+            for index, login in enumerate(batch):
+                user = data.get(f'u{index}')
+                if user is not None: resolved[login] = user.get('databaseId')
+                elif f'u{index}' in missing: resolved[login] = None
+        return resolved
+
+    def check_users_exist(self, logins: Iterable[str], users: Optional[uc.UserCache] = None) -> dict[str, bool]:
+        """
+        Checks whether GitHub users exist, a whole roster at a time.
+
+        Answers already in the user cache are reused; the rest are resolved with resolve_logins and written back to the
+        cache, so the per-user check_user_exists calls that follow (e.g. in add_user_to_repo) do not hit the API.
+
+        Args:
+            logins (Iterable[str]): The logins to check.
+            users (Optional[UserCache]): The user cache to read and fill, the shared one by default.
+        Returns: dict[str, bool]: Whether each login exists; logins that could not be checked are left out.
+        """
+
+        users = users or uc.default_user_cache
+        results, unknown = {}, []
+        for login in dict.fromkeys(login for login in logins if login):
+            cached = users.get(login)
+            if cached is not None: results[login] = cached[0]
+            else: unknown.append(login)
+
+        if unknown:
+            for login, user_id in self.resolve_logins(unknown).items():
+                users.put(login, user_id is not None, user_id)
+                results[login] = user_id is not None
+        return results
+
+    def invalidate(self):
+        """Drops the cached snapshot, e.g. after a bulk change made it stale."""
+        with self.lock: self.cached = None
@@ -3,8 +3,13 @@ import json
 import requests
 import csv
 import os
+import transport as tp
+import usercache as uc
+import github_graphql as gql
+import planner as pl
+from github import RepoAccess, RepoIndex, RepoRecord, build_repo_access
 
-from typing import Literal, Optional
+from typing import Iterator, Literal, Optional
 from dotenv import load_dotenv
 
 # =========================================== automation ==========================================
@@ -13,10 +18,19 @@ class Automation:
     GITHUB_PAT = None
     HEADERS = None
     ORG_NAME = None
+    transport = None
+    users = None
+    graphql = None
+    repos = None
+    mirror = None
     
-    def __init__(self, GITHUB_PAT: str, ORG_NAME: str):
+    def __init__(self, GITHUB_PAT: str, ORG_NAME: str, transport: Optional[tp.Transport] = None, users: Optional[uc.UserCache] = None):
         self.GITHUB_PAT = GITHUB_PAT
         self.ORG_NAME = ORG_NAME
+        self.transport = transport or tp.default_transport
+        self.users = users or uc.default_user_cache
+        self.graphql = gql.GithubGraphQL(GITHUB_PAT, ORG_NAME, self.transport)
+        self.repos = RepoIndex()
         self.HEADERS = {
             'Accept': 'application/vnd.github+json',
             'Authorization': f'Bearer {GITHUB_PAT}',
@@ -24,19 +38,36 @@ class Automation:
         }
         print(f"automation initialized with {GITHUB_PAT} and {ORG_NAME}")
     
-    def get_organization_repositories(self) -> list[str]:
+    def iter_organization_repository_records(self) -> Iterator[RepoRecord]:
         """
-        Retrieves a list of repositories belonging to the organization.
+        Yields the repositories belonging to the organization, page by page, as records (name, ssh_url, html_url, id, pushed_at).
+
+        Once the listing has been read to the end it replaces the repository index, so later lookups by name or URL
+        (e.g. get_repository_ssh_url) are answered without another request.
 
         Returns:
-            list[str]: A list of repository names belonging to the organization.
+            Iterator[RepoRecord]: The repository records, as each page arrives.
         """
-        try:
-            response = requests.get(
-                f'https://api.github.com/orgs/{self.ORG_NAME}/repos', headers=self.HEADERS, timeout=2)
+        records = []
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/orgs/{self.ORG_NAME}/repos', headers=self.HEADERS, timeout=10)
+        
+        while True:
+            try:
+                response = next(pages, None)
+            except requests.exceptions.ConnectionError:
+                raise ConnectionError("Failed to establish a connection to the GitHub API.")
+            except requests.exceptions.Timeout:
+                raise TimeoutError("The request to get repositories timed out.")
+            if response is None:
+                self.repos.replace(records)
+                return
             
             if response.status_code == 200:
-                return [repo['name'] for repo in response.json()]
+                for repo in response.json():
+                    record = RepoRecord.from_json(repo)
+                    records.append(record)
+                    yield record
             
             elif response.status_code == 404:
                 raise FileNotFoundError(f"Organization '{self.ORG_NAME}' not found.")
@@ -46,11 +77,43 @@ class Automation:
                 raise PermissionError("Forbidden: Rate limit exceeded.")
             else:
                 raise Exception(f"Failed to fetch repositories: {response.json().get('message', 'Unknown error')}")
-                
-        except requests.exceptions.ConnectionError:
-            raise ConnectionError("Failed to establish a connection to the GitHub API.")
-        except requests.exceptions.Timeout:
-            raise TimeoutError("The request to get repositories timed out.")
+    
+    def iter_organization_repositories(self) -> Iterator[str]:
+        """
+        Yields the names of the repositories belonging to the organization, page by page.
+
+        Returns:
+            Iterator[str]: The repository names, as each page arrives.
+        """
+        for record in self.iter_organization_repository_records(): yield record.name
+    
+    def get_organization_repository_records(self, refresh: bool = False, since=None) -> list[RepoRecord]:
+        """
+        Retrieves the records of the repositories belonging to the organization, from the index while it is fresh.
+
+        Args:
+            refresh (bool): Re-list even if the index is fresh.
+            since (Optional[str | datetime]): Only return repositories pushed to after this time. pushed_at only moves on a
+                git push, not when collaborators or invitations change, so passes over access must not filter on it.
+
+        Returns:
+            list[RepoRecord]: The repository records.
+        """
+        try:
+            records = self.repos.records() if self.repos.fresh() and not refresh else list(self.iter_organization_repository_records())
+        except Exception as e:
+            raise Exception(f"Failed to fetch repositories: {e}") from e
+        return [record for record in records if record.changed_since(since)]
+    
+    def get_organization_repositories(self) -> list[str]:
+        """
+        Retrieves a list of repositories belonging to the organization.
+
+        Returns:
+            list[str]: A list of repository names belonging to the organization.
+        """
+        try:
+            return list(self.iter_organization_repositories())
         except Exception as e:
             raise Exception(f"Failed to fetch repositories: {e}") from e
     
@@ -64,10 +127,14 @@ class Automation:
         Returns:
             str: The SSH URL of the repository.
         """
+        record = self.repos.get(repo_name)
+        if record is not None: return record.ssh_url
+        
         try:
-            url = f'https://api.github.com/repos/{self.ORG_NAME}/{repo_name}'
-            response = requests.get(url, headers=self.HEADERS, timeout=2)
+            url = f'{tp.GITHUB_API_URL}/repos/{self.ORG_NAME}/{repo_name}'
+            response = self.transport.get(url, headers=self.HEADERS, timeout=2)
             if response.status_code == 200:
+                self.repos.add(RepoRecord.from_json(response.json()))
                 return response.json()['ssh_url']
             
             elif response.status_code == 404:
@@ -108,7 +175,7 @@ class Automation:
 
     def check_user_exists(self, user: str) -> tuple[int, Optional[str]]:
         """
-        Checks if a GitHub user exists.
+        Checks if a GitHub user exists. Definite answers (200 / 404) are memoized in the user cache.
 
         Args:
             user (str): The username of the GitHub user to check.
@@ -117,11 +184,17 @@ class Automation:
             Tuple[int, Optional[str]]: A tuple containing the HTTP status code and an optional error message.
         """
 
-        response = requests.get(
-            f'https://api.github.com/users/{user}', headers=self.HEADERS, timeout=2)
+        cached = self.users.get(user)
+        if cached is not None:
+            return (200, None) if cached[0] else (404, f'User does not exist: {user}')
+
+        response = self.transport.get(
+            f'{tp.GITHUB_API_URL}/users/{user}', headers=self.HEADERS, timeout=2)
         if response.status_code == 200:
+            self.users.put(user, True, response.json().get('id'))
             return 200, None
         elif response.status_code == 404:
+            self.users.put(user, False)
             return 404, f'User does not exist: {response.json()}'
         elif response.status_code == 401:
             return 401, f'Unauthorized: Invalid GitHub PAT, {response.json()}'
@@ -156,13 +229,13 @@ class Automation:
                 return status_code, error_message
 
             # Add the user to the project with the specified permission
-            response = requests.put(f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
+            response = self.transport.put(f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
                                     headers=self.HEADERS,
                                     json={'permission': permission}, timeout=2)
             if response.status_code == 201:
-                return response.status_code, 'User added to the project with the specified permission'
+                return response.status_code, tp.note_retries('User added to the project with the specified permission', response)
             elif response.status_code == 204:
-                return response.status_code, 'User permission updated'
+                return response.status_code, tp.note_retries('User permission updated', response)
             else:
                 return response.status_code, response.json()
         except Exception as e:
@@ -171,7 +244,7 @@ class Automation:
     def add_user_to_repos(self, ssh_urls: list[str], user: str, permission: Literal['pull', 'triage', 'push', 'maintain', 'admin']) -> list[tuple[int, str]]:    
         return [self.add_user_to_repo(ssh_url, user, permission) for ssh_url in ssh_urls]
     
-    def revoke_user_invitation(self, ssh_url: str, user: str) -> tuple[int, Optional[str]]:
+    def revoke_user_invitation(self, ssh_url: str, user: str, access: Optional[RepoAccess] = None) -> tuple[int, Optional[str]]:
         """
         Revokes an invitation to collaborate on a GitHub repository.
 
@@ -180,6 +253,8 @@ class Automation:
         Args:
             ssh_url (str): The SSH URL of the GitHub repository.
             user (str): The username of the GitHub user to revoke the invitation for.
+            access (Optional[RepoAccess]): A snapshot of the repository; when given, the invitation id is taken from it
+                and the revoke costs a single call.
 
         Returns:
             Tuple[int, Optional[str]]: A tuple containing the HTTP status code and an optional error message.
@@ -191,32 +266,45 @@ class Automation:
         try:
             username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
 
+            if access is not None:
+                if not access.is_invited(user):
+                    return 404, 'User has not been invited to collaborate on the repository.'
+                revoke_response = self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{access.invitation_id(user)}',
+                    headers=self.HEADERS,
+                    timeout=2
+                )
+                if revoke_response.status_code == 204:
+                    access.remove_invitation(user)
+                    return revoke_response.status_code, tp.note_retries('User invitation revoked successfully', revoke_response)
+                return revoke_response.status_code, revoke_response.json()
+
             status_code, error_message = self.check_user_exists(user)
             if error_message:
                 return status_code, error_message
 
             # Check if the user has been invited to collaborate on the specified repository
-            invited_collaborators_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/invitations',
+            for invited_collaborators_response in self.transport.paginate(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
                 headers=self.HEADERS,
                 timeout=2
-            )
-            if invited_collaborators_response.status_code != 200:
-                return invited_collaborators_response.status_code, 'Failed to fetch invited collaborators'
-            
-            invited_collaborators = invited_collaborators_response.json()
-            for invited_collaborator in invited_collaborators:
-                if invited_collaborator['invitee']['login'] == user:
-                    # Revoke the user's invitation
-                    revoke_response = requests.delete(
-                        f'https://api.github.com/repos/{username}/{repo_name}/invitations/{invited_collaborator["id"]}',
-                        headers=self.HEADERS,
-                        timeout=2
-                    )
-                    if revoke_response.status_code == 204:
-                        return revoke_response.status_code, 'User invitation revoked successfully'
-                    else:
-                        return revoke_response.status_code, revoke_response.json()
+            ):
+                if invited_collaborators_response.status_code != 200:
+                    return invited_collaborators_response.status_code, 'Failed to fetch invited collaborators'
+                
+                invited_collaborators = invited_collaborators_response.json()
+                for invited_collaborator in invited_collaborators:
+                    if invited_collaborator['invitee']['login'] == user:
+                        # Revoke the user's invitation
+                        revoke_response = self.transport.delete(
+                            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations/{invited_collaborator["id"]}',
+                            headers=self.HEADERS,
+                            timeout=2
+                        )
+                        if revoke_response.status_code == 204:
+                            return revoke_response.status_code, tp.note_retries('User invitation revoked successfully', revoke_response)
+                        else:
+                            return revoke_response.status_code, revoke_response.json()
 
             return 404, 'User has not been invited to collaborate on the repository.'
         except requests.exceptions.Timeout:
@@ -249,16 +337,16 @@ class Automation:
                 return status_code, error_message
             
             # Check if the user has permissions on the specified repository
-            permissions_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
+            permissions_response = self.transport.get(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
             if permissions_response.status_code != 200:
                 return permissions_response.status_code, 'Nothing to do - User does not have permissions on the repository.'
 
             # Remove the user from the repository
-            remove_response = requests.delete(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}', headers=self.HEADERS, timeout=2)
+            remove_response = self.transport.delete(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}', headers=self.HEADERS, timeout=2)
             if remove_response.status_code == 204:
-                return remove_response.status_code, 'User removed from the repository successfully'
+                return remove_response.status_code, tp.note_retries('User removed from the repository successfully', remove_response)
             else:
                 return remove_response.status_code, remove_response.json()
         except requests.exceptions.Timeout:
@@ -287,8 +375,8 @@ class Automation:
         # Attempt to remove each collaborator
         for collaborator in collaborators:
             try:
-                remove_response = requests.delete(
-                    f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{collaborator}',
+                remove_response = self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{collaborator}',
                     headers=self.HEADERS,
                     timeout=2
                 )
@@ -327,8 +415,8 @@ class Automation:
                 return status_code, error_message
 
             # Check if the user has permissions on the specified repository
-            permissions_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
+            permissions_response = self.transport.get(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
             if permissions_response.status_code == 200:
                 # User has permissions on the repository, remove them
                 return self.remove_user_from_repo(ssh_url, user)
@@ -342,17 +430,17 @@ class Automation:
         except Exception as e:
             return -1, str(e)
     
-    def get_users_on_repo(self, ssh_url: str) -> set[str]:
+    def iter_users_on_repo(self, ssh_url: str) -> Iterator[str]:
         """
-        Retrieves a set of GitHub usernames who are collaborators on a given repository.
+        Yields the GitHub usernames of the collaborators on a given repository, page by page.
 
-        This function extracts the username and repository name from the provided SSH URL. It then makes a request to the GitHub API to fetch the list of collaborators on the specified repository. The function returns a set of GitHub usernames who have access to the repository.
+        Requests 100 collaborators per page and follows the Link header, so callers can start working on the first page before the rest of the listing has arrived.
 
         Args:
             ssh_url (str): The SSH URL of the GitHub repository.
 
         Returns:
-            set[str]: A set of GitHub usernames who are collaborators on the repository.
+            Iterator[str]: The GitHub usernames of the collaborators, as each page arrives.
 
         Raises:
             Exception: If an error occurs during the API request or while processing the response.
@@ -360,68 +448,92 @@ class Automation:
         username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
 
         # Get the list of collaborators on the repository
-        try:
-            print(f"Fetching collaborators for {username}/{repo_name}")
-            print(f'Headers: {self.HEADERS}')
-            collaborators_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators',
-                headers=self.HEADERS,
-                timeout=10
-            )
-        except requests.exceptions.Timeout as e:
-            raise TimeoutError(
-                "The request to get collaborators timed out.") from e
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(
-                "Failed to establish a connection to the GitHub API.") from e
-        except requests.exceptions.RequestException as e:
-            raise Exception(
-                f"An error occurred while making the request: {e}") from e
-        except Exception as e:
-            raise Exception(
-                f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}") from e
-
-        if collaborators_response.status_code == 200:
-            collaborators = {collaborator['login']
-                            for collaborator in collaborators_response.json()}
-            return collaborators
-        elif collaborators_response.status_code == 404:
-            raise FileNotFoundError("The repository was not found.")
-        elif collaborators_response.status_code == 403:
-            raise PermissionError("Access to the repository is forbidden.")
-        else:
-            raise Exception(
-                f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+        print(f"Fetching collaborators for {username}/{repo_name}")
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators',
+            headers=self.HEADERS,
+            timeout=10
+        )
         
-    def get_users_invited_repo(self, ssh_url: str) -> set[str]:
+        while True:
+            try:
+                collaborators_response = next(pages, None)
+            except requests.exceptions.Timeout as e:
+                raise TimeoutError(
+                    "The request to get collaborators timed out.") from e
+            except requests.exceptions.ConnectionError as e:
+                raise ConnectionError(
+                    "Failed to establish a connection to the GitHub API.") from e
+            except requests.exceptions.RequestException as e:
+                raise Exception(
+                    f"An error occurred while making the request: {e}") from e
+            if collaborators_response is None: return
+
+            if collaborators_response.status_code == 200:
+                for collaborator in collaborators_response.json(): yield collaborator['login']
+            elif collaborators_response.status_code == 404:
+                raise FileNotFoundError("The repository was not found.")
+            elif collaborators_response.status_code == 403:
+                raise PermissionError("Access to the repository is forbidden.")
+            else:
+                raise Exception(
+                    f"Failed to fetch collaborators: {collaborators_response.json().get('message', 'Unknown error')}")
+    
+    def get_users_on_repo(self, ssh_url: str) -> set[str]:
         """
-        Retrieves a set of GitHub usernames who are invited collaborators on a given repository.
+        Retrieves a set of GitHub usernames who are collaborators on a given repository.
 
-        This function extracts the username and repository name from the provided SSH URL. It then makes a request to the GitHub API to fetch the list of invited collaborators on the specified repository. The function returns a set of GitHub usernames who have been invited to collaborate on the repository.
+        Answered from the webhook mirror when it is seeded and knows the repository, otherwise listed from the API.
 
         Args:
             ssh_url (str): The SSH URL of the GitHub repository.
 
         Returns:
-            set[str]: A set of GitHub usernames who are invited collaborators on the repository.
+            set[str]: A set of GitHub usernames who are collaborators on the repository.
 
         Raises:
             Exception: If an error occurs during the API request or while processing the response.
         """
+        mirrored = self.mirror.collaborators(ssh_url) if self.mirror else None
+        if mirrored is not None: return mirrored
+        return set(self.iter_users_on_repo(ssh_url))
+    
+    def iter_invitations(self, ssh_url: str) -> Iterator[dict]:
+        """
+        Yields the pending invitations on a given repository, page by page.
 
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+
+        Returns:
+            Iterator[dict]: The invitation objects returned by the GitHub API, as each page arrives.
+
+        Raises:
+            Exception: If an error occurs during the API request or while processing the response.
+        """
         username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
+        pages = self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/invitations',
+            headers=self.HEADERS,
+            timeout=10
+        )
+
+        while True:
+            try:
+                invited_collaborators_response = next(pages, None)
+            except requests.exceptions.Timeout as e:
+                raise TimeoutError(
+                    "The request to get invited collaborators timed out.") from e
+            except requests.exceptions.ConnectionError as e:
+                raise ConnectionError(
+                    "Failed to establish a connection to the GitHub API.") from e
+            except requests.exceptions.RequestException as e:
+                raise Exception(
+                    f"An error occurred while making the request: {e}") from e
+            if invited_collaborators_response is None: return
 
-        try:
-            invited_collaborators_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/invitations',
-                headers=self.HEADERS,
-                timeout=10
-            )
-            print(json.dumps(invited_collaborators_response.json(), indent=4))
             if invited_collaborators_response.status_code == 200:
-                invited_collaborators = {invited_collaborators['invitee']['login']
-                                        for invited_collaborators in invited_collaborators_response.json()}
-                return invited_collaborators
+                yield from invited_collaborators_response.json()
             elif invited_collaborators_response.status_code == 404:
                 raise FileNotFoundError("The repository was not found.")
             elif invited_collaborators_response.status_code == 403:
@@ -429,56 +541,45 @@ class Automation:
             else:
                 raise Exception(
                     f"Failed to fetch invited collaborators: {invited_collaborators_response.json().get('message', 'Unknown error')}")
-                
-        except requests.exceptions.Timeout as e:
-            raise TimeoutError(
-                "The request to get invited collaborators timed out.") from e
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(
-                "Failed to establish a connection to the GitHub API.") from e
-        except requests.exceptions.RequestException as e:
-            raise Exception(
-                f"An error occurred while making the request: {e}") from e
-        except Exception as e:
-            raise Exception(
-                f"Failed to fetch invited collaborators: {invited_collaborators_response.json().get('message', 'Unknown error')}") from e
+    
+    def iter_users_invited_repo(self, ssh_url: str, expired_only: bool = False) -> Iterator[str]:
+        """
+        Yields the GitHub usernames who are invited collaborators on a given repository, page by page.
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+            expired_only (bool): If True, only yield users whose invitation has expired.
+
+        Returns:
+            Iterator[str]: The GitHub usernames of the invitees, as each page arrives.
+        """
+        for invitation in self.iter_invitations(ssh_url):
+            if not expired_only or invitation["expired"]: yield invitation['invitee']['login']
+        
+    def get_users_invited_repo(self, ssh_url: str) -> set[str]:
+        """
+        Retrieves a set of GitHub usernames who are invited collaborators on a given repository.
+
+        Answered from the webhook mirror when it is seeded and knows the repository, otherwise listed from the API.
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+
+        Returns:
+            set[str]: A set of GitHub usernames who are invited collaborators on the repository.
+
+        Raises:
+            Exception: If an error occurs during the API request or while processing the response.
+        """
+        mirrored = self.mirror.invitees(ssh_url) if self.mirror else None
+        if mirrored is not None: return mirrored
+        return set(self.iter_users_invited_repo(ssh_url))
     
     def get_expired_invited_collaborators(self, ssh_url: str) -> set[str]:
         """same as get_users_invited_repo but only returns expired invites"""
-        username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
-
-        try:
-            invited_collaborators_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/invitations',
-                headers=self.HEADERS,
-                timeout=10
-            )
-            if invited_collaborators_response.status_code == 200:
-                invited_collaborators = {invited_collaborators['invitee']['login'] if invited_collaborators["expired"] else None
-                                        for invited_collaborators in invited_collaborators_response.json()} - {None}
-                return invited_collaborators
-            elif invited_collaborators_response.status_code == 404:
-                raise FileNotFoundError("The repository was not found.")
-            elif invited_collaborators_response.status_code == 403:
-                raise PermissionError("Access to the repository is forbidden.")
-            else:
-                raise Exception(
-                    f"Failed to fetch invited collaborators: {invited_collaborators_response.json().get('message', 'Unknown error')}")
-                
-        except requests.exceptions.Timeout as e:
-            raise TimeoutError(
-                "The request to get invited collaborators timed out.") from e
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(
-                "Failed to establish a connection to the GitHub API.") from e
-        except requests.exceptions.RequestException as e:
-            raise Exception(
-                f"An error occurred while making the request: {e}") from e
-        except Exception as e:
-            raise Exception(
-                f"Failed to fetch invited collaborators: {invited_collaborators_response.json().get('message', 'Unknown error')}") from e
+        return set(self.iter_users_invited_repo(ssh_url, expired_only=True))
     
-    def change_user_permission(self, ssh_url: str, user: str, permission: Literal['pull', 'triage', 'push', 'maintain', 'admin']) -> tuple[int, Optional[str]]:
+    def change_user_permission(self, ssh_url: str, user: str, permission: Literal['pull', 'triage', 'push', 'maintain', 'admin'], access: Optional[RepoAccess] = None) -> tuple[int, Optional[str]]:
         """
         Changes the permission level of a user on a GitHub repository.
 
@@ -488,6 +589,8 @@ class Automation:
             ssh_url (str): The SSH URL of the GitHub repository.
             user (str): The username of the GitHub user to change the permission level for.
             permission (Literal['pull', 'triage', 'push', 'maintain', 'admin']): The new permission level to assign to the user.
+            access (Optional[RepoAccess]): A snapshot of the repository; when given, the existence and permission checks
+                are answered from it and the change costs a single call.
 
         Returns:
             Tuple[int, Optional[str]]: A tuple containing the HTTP status code and an optional error message.
@@ -499,27 +602,33 @@ class Automation:
         try:
             username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
 
-            status_code, error_message = self.check_user_exists(user)
-            if error_message:
-                return status_code, error_message
+            if access is not None:
+                if not access.is_collaborator(user):
+                    return 404, 'User does not have permissions on the repository.'
+            else:
+                status_code, error_message = self.check_user_exists(user)
+                if error_message:
+                    return status_code, error_message
 
-            # Check if the user has permissions on the specified repository
-            permissions_response = requests.get(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
-            if permissions_response.status_code != 200:
-                return permissions_response.status_code, 'User does not have permissions on the repository.'
+                # Check if the user has permissions on the specified repository
+                permissions_response = self.transport.get(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}/permission', headers=self.HEADERS, timeout=2)
+                if permissions_response.status_code != 200:
+                    return permissions_response.status_code, 'User does not have permissions on the repository.'
 
             # Change the user's permission level
-            change_permission_response = requests.put(
-                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
+            change_permission_response = self.transport.put(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
                 headers=self.HEADERS,
                 json={'permission': permission},
                 timeout=2
             )
+            if change_permission_response.status_code in (200, 204) and access is not None:
+                access.add_collaborator(user, permission)
             if change_permission_response.status_code == 200:
-                return change_permission_response.status_code, 'User permission level changed successfully'
+                return change_permission_response.status_code, tp.note_retries('User permission level changed successfully', change_permission_response)
             elif change_permission_response.status_code == 204:
-                return change_permission_response.status_code, 'User permission level updated'
+                return change_permission_response.status_code, tp.note_retries('User permission level updated', change_permission_response)
             else:
                 return change_permission_response.status_code, change_permission_response.json()
         except requests.exceptions.Timeout:
@@ -551,114 +660,288 @@ class Automation:
         except Exception as e:
             result.append((-1, str(e)))
     
-    def set_repo_users(self, ssh_url: str, desired_users: set[str]) -> list[tuple[int, str]]:
+    def get_repo_access(self, ssh_url: str) -> RepoAccess:
+        """
+        Fetches a snapshot of a repository's collaborators (with permissions) and pending invitations (with ids).
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+
+        Returns:
+            RepoAccess: The collaborators and invitations on the repository.
+        Raises:
+            Exception: If either listing fails.
+        """
+        username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
+        collaborators = []
+        for response in self.transport.paginate(
+            f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators', headers=self.HEADERS, timeout=10
+        ):
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch collaborators: {response.json().get('message', 'Unknown error')}")
+            collaborators.extend(response.json())
+        
+        return build_repo_access(ssh_url, collaborators, self.iter_invitations(ssh_url))
+    
+    def plan_repo_users(self, ssh_url: str, desired_users: set[str], revoke: bool = False) -> pl.Plan:
+        """
+        Works out the minimal changes that give exactly the desired users write access to a repository, without making them.
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+            desired_users (set[str]): A set of usernames that should have access to the repository.
+            revoke (bool): Remove users not in the desired set (and withdraw their invitations) instead of downgrading them to 'pull'.
+
+        Returns:
+            Plan: The operations to run, see planner.plan_repo_users.
+        """
+        return pl.plan_repo_users(self.get_repo_access(ssh_url), set(desired_users), revoke)
+    
+    def apply_operation(self, ssh_url: str, operation: pl.Operation, access: RepoAccess) -> tuple[int, str]:
+        """Runs one planned operation: a single write call."""
+        username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
+        user = operation.user
+        try:
+            if operation.action == 'uninvite':
+                return self.revoke_user_invitation(ssh_url, user, access)
+            
+            if operation.action == 'remove':
+                response = self.transport.delete(
+                    f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}', headers=self.HEADERS, timeout=2)
+                if response.status_code == 204:
+                    access.collaborators.pop(user.lower(), None)
+                    return 204, tp.note_retries(f"{user} removed successfully", response)
+                return response.status_code, f"Failed to remove {user}"
+            
+            response = self.transport.put(
+                f'{tp.GITHUB_API_URL}/repos/{username}/{repo_name}/collaborators/{user}',
+                headers=self.HEADERS,
+                json={'permission': operation.permission},
+                timeout=2
+            )
+            if response.status_code == 201:
+                access.add_invitation(user, response.json().get('id'))
+                return 201, tp.note_retries(f"{user} invited with {operation.permission}", response)
+            elif response.status_code == 204:
+                access.add_collaborator(user, operation.permission)
+                return 204, tp.note_retries(f"{user} changed from {operation.current} to {operation.permission}", response)
+            return response.status_code, f"Failed to {operation.action} {user}"
+        except requests.exceptions.Timeout:
+            return -1, "Request timed out"
+        except Exception as e:
+            return -1, str(e)
+    
+    def apply_plan(self, ssh_url: str, plan: pl.Plan) -> list[tuple[int, str]]:
         """
-        Sets the repository to only have the specified users. Removes users not in the desired list and adds users missing from the repository.
+        Runs the operations of a plan from plan_repo_users, recording their results on it.
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+            plan (Plan): The plan to run.
+
+        Returns:
+            list[tuple[int, str]]: A list of tuples, each containing the HTTP status code and a message for one operation.
+        """
+        access = plan.access or self.get_repo_access(ssh_url)
+        plan.results = [self.apply_operation(ssh_url, operation, access) for operation in plan.operations]
+        print(f"{ssh_url}: {len(plan.operations)} operations, {len(plan.unchanged)} users unchanged, {plan.skipped} API calls skipped")
+        return plan.results
+    
+    def set_repo_users(self, ssh_url: str, desired_users: set[str], revoke: bool = False) -> list[tuple[int, str]]:
+        """
+        Sets the repository to only have the specified users with write access: users not in the desired list are set to read-only
+        (or removed, with revoke) and missing users are added.
+
+        Only the changes that are actually needed are made; users who already have the right access cost nothing.
 
         Args:
             ssh_url (str): The SSH URL of the GitHub repository.
             desired_users (set[str]): A set of usernames that should have access to the repository.
+            revoke (bool): Remove users not in the desired list (and withdraw their invitations) instead of downgrading them to 'pull'.
 
         Returns:
             list[tuple[int, str]]: A list of tuples, each containing the HTTP status code and a message indicating the success or failure of each operation.
         """
-        desired_users = set(desired_users)
         try:
-            current_users = self.get_users_on_repo(ssh_url)
+            plan = self.plan_repo_users(ssh_url, desired_users, revoke)
         except Exception as e:
             return [(-1, str(e))]
+        
+        print(f"Plan for {ssh_url}: {[operation.describe() for operation in plan.operations]}")
+        return self.apply_plan(ssh_url, plan)
 
-        username, repo_name = self.extract_user_repo_from_ssh(ssh_url)
+    def reinvite_expired_users_on_repo(self, ssh_url: str, access: Optional[RepoAccess] = None) -> list[tuple[int, str]]:
+        """
+        Re-invites the users whose invitations to a repository have expired.
+
+        Args:
+            ssh_url (str): The SSH URL of the GitHub repository.
+            access (Optional[RepoAccess]): A snapshot of the repository's invitations; listed from the API when not given.
+
+        Returns:
+            list[tuple[int, str]]: A list of tuples, each containing the HTTP status code and a message for one re-invited user.
+        Raises:
+            Exception: If the invitations could not be listed.
+        """
+        if access is None:
+            access = RepoAccess(ssh_url)
+            for invitation in self.iter_invitations(ssh_url):
+                access.add_invitation(invitation['invitee']['login'], invitation['id'], invitation['expired'])
 
         result = []
+        print(f"Invited collaborators for {ssh_url}: {access.expired_users()}")
+        for user in access.expired_users():
+            remove_res = self.revoke_user_invitation(ssh_url, user, access)
+            res = self.add_user_to_repo(ssh_url, user, 'push')
+            result.append(res)
+        return result
 
-        # Remove users not in the desired list
-        #for user in current_users:
-        #    if user not in desired_users:
-        #        try:
-        #            remove_response = requests.delete(
-        #                f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
-        #                headers=self.HEADERS,
-        #                timeout=2
-        #            )
-        #            if remove_response.status_code == 204:
-        #                result.append((204, f"{user} removed successfully"))
-        #            else:
-        #                result.append((remove_response.status_code,
-        #                            f"Failed to remove {user}"))
-        #        except Exception as e:
-        #            result.append((-1, str(e)))
-        
-        # Change permission of users not in the desired list to 'pull'
-        
-        print(f"Current users: {current_users}")
-        
-        for user in current_users:
-            if user not in desired_users:
-                res = self.change_user_permission(ssh_url, user, 'pull')
-                result.append(res)
-        
-        print(f"Desired users: {desired_users}")
-        
-        # ensure all current users have write access
-        for user in current_users:
-            if user in desired_users:
-                res = self.change_user_permission(ssh_url, user, 'push')
-                result.append(res)
+    def plan_reinvite_all_expired_users(self, refresh: bool = False) -> pl.BulkPlan:
+        """
+        Works out which expired invitations reinvite_all_expired_users_to_repos would re-send, without sending them.
+
+        GraphQL does not expose repository invitations, so an organization snapshot saves nothing here: the plan lists the
+        repositories (from the index unless refresh is set) and then the invitations of every repository. Invitations
+        expire without a push, so no repository is skipped by pushed_at; instead the invitation listings are conditional
+        requests through the transport's ETag cache, so re-planning within the cache's lifetime costs 304s, which don't
+        count against the rate limit.
+
+        Args:
+            refresh (bool): Re-list the repositories even if the index is fresh.
+
+        Returns:
+            BulkPlan: One 'reinvite' operation (a revoke plus an add) per expired invitation.
+        """
+        before = self.transport.requests
+        plan = pl.BulkPlan('reinvite', {})
+        for record in self.get_organization_repository_records(refresh=refresh):
+            access = RepoAccess(record.ssh_url)
+            try:
+                for invitation in self.iter_invitations(record.ssh_url):
+                    access.add_invitation(invitation['invitee']['login'], invitation['id'], invitation['expired'])
+            except Exception as e:
+                plan.errors.append((record.name, str(e)))
+                continue
+            expired = access.expired_users()
+            plan.unchanged += len(access.invitations) - len(expired)
+            if not expired: continue
+            plan.accesses[record.ssh_url] = access
+            for user in expired:
+                plan.operations.append(pl.Operation('reinvite', user, 'push', 'expired', record.ssh_url, record.name))
+        plan.planning_calls = self.transport.requests - before
+        return plan
+    
+    def plan_all_repos_users_read_only(self, refresh: bool = False) -> pl.BulkPlan:
+        """
+        Works out which collaborators set_all_repos_users_read_only would downgrade, without changing anything.
+
+        Args:
+            refresh (bool): Take a new snapshot even if a cached one is fresh.
+
+        Returns:
+            BulkPlan: One 'downgrade' operation per collaborator above read access.
+        """
+        before = self.transport.requests
+        snapshot = self.graphql.snapshot(invitations=False, refresh=refresh)
+        self.repos.replace(list(snapshot.records.values()))
         
-        # Add missing users
-        for user in desired_users-current_users:
-            if user not in current_users:
-                try:
-                    add_response = requests.put(
-                        f'https://api.github.com/repos/{username}/{repo_name}/collaborators/{user}',
-                        headers=self.HEADERS,
-                        timeout=2
-                    )
-                    if add_response.status_code in [201, 204]:
-                        result.append((add_response.status_code,
-                                    f"{user} added successfully"))
-                    else:
-                        result.append((add_response.status_code,
-                                    f"Failed to add {user}"))
-                except Exception as e:
-                    result.append((-1, str(e)))
+        plan = pl.BulkPlan('read_only', {}, errors=list(snapshot.errors.items()))
+        for repo, access in snapshot.repos.items():
+            record = snapshot.record(repo)
+            plan.accesses[record.ssh_url] = access
+            for user in access.users():
+                operation = pl.change_operation(access, user, 'pull', record.ssh_url, record.name)
+                if operation is None: plan.unchanged += 1
+                else: plan.operations.append(operation)
+        plan.planning_calls = self.transport.requests - before
+        return plan
+    
+    def execute_plan(self, plan: pl.BulkPlan) -> list[tuple[str, int, str]]:
+        """
+        Applies exactly the operations of a plan from plan_reinvite_all_expired_users or plan_all_repos_users_read_only.
+
+        Args:
+            plan (BulkPlan): The plan to run.
 
+        Returns:
+            list[tuple[str, int, str]]: A list of tuples, each containing the repository name, HTTP status code, and a message indicating the success or failure of the operation.
+        """
+        result = [self.execute_operation(plan, operation) for operation in plan.operations]
+        
+        # re-sent invitations have new ids
+        if plan.kind == 'reinvite': self.graphql.invalidate()
         return result
+    
+    def execute_operation(self, plan: pl.BulkPlan, operation: pl.Operation) -> tuple[str, int, str]:
+        """
+        Applies one operation of a plan from plan_reinvite_all_expired_users or plan_all_repos_users_read_only.
 
-    def reinvite_all_expired_users_to_repos(self):
+        Returns:
+            tuple[str, int, str]: The repository name, HTTP status code, and a message.
+        """
+        access = plan.accesses.get(operation.repo)
+        if operation.action == 'reinvite':
+            remove_res = self.revoke_user_invitation(operation.repo, operation.user, access)
+            res = self.add_user_to_repo(operation.repo, operation.user, operation.permission)
+        else:
+            res = self.change_user_permission(operation.repo, operation.user, operation.permission, access)
+        return operation.project, res[0], res[1]
+    
+    def reinvite_all_expired_users_to_repos(self, bulk: bool = False):
         """
         Re-invites all users who have had their invitations expire to all repositories in the organization.
 
+        In bulk mode the whole plan (plan_reinvite_all_expired_users) is worked out before anything is re-sent; it makes the
+        same calls as the per-repository walk (one invitation listing per repository, see bench/README.md).
+
+        Args:
+            bulk (bool): Whether to plan every reinvite up front.
+
         Returns:
             list[tuple[str, int, str]]: A list of tuples, each containing the repository name, HTTP status code, and a message indicating the success or failure of the operation.
         """
-        repositories = self.get_organization_repositories()
+        if bulk:
+            try:
+                plan = self.plan_reinvite_all_expired_users(refresh=True)
+            except Exception as e:
+                print(f"Planning failed, falling back to per-repository reinvites: {e}")
+            else:
+                return [(repo, -1, error) for repo, error in plan.errors] + self.execute_plan(plan)
+
         result = []
-        for repo in repositories:
-            ssh_url = self.get_repository_ssh_url(repo)
+        for record in self.get_organization_repository_records(refresh=True):
+            repo, ssh_url = record.name, record.ssh_url
             try:
-                invited_collaborators = self.get_expired_invited_collaborators(ssh_url)
-                print(f"Invited collaborators for {repo}: {invited_collaborators}")
-                for user in invited_collaborators:
-                    remove_res = self.revoke_user_invitation(ssh_url, user)
-                    res = self.add_user_to_repo(ssh_url, user, 'push')
+                for res in self.reinvite_expired_users_on_repo(ssh_url):
                     result.append((repo, res[0], res[1]))
             except Exception as e:
                 result.append((repo, -1, str(e)))
         return result
 
-    def set_all_repos_users_read_only(self):
+    def set_all_repos_users_read_only(self, bulk: bool = True):
         """
         Sets all users in all repositories to read-only access.
 
+        In bulk mode every collaborator and permission is read from an organization snapshot (without invitations, which
+        are not needed here), and users who already have read access are skipped.
+
+        Args:
+            bulk (bool): Whether to use the organization snapshot.
+
         Returns:
             list[tuple[str, int, str]]: A list of tuples, each containing the repository name, HTTP status code, and a message indicating the success or failure of the operation.
         """
-        repositories = self.get_organization_repositories()
+        if bulk:
+            try:
+                plan = self.plan_all_repos_users_read_only(refresh=True)
+            except Exception as e:
+                print(f"Snapshot failed, falling back to per-repository lookups: {e}")
+            else:
+                return [(repo, -1, error) for repo, error in plan.errors] + self.execute_plan(plan)
+
         result = []
-        for repo in repositories:
-            ssh_url = self.get_repository_ssh_url(repo)
+        for record in self.get_organization_repository_records(refresh=True):
+            repo, ssh_url = record.name, record.ssh_url
             try:
                 collaborators = self.get_users_on_repo(ssh_url)
                 for user in collaborators:
@@ -0,0 +1,129 @@
+# =========================================== imports =============================================
+
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+from dotenv import load_dotenv
+import database as db
+import github_rest as gh
+import planner as pl
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_JOB_WORKERS = int(os.getenv('GITHUB_JOB_WORKERS', 8))
+
+# const
+REINVITE = 'reinvite'
+
+def checkpoint_item(operation: pl.Operation) -> str:
+    """The job_checkpoint item of one reinvite, '<repo>/<login>'."""
+    return f"{operation.project}/{operation.user.lower()}"
+
+# =========================================== jobs ================================================
+
+class ReinviteJobs:
+    """
+    Runs the org-wide expired-invitation sweep as a background job.
+
+    The job applies the operations of a reinvite plan, the repositories in parallel on a pool of `workers` threads. Every
+    re-sent invitation is checkpointed to the job_checkpoint table, so a job interrupted by a crash or redeploy picks up
+    where it stopped when resumed.
+    """
+
+    def __init__(self, automation: gh.Automation, workers: int = GITHUB_JOB_WORKERS):
+        self.automation = automation
+        self.workers = workers
+        self.running = {}
+        self.lock = threading.Lock()
+
+    def start(self, workers: Optional[int] = None) -> str:
+        """
+        Queues a new reinvite job and starts it in the background.
+
+        Args:
+            workers (Optional[int]): How many repositories to process at once, GITHUB_JOB_WORKERS by default.
+        Returns: str: The job id, to be polled with status().
+        """
+
+        job_id = uuid.uuid4().hex
+        workers = workers or self.workers
+        db.create_job(job_id, REINVITE, workers)
+        self.launch(job_id, workers)
+        return job_id
+
+    def resume(self) -> list[str]:
+        """
+        Restarts every reinvite job that was queued or running when the app last stopped.
+
+        Returns: list[str]: The ids of the resumed jobs.
+        """
+
+        resumed = []
+        for job_id, workers in db.unfinished_jobs(REINVITE):
+            if self.launch(job_id, workers or self.workers): resumed.append(job_id)
+        if resumed: print(f"Resumed reinvite jobs: {resumed}")
+        return resumed
+
+    def launch(self, job_id: str, workers: int) -> bool:
+        with self.lock:
+            if job_id in self.running: return False
+            thread = threading.Thread(target=self.run, args=(job_id, workers), name=f"job-{job_id}", daemon=True)
+            self.running[job_id] = thread
+        thread.start()
+        return True
+
+    def reinvite_repo(self, job_id: str, plan: pl.BulkPlan, operations: list[pl.Operation]):
+        """Re-sends one repository's expired invitations in order, checkpointing each one as it finishes."""
+        for operation in operations:
+            try: repo, status, message = self.automation.execute_operation(plan, operation)
+            except Exception as e: status, message = -1, str(e)
+            db.checkpoint_job(job_id, checkpoint_item(operation), [status, message])
+
+    def run(self, job_id: str, workers: int):
+        """
+        Plans the sweep (the same plan_reinvite_all_expired_users as POST /reinvite_expired_collaborators with "plan"),
+        then applies every operation not yet checkpointed for the job, one repository per worker at a time.
+        """
+
+        try:
+            db.set_job_status(job_id, 'running')
+            done = db.job_checkpoints(job_id)
+            plan = self.automation.plan_reinvite_all_expired_users(refresh=True)
+            for repo, error in plan.errors:
+                if repo not in done: db.checkpoint_job(job_id, repo, [-1, error])
+
+            by_repo = {}
+            for operation in plan.operations:
+                if checkpoint_item(operation) not in done: by_repo.setdefault(operation.repo, []).append(operation)
+            print(f"Job {job_id}: {len(done)} reinvites already done, "
+                  f"{sum(len(operations) for operations in by_repo.values())} to go in {len(by_repo)} repos on {workers} workers")
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{job_id[:8]}") as pool:
+                futures = [pool.submit(self.reinvite_repo, job_id, plan, operations) for operations in by_repo.values()]
+                for future in as_completed(futures): future.result()
+
+            # re-sent invitations have new ids
+            self.automation.graphql.invalidate()
+            db.set_job_status(job_id, 'done')
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            try: db.set_job_status(job_id, 'failed', str(e))
+            except Exception as e: print(f"Failed to record job {job_id} failure: {e}")
+        finally:
+            with self.lock: self.running.pop(job_id, None)
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Reports a job's progress.
+
+        Args: job_id (str): The job id returned by start().
+        Returns: Optional[dict]: The job, its finished reinvites and their results, or None if there is no such job.
+        """
+
+        job = db.get_job(job_id)
+        if job is not None: job["active"] = job_id in self.running
+        return job
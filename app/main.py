@@ -1,14 +1,24 @@
 # =========================================== imports =============================================
 
+import json
+import asyncio
+import tempfile
+from typing import Optional
 from io import StringIO
 from fastapi import FastAPI, HTTPException, Request, WebSocket, File, UploadFile, BackgroundTasks 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
-import pandas as pd
 import github_rest as gh
 import github as git
+import github_async as agit
 import database as db
 import middleware as middleware
+import transport as tp
+import usercache as uc
+import jobs as jobs
+import planner as pl
+import mirror as mi
 import os
 import aiocache
 from dotenv import load_dotenv
@@ -22,6 +32,9 @@ from aiocache.decorators import cached
 load_dotenv()
 TEST_GITHUB_PAT = os.getenv('TEST_GITHUB_PAT')
 SPARK_GITHUB_PAT = os.getenv('SPARK_GITHUB_PAT')
+GITHUB_CONCURRENCY = int(os.getenv('GITHUB_CONCURRENCY', 10))
+STREAM_CHUNK_ROWS = int(os.getenv('STREAM_CHUNK_ROWS', 500))
+UPLOAD_SPOOL_SIZE = int(os.getenv('UPLOAD_SPOOL_SIZE', 1024 * 1024))
 
 # app
 app = FastAPI()
@@ -31,6 +44,12 @@ app = FastAPI()
 
 automation = gh.Automation(SPARK_GITHUB_PAT, 'BU-Spark')
 github = git.Github(SPARK_GITHUB_PAT, 'BU-Spark')
+agithub = agit.AsyncGithub(SPARK_GITHUB_PAT, 'BU-Spark')
+reinvites = jobs.ReinviteJobs(automation)
+
+# with a webhook secret configured, membership reads are answered from a webhook-fed mirror of the org
+mirror = mi.Mirror(automation.graphql)
+if mirror.enabled: automation.mirror = github.mirror = agithub.mirror = mirror
 
 aiocache.caches.set_config({
     'default': {
@@ -49,15 +68,41 @@ app.add_middleware(
 )
 
 app.add_middleware(middleware.BasicAuthMiddleware, 
-    allowed=["/", "/refresh", "/ping", "/airtable-sync"]
+    allowed=["/", "/refresh", "/ping", "/airtable-sync", "/webhooks/github"]
 )
 
 # ========================================= functionality =========================================
 
+# pick up reinvite jobs interrupted by a crash or redeploy
+@app.on_event("startup")
+async def resume_jobs():
+    try: await asyncio.to_thread(reinvites.resume)
+    except Exception as e: print(f"Failed to resume jobs: {e}")
+
+@app.on_event("startup")
+async def seed_mirror():
+    if mirror.enabled: mirror.start()
+
 async def deletecache():
     cache = aiocache.caches.get('default') 
     await cache.clear()
 
+def stream_json(key: str, rows) -> StreamingResponse:
+    """Serializes {key: [rows...]} as rows come out of the iterator, STREAM_CHUNK_ROWS rows per chunk written."""
+    
+    def body():
+        yield f'{{{json.dumps(key)}: ['.encode()
+        chunk, first = [], True
+        for row in rows:
+            chunk.append(json.dumps(row))
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield (('' if first else ',') + ','.join(chunk)).encode()
+                chunk, first = [], False
+        if chunk: yield (('' if first else ',') + ','.join(chunk)).encode()
+        yield b']}'
+    
+    return StreamingResponse(body(), media_type="application/json")
+
 # root route
 @app.get("/")
 async def root(): return {"/": "/"}
@@ -66,6 +111,17 @@ async def root(): return {"/": "/"}
 @app.get("/ping")
 async def ping(): return {"status": "pong"}
 
+# connection / request counters for the shared github transport
+@app.get("/metrics")
+async def metrics():
+    return {
+        "transport": tp.default_transport.stats(),
+        "async_transport": tp.default_async_transport.stats(),
+        "user_cache": uc.default_user_cache.stats(),
+        "mirror": mirror.stats(),
+        "database_pool": db.pool.stats(),
+    }
+
 # route to check authentication status (uses middleware)
 @app.post("/authenticate")
 async def authenticate(): return {"status": "authenticated"}
@@ -78,148 +134,304 @@ async def refresh():
     return {"status": "cache cleared"}
     
 # route called re-invite expired collaborators that re-invites expired collaborators based on a cron job
+# runs in the background, poll /jobs/{job_id} for progress; every repository's invitations are listed each time, since
+# invitations expire on repositories nobody pushes to (the listings are conditional requests, unchanged ones cost a 304)
 @app.post("/reinvite_expired_collaborators")
 async def reinvite_expired_collaborators(request: Request):
     try:
-        r = automation.reinvite_all_expired_users_to_repos()
-        print(r)
-        return {"status": r}
+        data = await request.json() if await request.body() else {}
+        if data.get("plan"):
+            plan = await asyncio.to_thread(automation.plan_reinvite_all_expired_users)
+            pl.default_plan_store.save(plan)
+            return plan.summary()
+        job_id = await asyncio.to_thread(reinvites.start, data.get("workers"))
+        return {"status": "started", "job_id": job_id}
     except Exception as e: return {"status": "failed", "error": str(e)}
+
+# github webhook (member, repository, organization, repository_invitation events) keeping the mirror current,
+# authenticated by its X-Hub-Signature-256 instead of basic auth
+@app.post("/webhooks/github")
+async def github_webhook(request: Request):
+    if not mirror.enabled: raise HTTPException(status_code=404, detail="webhooks are not configured")
+    body = await request.body()
+    if not mirror.verify(body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="invalid signature")
+    try:
+        result = mirror.handle(request.headers.get("X-GitHub-Event", ""), json.loads(body), request.headers.get("X-GitHub-Delivery"))
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"malformed payload: {e}")
+    return {"status": result}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await asyncio.to_thread(reinvites.status, job_id)
+    if job is None: raise HTTPException(status_code=404, detail="job not found")
+    return job
+    
+async def spool(request: Request):
+    """Writes a request body to a temporary file as it arrives (in memory up to UPLOAD_SPOOL_SIZE, then on disk)."""
     
+    file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    async for chunk in request.stream(): file.write(chunk)
+    file.seek(0)
+    return file
+
 # route called airtable-sync that takes in the csv and runs an upload and ingest  
+# the csv is either the raw body (Content-Type: text/csv, password in X-Sync-Password), streamed straight into postgres,
+# or the "csv" field of a JSON body alongside "password"
 @app.post("/airtable-sync")
 async def airtable_sync(request: Request, background_tasks: BackgroundTasks):
     try:
-        data = await request.json()
-        if data["password"] != os.getenv('PASSWORD'): 
-            raise HTTPException(status_code=401, detail="Unauthorized")
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            if request.headers.get("x-sync-password") != os.getenv('PASSWORD'):
+                raise HTTPException(status_code=401, detail="Unauthorized")
+            file = await spool(request)
         else:
-            await deletecache()      
-            db.ucsv(pd.read_csv(StringIO(data["csv"])))
-            background_tasks.add_task(db.ingest)
-            return {"status": "success"}
+            data = await request.json()
+            if data["password"] != os.getenv('PASSWORD'): 
+                raise HTTPException(status_code=401, detail="Unauthorized")
+            file = StringIO(data.pop("csv"))
+        
+        await deletecache()
+        with file: report = await asyncio.to_thread(db.ucsv_file, file)
+        if report.get("error"): raise HTTPException(status_code=500, detail=report["error"])
+        background_tasks.add_task(db.ingest)
+        return {"status": "success", "upload": report}
+    except HTTPException: raise
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 # ===================================== client functionality ======================================
 
+# uploads are streamed from the (spooled) upload file into postgres, never parsed whole
 @app.post("/upload/csv")
 async def upload_file(file: UploadFile = File(...)):
-    try: await deletecache() ; return {"status": db.ucsv(pd.read_csv(file.file))}
+    try: await deletecache() ; return {"status": await asyncio.to_thread(db.ucsv_file, file.file)}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/upload/projects")
 async def upload_projects(file: UploadFile = File(...)):
-    try: await deletecache() ; return {"status": db.uprojects(pd.read_csv(file.file))}
+    try: await deletecache() ; return {"status": await asyncio.to_thread(db.uprojects_file, file.file)}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ingest/csv")
 async def ingest():
-    try: await deletecache() ; return {"status": db.ingest()}
+    try: await deletecache() ; return {"status": await asyncio.to_thread(db.ingest)}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/ingest/projects")
 async def ingest_projects():
-    try: await deletecache() ; return {"status": db.ingest_projects()}
+    try: await deletecache() ; return {"status": await asyncio.to_thread(db.ingest_projects)}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process")
-async def process():
-    try: await deletecache() ; return {"status": db.process()}
+async def process(request: Request):
+    try:
+        data = await request.json() if await request.body() else {}
+        if data.get("plan"):
+            plan = await asyncio.to_thread(db.plan_process)
+            pl.default_plan_store.save(plan)
+            return plan.summary()
+        await deletecache() ; return {"status": await asyncio.to_thread(db.process)}
     except Exception as e: return {"status": "failed", "error": str(e)}
 
+def page_size(limit: Optional[int]) -> Optional[int]:
+    return None if limit is None else max(1, min(limit, db.MAX_PAGE_SIZE))
+
+def next_after(rows: list[dict], limit: Optional[int]) -> Optional[int]:
+    """The ?after= of the next page, None once a page comes back short (or nothing was paged)."""
+    return rows[-1]["id"] if limit and len(rows) == limit else None
+
+# with ?limit= a page of rows and the cursor of the next one (pass it back as ?after=), without it every row streamed
+# straight from a server-side cursor (never cached, so the response never sits in memory whole)
+# ?semester=, ?project= and ?status= filter the rows either way
 @app.get("/get_info")
-@cached(ttl=180, alias="default", key="info")
-async def get_info():
-    try: return {"info": db.information()}
+async def get_info(after: Optional[str] = None, limit: Optional[int] = None, semester: Optional[str] = None,
+                   project: Optional[str] = None, status: Optional[str] = None):
+    try:
+        if limit is None and after is None:
+            return stream_json("info", await asyncio.to_thread(db.iter_information, semester, project, status))
+        rows, after = await asyncio.to_thread(db.information_page, after, page_size(limit or db.PAGE_SIZE), semester, project, status)
+        return {"info": rows, "next": after}
     except Exception as e: return {"status": "failed", "error": str(e)}
-    
+
+# the csv / results endpoints page with ?after=<id>&limit=, cached per combination of query parameters
 @app.get("/get_csv")
-@cached(ttl=180, alias="default", key="csv")
-async def get_csv():
-    try: return {"csv": db.gcsv()}
+@cached(ttl=180, alias="default")
+async def get_csv(after: Optional[int] = None, limit: Optional[int] = None, semester: Optional[str] = None,
+                  project: Optional[str] = None, status: Optional[str] = None):
+    try:
+        rows = await asyncio.to_thread(db.gcsv, after, page_size(limit), semester, project, status)
+        return {"csv": rows, "next": next_after(rows, page_size(limit))}
     except Exception as e: return {"status": "failed", "error": str(e)}
     
 @app.get("/get_csv_projects")
-@cached(ttl=180, alias="default", key="csv_projects")
-async def get_csv_projects():
-    try: return {"csv_projects": db.gcsvprojects()}
+@cached(ttl=180, alias="default")
+async def get_csv_projects(after: Optional[int] = None, limit: Optional[int] = None, semester: Optional[str] = None,
+                           project: Optional[str] = None, status: Optional[str] = None):
+    try:
+        rows = await asyncio.to_thread(db.gcsvprojects, after, page_size(limit), semester, project, status)
+        return {"csv_projects": rows, "next": next_after(rows, page_size(limit))}
     except HTTPException as e: raise HTTPException(status_code=500, detail=str(e))
     
 @app.get("/get_projects")
 @cached(ttl=180, alias="default", key="projects")
 async def get_projects():
-    try: return {"projects": db.projects()}
+    try: return {"projects": await asyncio.to_thread(db.projects)}
     except Exception as e: return {"status": "failed", "error": str(e)}
     
+async def plan_set_projects(projects: list[tuple[str, str]], action: str, use_snapshot: bool = False, track_status: bool = True) -> pl.BulkPlan:
+    """
+    Works out the permission changes for /set_projects (track_status: the project's users from the database, whose status
+    is updated too) or /git/set_projects (everyone on the repo), without making any of them.
+    """
+    
+    plan = pl.BulkPlan('set_projects' if track_status else 'git_set_projects', {"action": action})
+    before = tp.default_transport.requests + tp.default_async_transport.requests
+    
+    # optionally index the whole org up front instead of listing every project's repo
+    async def load_snapshot():
+        if not use_snapshot: return None
+        try: return await asyncio.to_thread(automation.graphql.snapshot)
+        except Exception as e: print(f"Snapshot failed, falling back to per-repository lookups: {e}")
+    
+    # every project's users come from one query, loaded alongside the snapshot
+    async def load_rosters():
+        if not track_status: return {}
+        try: return await asyncio.to_thread(db.get_users_in_projects, [project[0] for project in projects])
+        except Exception as e: return e
+    
+    snapshot, rosters = await asyncio.gather(load_snapshot(), load_rosters())
+    
+    async def repo_access(repo_url: str) -> git.RepoAccess:
+        access = snapshot.access(repo_url) if snapshot else None
+        return access or await agithub.get_repo_access(repo_url)
+    
+    async def plan_project(project: tuple[str, str]):
+        project_name, repo_url = project[0], project[1]
+        try:
+            if track_status:
+                if isinstance(rosters, Exception): raise rosters
+                access = await repo_access(repo_url)
+                users = [user["github"] for user in rosters[project_name]]
+            else:
+                access = await repo_access(repo_url)
+                users = list(access.users())
+        except Exception as e:
+            print(e)
+            plan.errors.append((project_name, f"failed to modify {project_name}: {e}"))
+            return
+        
+        plan.accesses[repo_url] = access
+        for user in users:
+            operation = pl.change_operation(access, user, action, repo_url, project_name, track_status)
+            if operation is not None: plan.operations.append(operation)
+            elif access.permission(user) == action: plan.unchanged += 1
+            else: plan.errors.append((project_name, f"FAILED: {project_name} - {user} -> 404 not a collaborator or invited on the repository"))
+    
+    await asyncio.gather(*[plan_project(project) for project in projects])
+    plan.planning_calls = tp.default_transport.requests + tp.default_async_transport.requests - before
+    return plan
+
+async def execute_set_projects(plan: pl.BulkPlan, concurrency: int) -> list[str]:
+    """Applies exactly the operations of a plan from plan_set_projects, concurrently."""
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(operation: pl.Operation) -> str:
+        project_name, github_username = operation.project, operation.user
+        if operation.action == 'status':
+            gh_status, gh_msg = 200, f"already {operation.permission}"
+        else:
+            async with semaphore:
+                gh_status, gh_msg = await agithub.change_user_permission_on_repo(
+                    operation.repo, github_username, operation.permission, plan.accesses[operation.repo])
+            if gh_status != 200 and gh_status != 204:
+                return f"FAILED: {project_name} - {github_username} -> {gh_status} {gh_msg}"
+        if plan.kind == 'git_set_projects':
+            return f"{project_name} -> {(gh_status, gh_msg)}"
+        db_status, db_msg = await asyncio.to_thread(db.change_users_project_status, project_name, github_username, operation.permission)
+        return f"PROCESSED: {project_name} - {github_username} -> gh {gh_status} {gh_msg} | db {db_status} {db_msg}"
+    
+    results = [error for where, error in plan.errors]
+    results.extend(await asyncio.gather(*[run(operation) for operation in plan.operations]))
+    return results
+
+# with "plan": true, returns the plan (operations, call / time / rate-limit estimates) for POST /plans/{plan_id}/execute
 @app.post("/set_projects")
 async def set_projects(request: Request):
     data = await request.json()
-    await deletecache()
     
-    results: list = []
     projects: list[tuple[str, str]] = data["projects"]
     action: str = data["action"]
+    concurrency = int(data.get("concurrency", GITHUB_CONCURRENCY))
     
     if action not in ['push', 'pull']: return {"status": "failed", "error": "action must be 'push' or 'pull'"}
     
     try:
-        for project in projects:
-            try:
-                project_name = project[0]
-                repo_url = project[1]
-                users = db.get_users_in_project(project_name)
-                for user in users:
-                    github_username = user["github"]
-                    gh_status, gh_msg = github.change_user_permission_on_repo(repo_url, github_username, action)
-                    if gh_status != 200 and gh_status != 204:
-                        results.append(f"FAILED: {project_name} - {github_username} -> {gh_status} {gh_msg}")
-                        continue
-                    else:
-                        db_status, db_msg = db.change_users_project_status(project_name, github_username, action)
-                        results.append(f"PROCESSED: {project_name} - {github_username} -> gh {gh_status} {gh_msg} | db {db_status} {db_msg}")
-                    
-            except Exception as e: 
-                print(e)
-                results.append(f"failed to modify {project_name}")
-                continue
-        return {"results": results}
+        plan = await plan_set_projects(projects, action, data.get("snapshot", False))
+        if data.get("plan"):
+            pl.default_plan_store.save(plan)
+            return plan.summary(concurrency=concurrency)
+        await deletecache()
+        return {"results": await execute_set_projects(plan, concurrency)}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/git/set_projects")
-async def set_projects(request: Request):
+async def git_set_projects(request: Request):
     data = await request.json()
     
-    results: list = []
     projects: list[tuple[str, str]] = data["projects"]
     action: str = data["action"]
+    concurrency = int(data.get("concurrency", GITHUB_CONCURRENCY))
     
     if action not in ['push', 'pull']: return {"status": "failed", "error": "action must be 'push' or 'pull'"}
     
     try:
-        for project in projects:
-            try:
-                project_name = project[0]
-                repo_url = project[1]
-                response = github.change_all_user_permission_on_repo(repo_url, action)
-                for res in response:
-                    results.append(f"{project_name} -> {res}")
-                    
-            except Exception as e: 
-                print(e)
-                results.append(f"failed to modify {project_name}")
-                continue
-        return {"results": results}
+        plan = await plan_set_projects(projects, action, data.get("snapshot", False), track_status=False)
+        if data.get("plan"):
+            pl.default_plan_store.save(plan)
+            return plan.summary(concurrency=concurrency)
+        return {"results": await execute_set_projects(plan, concurrency)}
+    except Exception as e: raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/plans/{plan_id}")
+async def get_plan(plan_id: str):
+    plan = pl.default_plan_store.get(plan_id)
+    if plan is None: raise HTTPException(status_code=404, detail="plan not found or expired")
+    return plan.summary(concurrency=GITHUB_CONCURRENCY)
+
+# applies a stored plan exactly as it was returned, once
+@app.post("/plans/{plan_id}/execute")
+async def execute_plan(plan_id: str, request: Request):
+    data = await request.json() if await request.body() else {}
+    plan = pl.default_plan_store.take(plan_id)
+    if plan is None: raise HTTPException(status_code=404, detail="plan not found or expired")
+    
+    try:
+        if plan.kind in ('set_projects', 'git_set_projects'):
+            await deletecache()
+            return {"results": await execute_set_projects(plan, int(data.get("concurrency", GITHUB_CONCURRENCY)))}
+        elif plan.kind == 'process':
+            await deletecache()
+            return {"status": await asyncio.to_thread(db.execute_process_plan, plan)}
+        else:
+            results = await asyncio.to_thread(automation.execute_plan, plan)
+            return {"status": [(repo, -1, error) for repo, error in plan.errors] + results}
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
+# ?project= keeps results mentioning the project, ?status= results starting with it (PROCESSED, FAILED, ...)
 @app.get("/get_results")
-@cached(ttl=180, alias="default", key="results")
-async def get_results():
-    try: return {"results": db.results()}
+@cached(ttl=180, alias="default")
+async def get_results(after: Optional[int] = None, limit: Optional[int] = None, project: Optional[str] = None,
+                      status: Optional[str] = None):
+    try:
+        rows = await asyncio.to_thread(db.results, after, page_size(limit), project, status)
+        return {"results": rows, "next": next_after(rows, page_size(limit))}
     except Exception as e: return {"status": "failed", "error": str(e)}
 
 @app.get("/git/get_all_repos")
 async def get_all_repos():
-    try: return {"repos": github.get_all_repos()}
+    try: return {"repos": await asyncio.to_thread(github.get_all_repos)}
     except Exception as e: return {"status": "failed", "error": str(e)}
 
 # ======================================== run the app =========================================
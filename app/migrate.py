@@ -0,0 +1,279 @@
+# =========================================== imports =============================================
+
+import os
+import sys
+import argparse
+from typing import Callable
+from dotenv import load_dotenv
+from sqlalchemy import (
+    create_engine, inspect, text, MetaData, Table, Column, Index, ForeignKey, PrimaryKeyConstraint,
+    Integer, BigInteger, Float, Boolean, Text, DateTime, Enum,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import func
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+POSTGRES_URL = os.getenv('POSTGRES_URL')
+
+# applied migrations are recorded here, apart from the models
+metadata = MetaData()
+schema_migration = Table(
+    'schema_migration', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', Text, nullable=False),
+    Column('applied_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+def engine(url: str = POSTGRES_URL) -> Engine:
+    # hosted postgres urls often use the postgres:// scheme, which sqlalchemy no longer accepts
+    if url and url.startswith('postgres://'): url = 'postgresql://' + url[len('postgres://'):]
+    return create_engine(url)
+
+# =========================================== schema versions =====================================
+
+# every migration creates its own copy of the tables and indexes as they were when it was written, so what version N
+# applies never changes with models.py; models.py describes the schema after the last migration
+
+# version 1: the tables the app started out with
+v1 = MetaData()
+Table(
+    'user', v1,
+    Column('user_id', Integer, primary_key=True),
+    Column('name', Text),
+    Column('email', Text, nullable=False, unique=True),
+    Column('buid', Text, nullable=False, unique=True),
+    Column('github', Text, unique=True),
+)
+Table(
+    'semester', v1,
+    Column('semester_id', Integer, primary_key=True),
+    Column('semester_name', Text, nullable=False, unique=True),
+    Column('year', Integer, nullable=False),
+    Column('semester', Enum('Spring', 'Summer', 'Fall', 'Winter', name='semesterenum')),
+)
+Table(
+    'project', v1,
+    Column('project_id', Integer, primary_key=True),
+    Column('project_name', Text, nullable=False, unique=True),
+    Column('semester_id', Integer, ForeignKey('semester.semester_id')),
+    Column('github_url', Text),
+    Column('created_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+Table(
+    'user_project', v1,
+    Column('project_id', Integer, ForeignKey('project.project_id', onupdate='CASCADE', ondelete='CASCADE')),
+    Column('user_id', Integer, ForeignKey('user.user_id', onupdate='CASCADE', ondelete='CASCADE')),
+    Column('status', Enum('started', 'invited', 'pull', 'push', name='statusenum')),
+    Column('created_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+    PrimaryKeyConstraint('project_id', 'user_id'),
+)
+Table(
+    'csv', v1,
+    Column('id', Integer, primary_key=True),
+    *[Column(name, Text) for name in (
+        'semester', 'course', 'project', 'organization', 'team', 'role', 'first_name', 'last_name', 'full_name',
+        'email', 'buid', 'github_username', 'status', 'project_github_url',
+    )],
+)
+Table(
+    'csv_projects', v1,
+    Column('id', Integer, primary_key=True),
+    *[Column(name, Text) for name in ('semester', 'project', 'project_github_url', 'status')],
+)
+Table(
+    'github_user', v1,
+    Column('login', Text, primary_key=True),
+    Column('found', Boolean, nullable=False),
+    Column('github_id', BigInteger),
+    Column('expires_at', Float, nullable=False),
+)
+
+# version 2: indexes for the hot lookups, declared on a copy of the version 1 tables so version 1 doesn't create them
+v2 = MetaData()
+v2_tables = {name: v1.tables[name].to_metadata(v2) for name in ('user', 'user_project', 'csv')}
+v2_indexes = [
+    # change_users_project_status looks users up by github login, user_id comes from the index alone
+    Index('ix_user_github_user_id', v2_tables['user'].c.github, postgresql_include=['user_id']),
+    # information() walks memberships by user, the primary key only serves lookups by project
+    Index('ix_user_project_user_id', v2_tables['user_project'].c.user_id, v2_tables['user_project'].c.project_id,
+          postgresql_include=['status']),
+    # process() only ever reads the 'started' memberships
+    Index('ix_user_project_started', v2_tables['user_project'].c.user_id, v2_tables['user_project'].c.project_id,
+          postgresql_where=text("status = 'started'")),
+    Index('ix_csv_status', v2_tables['csv'].c.status),
+]
+
+# version 3: the tables database.py and usercache.py used to create at runtime
+v3 = MetaData()
+Table(
+    'job', v3,
+    Column('job_id', Text, primary_key=True),
+    Column('kind', Text, nullable=False),
+    Column('status', Text, nullable=False),
+    Column('workers', Integer),
+    Column('error', Text),
+    Column('since', Text),
+    Column('created_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column('updated_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+Table(
+    'job_checkpoint', v3,
+    Column('job_id', Text, ForeignKey('job.job_id', ondelete='CASCADE'), nullable=False),
+    Column('item', Text, nullable=False),
+    Column('result', JSONB),
+    Column('done_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+    PrimaryKeyConstraint('job_id', 'item'),
+)
+v1.tables['github_user'].to_metadata(v3)
+
+# =========================================== migrations ==========================================
+
+def create_tables(metadata: MetaData) -> Callable[[Connection], None]:
+    """Creates the tables of a schema version that don't exist yet, existing tables are left alone."""
+
+    def migrate(conn: Connection):
+        metadata.create_all(conn, checkfirst=True)
+    return migrate
+
+def create_indexes(*indexes: Index) -> Callable[[Connection], None]:
+    """Creates indexes on tables that already exist, skipping the ones already there."""
+
+    def migrate(conn: Connection):
+        inspector = inspect(conn)
+        tables = {}
+        for index in indexes: tables.setdefault(index.table.name, []).append(index)
+        for table, created in tables.items():
+            existing = {index['name'] for index in inspector.get_indexes(table)}
+            for index in created:
+                if index.name not in existing: index.create(conn)
+            # fresh statistics, so the planner considers the new indexes right away
+            conn.exec_driver_sql(f'ANALYZE "{table}"')
+    return migrate
+
+def add_missing_columns(table: Table, *columns: str) -> Callable[[Connection], None]:
+    """Adds columns of a schema version's table to a table that exists without them."""
+
+    def migrate(conn: Connection):
+        existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+        for name in columns:
+            if name in existing: continue
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{name}" {table.c[name].type.compile(conn.dialect)}')
+    return migrate
+
+def drop_indexes(*names: str) -> Callable[[Connection], None]:
+    """Drops indexes, if they exist."""
+
+    def migrate(conn: Connection):
+        for name in names: conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    return migrate
+
+def drop_columns(table: str, *columns: str) -> Callable[[Connection], None]:
+    """Drops columns, if they exist."""
+
+    def migrate(conn: Connection):
+        existing = {column['name'] for column in inspect(conn).get_columns(table)}
+        for name in columns:
+            if name in existing: conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP COLUMN "{name}"')
+    return migrate
+
+def steps(*migrations: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    """Runs several migrations as one version."""
+
+    def migrate(conn: Connection):
+        for migration in migrations: migration(conn)
+    return migrate
+
+# (version, name, migration) in the order they apply; never edit or reorder an applied one, append a new version
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, 'tables from models.py', create_tables(v1)),
+    (2, 'indexes for the hot lookups', create_indexes(*v2_indexes)),
+    # older job tables, created at runtime, lack since
+    (3, 'job, job_checkpoint and github_user tables', steps(
+        create_tables(v3), add_missing_columns(v3.tables['job'], 'since'))),
+    # user.github is unique, its constraint index already serves the lookups by github login
+    (4, 'drop ix_user_github_user_id', drop_indexes('ix_user_github_user_id')),
+    # reinvite jobs list every repository's invitations, pushed_at says nothing about when an invitation expired
+    (5, 'drop job.since', drop_columns('job', 'since')),
+]
+
+def applied(conn: Connection) -> set[int]:
+    metadata.create_all(conn, checkfirst=True)
+    return {row[0] for row in conn.execute(schema_migration.select().with_only_columns(schema_migration.c.version))}
+
+def upgrade(eng: Engine) -> list[str]:
+    """
+    Applies every migration that hasn't been applied yet, each in its own transaction together with its version row.
+
+    Returns: list[str]: The migrations applied.
+    """
+
+    with eng.begin() as conn: done = applied(conn)
+    result = []
+    for version, name, migration in MIGRATIONS:
+        if version in done: continue
+        with eng.begin() as conn:
+            migration(conn)
+            conn.execute(schema_migration.insert().values(version=version, name=name))
+        print(f"APPLIED {version}: {name}")
+        result.append(f"{version}: {name}")
+    if not result: print("NOTHING TO APPLY")
+    return result
+
+def status(eng: Engine):
+    with eng.begin() as conn: done = applied(conn)
+    for version, name, _ in MIGRATIONS:
+        print(f"{'applied' if version in done else 'pending':<8} {version}: {name}")
+
+# =========================================== explain =============================================
+
+# the lookups the indexes are for, with representative parameters
+HOT_QUERIES = [
+    ("user by github (change_users_project_status)", 'SELECT user_id FROM "user" WHERE github = %s', ('octocat',)),
+    ("started memberships (process)", "SELECT * FROM user_project WHERE status = 'started'", ()),
+    ("memberships of a user (information)", "SELECT project_id, status FROM user_project WHERE user_id = %s", (1,)),
+    ("information page (/get_info?limit=100)",
+     'SELECT u.user_id, up.project_id, p.project_name, s.semester_name, up.status FROM "user" u '
+     'JOIN user_project up ON up.user_id = u.user_id JOIN project p ON p.project_id = up.project_id '
+     'LEFT JOIN semester s ON s.semester_id = p.semester_id ORDER BY u.user_id, up.project_id LIMIT 100', ()),
+    ("csv rows by status", "SELECT id FROM csv WHERE status = %s", ('all systems operational',)),
+]
+
+def explain(eng: Engine, analyze: bool = False):
+    """Prints the query plan of every hot query; with analyze the queries run (in a transaction that is rolled back)."""
+
+    with eng.connect() as conn:
+        for title, query, params in HOT_QUERIES:
+            print(f"=== {title}")
+            try:
+                rows = conn.exec_driver_sql(f"EXPLAIN {'(ANALYZE, BUFFERS) ' if analyze else ''}{query}", params).fetchall()
+                for row in rows: print(f"    {row[0]}")
+            except Exception as e:
+                print(f"    failed: {e}")
+                conn.rollback()
+        conn.rollback()
+
+# =========================================== cli =================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versioned schema migrations for the tables in models.py.")
+    parser.add_argument('command', choices=['upgrade', 'status', 'explain'])
+    parser.add_argument('--explain', action='store_true', help="with upgrade, print the hot query plans before and after")
+    parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE instead of EXPLAIN")
+    args = parser.parse_args()
+
+    if not POSTGRES_URL: sys.exit("POSTGRES_URL is not set")
+    eng = engine()
+    if args.command == 'status': status(eng)
+    elif args.command == 'explain': explain(eng, args.analyze)
+    else:
+        if args.explain:
+            print("############ BEFORE ############")
+            explain(eng, args.analyze)
+        upgrade(eng)
+        if args.explain:
+            print("############ AFTER #############")
+            explain(eng, args.analyze)
@@ -0,0 +1,293 @@
+# =========================================== imports =============================================
+
+import os
+import copy
+import hmac
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from typing import Optional
+from dotenv import load_dotenv
+from github import RepoAccess, ROLE_TO_PERMISSION
+import github_graphql as gql
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET')
+GITHUB_MIRROR_REDIS_URL = os.getenv('GITHUB_MIRROR_REDIS_URL')
+GITHUB_MIRROR_RESEED = float(os.getenv('GITHUB_MIRROR_RESEED', 21600))
+
+# =========================================== stores ==============================================
+
+def repo_name(repo: str) -> str:
+    """Normalizes a repository name, HTTPS URL or SSH URL to the lowercased name the mirror is keyed by."""
+    repo = repo.rstrip('/')
+    if repo.endswith('.git'): repo = repo[:-4]
+    return repo.replace(':', '/').split('/')[-1].lower()
+
+class MemoryMirrorStore:
+    """Keeps the mirror in this process: reads are a dict lookup."""
+
+    def __init__(self):
+        self.repos: dict[str, RepoAccess] = {}
+
+    def get(self, name: str) -> Optional[RepoAccess]: return self.repos.get(name)
+    def put(self, name: str, access: RepoAccess): self.repos[name] = access
+    def delete(self, name: str): self.repos.pop(name, None)
+    def names(self) -> list[str]: return list(self.repos)
+    def replace(self, repos: dict[str, RepoAccess]): self.repos = dict(repos)
+
+class RedisMirrorStore:
+    """
+    Keeps the mirror in a Redis hash (one JSON field per repository), so every worker reads the same state and a
+    webhook delivered to one of them updates it for all.
+    """
+
+    def __init__(self, url: str, org: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key = f'github_mirror:{org.lower()}'
+
+    def dump(self, access: RepoAccess) -> str:
+        return json.dumps({
+            "repo_url": access.repo_url,
+            "collaborators": access.collaborators,
+            "invitations": access.invitations,
+            "expired": sorted(access.expired),
+            "logins": access.logins,
+        })
+
+    def load(self, raw) -> RepoAccess:
+        data = json.loads(raw)
+        return RepoAccess(data["repo_url"], data["collaborators"], data["invitations"], set(data["expired"]), data["logins"])
+
+    def get(self, name: str) -> Optional[RepoAccess]:
+        raw = self.client.hget(self.key, name)
+        return self.load(raw) if raw is not None else None
+
+    def put(self, name: str, access: RepoAccess): self.client.hset(self.key, name, self.dump(access))
+    def delete(self, name: str): self.client.hdel(self.key, name)
+    def names(self) -> list[str]: return [name.decode() for name in self.client.hkeys(self.key)]
+
+    def replace(self, repos: dict[str, RepoAccess]):
+        pipeline = self.client.pipeline()
+        pipeline.delete(self.key)
+        if repos: pipeline.hset(self.key, mapping={name: self.dump(access) for name, access in repos.items()})
+        pipeline.execute()
+
+# =========================================== mirror ==============================================
+
+class Mirror:
+    """
+    An in-process copy of who can access every repository in the organization, kept current by GitHub webhooks.
+
+    Seeded from one organization snapshot (see GithubGraphQL.snapshot), then updated by member, repository, organization
+    and repository_invitation events, so collaborator and invitation lookups are answered without calling GitHub.
+    Events that arrive while the seed is running are replayed on top of it. The mirror re-seeds every
+    GITHUB_MIRROR_RESEED seconds to recover from missed deliveries.
+
+    Invitations expire silently (there is no event for it), so questions about expired invitations still go to GitHub.
+    """
+
+    def __init__(self, graphql: gql.GithubGraphQL, store=None, secret: Optional[str] = GITHUB_WEBHOOK_SECRET,
+                 reseed: float = GITHUB_MIRROR_RESEED):
+        self.graphql = graphql
+        self.store = store or (RedisMirrorStore(GITHUB_MIRROR_REDIS_URL, graphql.ORG_NAME) if GITHUB_MIRROR_REDIS_URL else MemoryMirrorStore())
+        self.secret = secret
+        self.reseed = reseed
+        self.lock = threading.RLock()
+        self.ready = False
+        self.seeding = False
+        self.pending = []
+        self.deliveries = deque(maxlen=1000)
+        self.seeded_at = None
+        self.events = 0
+        self.hits = 0
+        self.thread = None
+
+    @property
+    def enabled(self) -> bool: return bool(self.secret)
+
+    # =========================================== seeding =========================================
+
+    def seed(self):
+        """Replaces the mirror with a fresh organization snapshot, then replays the events received meanwhile."""
+
+        with self.lock: self.seeding = True
+        try:
+            snapshot = self.graphql.snapshot(invitations=True, refresh=True)
+        except Exception:
+            with self.lock: self.seeding = False
+            raise
+
+        with self.lock:
+            # repositories whose collaborators could not be read stay out, so lookups on them go to GitHub
+            self.store.replace(copy.deepcopy(snapshot.repos))
+            pending, self.pending = self.pending, []
+            for event, payload in pending: self.apply(event, payload)
+            self.seeding = False
+            self.ready = True
+            self.seeded_at = time.time()
+        print(f"Mirror of {self.graphql.ORG_NAME} seeded: {len(snapshot.repos)} repos, {len(pending)} events replayed")
+
+    def run(self):
+        while True:
+            try: self.seed()
+            except Exception as e: print(f"Mirror seed failed: {e}")
+            if self.reseed <= 0: return
+            time.sleep(self.reseed)
+
+    def start(self):
+        """Seeds the mirror (and re-seeds it periodically) on a background thread, so startup is not held up."""
+        if self.thread is not None: return
+        self.thread = threading.Thread(target=self.run, name='github-mirror', daemon=True)
+        self.thread.start()
+
+    # =========================================== reads ===========================================
+
+    def access(self, repo: str) -> Optional[RepoAccess]:
+        """
+        Looks a repository up in the mirror.
+
+        Args: repo (str): The repository name, HTTPS URL or SSH URL.
+        Returns: Optional[RepoAccess]: The repository's collaborators and invitations, or None if the mirror is not
+            seeded yet or does not know the repository (the caller should ask GitHub).
+        """
+
+        if not self.ready: return None
+        with self.lock: access = self.store.get(repo_name(repo))
+        if access is not None: self.hits += 1
+        return access
+
+    def collaborators(self, repo: str) -> Optional[set[str]]:
+        with self.lock:
+            access = self.access(repo)
+            return {access.logins[login] for login in access.collaborators} if access else None
+
+    def invitees(self, repo: str) -> Optional[set[str]]:
+        with self.lock:
+            access = self.access(repo)
+            return {access.logins[login] for login in access.invitations} if access else None
+
+    def is_collaborator(self, repo: str, user: str) -> Optional[bool]:
+        with self.lock:
+            access = self.access(repo)
+            return access.is_collaborator(user) if access else None
+
+    # =========================================== webhooks ========================================
+
+    def verify(self, body: bytes, signature: Optional[str]) -> bool:
+        """
+        Checks a delivery's X-Hub-Signature-256 header against the webhook secret.
+
+        Args:
+            body (bytes): The raw request body.
+            signature (Optional[str]): The header value, "sha256=<hex digest>".
+        Returns: bool: True if the body was signed with the secret.
+        """
+
+        if not self.secret or not signature: return False
+        expected = 'sha256=' + hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def handle(self, event: str, payload: dict, delivery: Optional[str] = None) -> str:
+        """
+        Applies a webhook delivery to the mirror, or queues it if the mirror is being seeded.
+
+        Args:
+            event (str): The X-GitHub-Event header.
+            payload (dict): The event payload.
+            delivery (Optional[str]): The X-GitHub-Delivery id, so redeliveries are applied once.
+        Returns: str: What happened to the event.
+        """
+
+        with self.lock:
+            if delivery:
+                if delivery in self.deliveries: return 'duplicate'
+                self.deliveries.append(delivery)
+            self.events += 1
+            if self.seeding or not self.ready:
+                self.pending.append((event, payload))
+                return 'queued'
+            return self.apply(event, payload)
+
+    def apply(self, event: str, payload: dict) -> str:
+        action = payload.get('action')
+        repository = payload.get('repository') or {}
+
+        if event == 'ping': return 'pong'
+
+        if event == 'member':
+            name, login = repo_name(repository['name']), payload['member']['login']
+            access = self.store.get(name)
+            if access is None: return 'unknown repository'
+            if action == 'removed':
+                access.collaborators.pop(login.lower(), None)
+                access.remove_invitation(login)
+            elif action in ('added', 'edited'):
+                role = ((payload.get('changes') or {}).get('permission') or {}).get('to')
+                if role is None and action == 'edited': return 'ignored'
+                access.remove_invitation(login)
+                access.add_collaborator(login, ROLE_TO_PERMISSION.get(role, role or 'push'))
+            else:
+                return 'ignored'
+            self.store.put(name, access)
+            return 'applied'
+
+        if event == 'repository_invitation':
+            name, invitation = repo_name(repository['name']), payload.get('invitation') or {}
+            access = self.store.get(name)
+            if access is None: return 'unknown repository'
+            login = (invitation.get('invitee') or {}).get('login')
+            if not login: return 'ignored'
+            if action == 'created': access.add_invitation(login, invitation.get('id'))
+            elif action == 'expired': access.add_invitation(login, invitation.get('id', access.invitation_id(login)), expired=True)
+            else: access.remove_invitation(login)
+            self.store.put(name, access)
+            return 'applied'
+
+        if event == 'repository':
+            name = repo_name(repository['name'])
+            if action == 'created':
+                self.store.put(name, RepoAccess(repository['html_url']))
+            elif action in ('deleted', 'transferred'):
+                self.store.delete(name)
+            elif action == 'renamed':
+                old = repo_name(payload['changes']['repository']['name']['from'])
+                access = self.store.get(old) or RepoAccess(repository['html_url'])
+                access.repo_url = repository['html_url']
+                self.store.delete(old)
+                self.store.put(name, access)
+            else:
+                return 'ignored'
+            return 'applied'
+
+        if event == 'organization':
+            if action != 'member_removed': return 'ignored'
+            # leaving the organization takes away access to its repositories
+            login = payload['membership']['user']['login']
+            for name in self.store.names():
+                access = self.store.get(name)
+                if access is not None and (access.is_collaborator(login) or access.is_invited(login)):
+                    access.collaborators.pop(login.lower(), None)
+                    access.remove_invitation(login)
+                    self.store.put(name, access)
+            return 'applied'
+
+        return 'ignored'
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "repos": len(self.store.names()) if self.ready else 0,
+                "events": self.events,
+                "pending": len(self.pending),
+                "hits": self.hits,
+                "seeded_seconds_ago": round(time.time() - self.seeded_at, 1) if self.seeded_at else None,
+            }
@@ -6,8 +6,14 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Enum,
+    Boolean,
+    BigInteger,
+    Float,
     PrimaryKeyConstraint,
+    Index,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -70,6 +76,10 @@ class UserProject(Base):
     __tablename__ = 'user_project'
     __table_args__ = (
         PrimaryKeyConstraint('project_id', 'user_id'),
+        # information() walks memberships by user, the primary key only serves lookups by project
+        Index('ix_user_project_user_id', 'user_id', 'project_id', postgresql_include=['status']),
+        # process() only ever reads the 'started' memberships
+        Index('ix_user_project_started', 'user_id', 'project_id', postgresql_where=text("status = 'started'")),
     )
 
     project_id = Column(
@@ -91,6 +101,9 @@ class UserProject(Base):
 
 class CSV(Base):
     __tablename__ = 'csv'
+    __table_args__ = (
+        Index('ix_csv_status', 'status'),
+    )
 
     id = Column(Integer, primary_key=True)
     semester = Column(Text)
@@ -116,3 +129,39 @@ class CSVProjects(Base):
     project = Column(Text)
     project_github_url = Column(Text)
     status = Column(Text)
+
+class GithubUser(Base):
+    __tablename__ = 'github_user'
+
+    login = Column(Text, primary_key=True)
+    found = Column(Boolean, nullable=False)
+    github_id = Column(BigInteger)
+    expires_at = Column(Float, nullable=False)
+
+class Job(Base):
+    __tablename__ = 'job'
+
+    job_id = Column(Text, primary_key=True)
+    kind = Column(Text, nullable=False)
+    status = Column(Text, nullable=False)
+    workers = Column(Integer)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Relationship to JobCheckpoint
+    checkpoints = relationship('JobCheckpoint', back_populates='job', passive_deletes=True)
+
+class JobCheckpoint(Base):
+    __tablename__ = 'job_checkpoint'
+    __table_args__ = (
+        PrimaryKeyConstraint('job_id', 'item'),
+    )
+
+    job_id = Column(Text, ForeignKey('job.job_id', ondelete='CASCADE'), nullable=False)
+    item = Column(Text, nullable=False)
+    result = Column(JSONB)
+    done_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Relationship to Job
+    job = relationship('Job', back_populates='checkpoints')
@@ -0,0 +1,240 @@
+# =========================================== imports =============================================
+
+import os
+import time
+import uuid
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+from dotenv import load_dotenv
+from github import RepoAccess
+import transport as tp
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_PLAN_TTL = float(os.getenv('GITHUB_PLAN_TTL', 900))
+GITHUB_CALL_LATENCY = float(os.getenv('GITHUB_CALL_LATENCY', 0.3))
+
+# =========================================== const ===============================================
+
+# how much each permission allows, for deciding whether a user already has enough access
+PERMISSION_RANK = {'pull': 0, 'triage': 1, 'push': 2, 'maintain': 3, 'admin': 4}
+
+actions = Literal['add', 'upgrade', 'downgrade', 'remove', 'uninvite', 'invitation', 'reinvite', 'status']
+
+# API calls per operation: re-sending an invitation is a revoke plus an add, a status change only touches the database
+OPERATION_CALLS = {'reinvite': 2, 'status': 0}
+
+# =========================================== plan ================================================
+
+@dataclass
+class Operation:
+    """A single write needed to bring a repository's access in line: one API call."""
+
+    action: actions
+    user: str
+    permission: Optional[str] = None
+    current: Optional[str] = None
+    repo: Optional[str] = None
+    project: Optional[str] = None
+
+    @property
+    def calls(self) -> int: return OPERATION_CALLS.get(self.action, 1)
+
+    def describe(self) -> str:
+        where = f"{self.project or self.repo}: " if self.project or self.repo else ""
+        if self.action in ('add', 'upgrade', 'downgrade', 'invitation', 'status'):
+            return f"{where}{self.action} {self.user}: {self.current or 'none'} -> {self.permission}"
+        return f"{where}{self.action} {self.user}"
+
+@dataclass
+class Plan:
+    """
+    The minimal set of operations for a repository, and what it costs compared to touching every user.
+
+    naive_calls is what the old per-user approach would spend (existence check + permission GET + PUT for every
+    current collaborator, a PUT for every missing one); calls is the reads for the snapshot plus one call per operation.
+    """
+
+    repo: str
+    operations: list[Operation] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    read_calls: int = 2
+    naive_calls: int = 0
+    results: list[tuple[int, str]] = field(default_factory=list)
+    access: Optional[RepoAccess] = field(default=None, repr=False)
+
+    @property
+    def calls(self) -> int: return self.read_calls + len(self.operations)
+
+    @property
+    def skipped(self) -> int: return max(self.naive_calls - self.calls, 0)
+
+    def summary(self) -> dict:
+        return {
+            "repo": self.repo,
+            "operations": [operation.describe() for operation in self.operations],
+            "unchanged": len(self.unchanged),
+            "calls": self.calls,
+            "skipped_calls": self.skipped,
+        }
+
+def plan_repo_users(access: RepoAccess, desired_users: set[str], revoke: bool = False, permission: str = 'push',
+                    outsider_permission: str = 'pull') -> Plan:
+    """
+    Computes the minimal operations to give exactly the desired users write access to a repository.
+
+    Desired users who are neither collaborators nor invited are added; desired collaborators with less than `permission`
+    are upgraded (anyone already at or above it is left alone); collaborators who are not desired are downgraded to
+    `outsider_permission`, or, with revoke, removed outright and their pending invitations withdrawn.
+
+    Args:
+        access (RepoAccess): The current collaborators and invitations on the repository.
+        desired_users (set[str]): The users who should have access.
+        revoke (bool): Remove outsiders instead of downgrading them.
+        permission (str): The permission desired users need.
+        outsider_permission (str): The permission outsiders are left with when not revoked.
+    Returns: Plan: The operations to run.
+    """
+
+    desired = {user.lower(): user for user in desired_users}
+    plan = Plan(access.repo_url, access=access)
+    plan.naive_calls = 1 + 3 * len(access.collaborators) + len(set(desired) - set(access.collaborators))
+
+    for login, current in access.collaborators.items():
+        user = access.logins[login]
+        if login in desired:
+            if PERMISSION_RANK.get(current, 0) >= PERMISSION_RANK[permission]: plan.unchanged.append(user)
+            else: plan.operations.append(Operation('upgrade', user, permission, current))
+        elif revoke:
+            plan.operations.append(Operation('remove', user, current=current))
+        elif current != outsider_permission:
+            plan.operations.append(Operation('downgrade', user, outsider_permission, current))
+        else:
+            plan.unchanged.append(user)
+
+    for login in access.invitations:
+        if login in desired: plan.unchanged.append(access.logins[login])
+        elif revoke: plan.operations.append(Operation('uninvite', access.logins[login]))
+
+    for login, user in desired.items():
+        if login not in access.collaborators and login not in access.invitations:
+            plan.operations.append(Operation('add', user, permission))
+
+    return plan
+
+def change_operation(access: RepoAccess, user: str, permission: str, repo: str, project: Optional[str] = None,
+                     track_status: bool = False) -> Optional[Operation]:
+    """
+    Works out what it takes to give one user `permission` on a repository, the way change_user_permission_on_repo would.
+
+    A collaborator who already has the permission needs nothing (or only a database status update, with track_status);
+    any other collaborator is upgraded / downgraded, and a pending invitation is updated in place.
+
+    Returns: Optional[Operation]: The operation, or None if nothing needs doing or the user has no access to change.
+    """
+
+    current = access.permission(user)
+    if current == permission:
+        return Operation('status', user, permission, current, repo, project) if track_status else None
+    if current is not None:
+        action = 'upgrade' if PERMISSION_RANK.get(current, 0) < PERMISSION_RANK.get(permission, 0) else 'downgrade'
+        return Operation(action, user, permission, current, repo, project)
+    if access.is_invited(user):
+        return Operation('invitation', user, permission, 'invited', repo, project)
+    return None
+
+# =========================================== bulk plans ==========================================
+
+@dataclass
+class BulkPlan:
+    """
+    The writes a bulk operation (set projects, process, org-wide reinvite / read-only) intends to make, computed without making any.
+
+    accesses keeps the repository snapshots the plan was computed from, so executing it later applies exactly these
+    operations without reading the repositories again. planning_calls is what computing the plan itself cost.
+    """
+
+    kind: str
+    params: dict = field(default_factory=dict)
+    operations: list[Operation] = field(default_factory=list)
+    unchanged: int = 0
+    errors: list[tuple[str, str]] = field(default_factory=list)
+    planning_calls: int = 0
+    accesses: dict[str, RepoAccess] = field(default_factory=dict, repr=False)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def calls(self) -> int: return sum(operation.calls for operation in self.operations)
+
+    def estimate(self, limiter: Optional[tp.RateLimiter] = None, concurrency: int = 1) -> dict:
+        """
+        Estimates what executing the plan costs against the current rate-limit budget and the write queue's pace.
+
+        Args:
+            limiter (Optional[RateLimiter]): The limiter whose budget the calls come out of, the shared one by default.
+            concurrency (int): How many calls run at once.
+        Returns: dict: The calls, the estimated wall time in seconds, and whether they fit in the remaining budget.
+        """
+
+        budget = (limiter or tp.default_rate_limiter).estimate(self.calls)
+        seconds = max(self.calls * GITHUB_CALL_LATENCY / max(concurrency, 1), budget["seconds"], tp.default_write_queue.estimate(self.calls))
+        return {
+            "calls": self.calls,
+            "seconds": round(seconds, 1),
+            "rate_limit_remaining": budget["remaining"],
+            "rate_limit_reset": budget["reset"],
+            "fits_budget": budget["fits"],
+        }
+
+    def summary(self, limiter: Optional[tp.RateLimiter] = None, concurrency: int = 1) -> dict:
+        return {
+            "plan_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "counts": dict(Counter(operation.action for operation in self.operations)),
+            "operations": [operation.describe() for operation in self.operations],
+            "unchanged": self.unchanged,
+            "errors": [f"{where}: {error}" for where, error in self.errors],
+            "planning_calls": self.planning_calls,
+            "estimate": self.estimate(limiter, concurrency),
+        }
+
+class PlanStore:
+    """Keeps plans in memory between the dry run and the execute call, for GITHUB_PLAN_TTL seconds."""
+
+    def __init__(self, ttl: float = GITHUB_PLAN_TTL, size: int = 100):
+        self.ttl = ttl
+        self.size = size
+        self.plans = OrderedDict()
+        self.lock = threading.Lock()
+
+    def prune(self):
+        now = time.time()
+        for plan_id in [plan_id for plan_id, plan in self.plans.items() if now - plan.created_at > self.ttl]:
+            del self.plans[plan_id]
+        while len(self.plans) > self.size: self.plans.popitem(last=False)
+
+    def save(self, plan: BulkPlan) -> str:
+        with self.lock:
+            self.plans[plan.id] = plan
+            self.prune()
+        return plan.id
+
+    def get(self, plan_id: str) -> Optional[BulkPlan]:
+        with self.lock:
+            self.prune()
+            return self.plans.get(plan_id)
+
+    def take(self, plan_id: str) -> Optional[BulkPlan]:
+        """Removes and returns a plan, so it can only be executed once."""
+        with self.lock:
+            self.prune()
+            return self.plans.pop(plan_id, None)
+
+# shared by the routes that plan and the route that executes
+default_plan_store = PlanStore()
@@ -1,17 +1,18 @@
 import os
 import time
-import math
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+import transport as tp
 
 load_dotenv()
 
 class Slacker:
-    def __init__(self, token: str = None):
+    def __init__(self, token: str = None, retry: tp.RetryPolicy = None):
         self.token = token
         if not self.token: raise ValueError("NO TOKEN PROVIDED")
         self.client = WebClient(token=self.token)
+        self.retry = retry or tp.default_retry_policy
 
     def get_user_id(self, email: str) -> str:
         try:
@@ -59,25 +60,28 @@ class Slacker:
             return None
 
     def invite_users_to_channel(self, channel_id: str, user_ids: list, retry_count: int = 0):
-        MAX_RETRIES = 5
-        try:
-            response = self.client.conversations_invite(
-                channel=channel_id,
-                users=user_ids  # Can be a list or comma-separated string
-            )
-        except SlackApiError as e:
-            if e.response['error'] == 'already_in_channel':
-                print(f"Some users are already in the channel ID {channel_id}.")
-            elif e.response['error'] == 'user_not_found':
-                print("One or more users not found.")
-            elif e.response['error'] == 'rate_limited' and retry_count < MAX_RETRIES:
-                retry_after = int(e.response.headers.get('Retry-After', 1))
-                backoff_time = retry_after * math.pow(2, retry_count)
-                print(f"Rate limited. Retrying after {backoff_time} seconds.")
-                time.sleep(backoff_time)
-                self.invite_users_to_channel(channel_id, user_ids, retry_count + 1)
-            else:
-                print(f"Failed to invite users to channel ID {channel_id}: {e.response['error']}")
+        # rate limits are retried by the shared retry policy (Retry-After, else capped backoff with jitter)
+        while True:
+            try:
+                response = self.client.conversations_invite(
+                    channel=channel_id,
+                    users=user_ids  # Can be a list or comma-separated string
+                )
+                return
+            except SlackApiError as e:
+                if e.response['error'] == 'already_in_channel':
+                    print(f"Some users are already in the channel ID {channel_id}.")
+                elif e.response['error'] == 'user_not_found':
+                    print("One or more users not found.")
+                elif e.response['error'] == 'rate_limited' and retry_count < self.retry.retries:
+                    backoff_time = self.retry.delay(retry_count, e.response.headers.get('Retry-After'))
+                    print(f"Rate limited. Retrying after {backoff_time:.1f} seconds.")
+                    time.sleep(backoff_time)
+                    retry_count += 1
+                    continue
+                else:
+                    print(f"Failed to invite users to channel ID {channel_id}: {e.response['error']}")
+                return
 
     def create_channels_and_add_users(self, channels_dict: dict, is_private: bool = False) -> list:
         """
@@ -0,0 +1,701 @@
+# =========================================== imports =============================================
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, Optional
+import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dotenv import load_dotenv
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', 20))
+GITHUB_TIMEOUT = float(os.getenv('GITHUB_TIMEOUT', 10))
+GITHUB_ETAG_CACHE_SIZE = int(os.getenv('GITHUB_ETAG_CACHE_SIZE', 2048))
+GITHUB_MAX_RPS = float(os.getenv('GITHUB_MAX_RPS', 20))
+GITHUB_RATE_BURST = int(os.getenv('GITHUB_RATE_BURST', 50))
+GITHUB_RATE_LOW_WATER = float(os.getenv('GITHUB_RATE_LOW_WATER', 0.2))
+GITHUB_RATE_MAX_WAIT = float(os.getenv('GITHUB_RATE_MAX_WAIT', 3600))
+GITHUB_RATE_RETRIES = int(os.getenv('GITHUB_RATE_RETRIES', 3))
+GITHUB_RETRIES = int(os.getenv('GITHUB_RETRIES', 3))
+GITHUB_RETRY_BASE = float(os.getenv('GITHUB_RETRY_BASE', 0.5))
+GITHUB_RETRY_CAP = float(os.getenv('GITHUB_RETRY_CAP', 8))
+GITHUB_WRITES_PER_SECOND = float(os.getenv('GITHUB_WRITES_PER_SECOND', 0))
+GITHUB_WRITE_BURST = int(os.getenv('GITHUB_WRITE_BURST', 20))
+GITHUB_WRITE_THROTTLED_RATE = float(os.getenv('GITHUB_WRITE_THROTTLED_RATE', 1))
+GITHUB_WRITE_BACKOFF = float(os.getenv('GITHUB_WRITE_BACKOFF', 60))
+GITHUB_WRITE_MAX_BACKOFF = float(os.getenv('GITHUB_WRITE_MAX_BACKOFF', 900))
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_PER_PAGE = 100
+
+# ============================================ transport ============================================
+
+class CountingAdapter(HTTPAdapter):
+    """An HTTPAdapter that counts every socket it opens, including reconnects of dropped connections."""
+
+    def __init__(self, *args, **kwargs):
+        self.opened = 0
+        self.lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        def opened():
+            with adapter.lock: adapter.opened += 1
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self): opened() ; super().connect()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self): opened() ; super().connect()
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool): ConnectionCls = CountingHTTPConnection
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool): ConnectionCls = CountingHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+class ETagCache:
+    """
+    A bounded LRU cache of GET responses keyed by URL, query and token, for conditional requests.
+
+    A cached entry's ETag is sent as If-None-Match; when GitHub answers 304 Not Modified the cached
+    response is served instead. 304s do not count against the primary rate limit.
+    """
+
+    def __init__(self, size: int = GITHUB_ETAG_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def key(self, url: str, params: Optional[dict], headers: Optional[dict]) -> tuple:
+        return url, tuple(sorted((params or {}).items())), (headers or {}).get('Authorization')
+
+    def prepare(self, key: tuple, headers: Optional[dict]) -> tuple[Optional[dict], Optional[object]]:
+        """
+        Adds If-None-Match to the request headers when there is a cached entry for the key.
+
+        Args:
+            key (tuple): The cache key of the request.
+            headers (Optional[dict]): The request headers.
+        Returns:
+            tuple[Optional[dict], Optional[object]]: The headers to send, and the cached response they validate (None
+            on a miss). Hand the response to resolve(), the entry may be evicted while the request is in flight.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return headers, None
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return {**(headers or {}), 'If-None-Match': entry[0]}, entry[1]
+
+    def resolve(self, key: tuple, response, cached=None):
+        """
+        Stores a fresh 200 response with an ETag, or swaps a 304 for the cached response.
+
+        Args:
+            key (tuple): The cache key of the request.
+            response: The response from the server.
+            cached: The cached response returned by prepare() for the request.
+        Returns: The response to hand back to the caller.
+        """
+
+        with self.lock:
+            if response.status_code == 304 and cached is not None:
+                self.not_modified += 1
+                # an entry evicted while the request was in flight was just revalidated, keep it
+                if key not in self.entries: self.store(key, cached.headers.get('ETag'), cached)
+                return cached
+            etag = response.headers.get('ETag')
+            if response.status_code == 200 and etag: self.store(key, etag, response)
+        return response
+
+    def store(self, key: tuple, etag: str, response):
+        self.entries[key] = (etag, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock: self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+class RateLimiter:
+    """
+    A token-bucket scheduler for GitHub requests, driven by the rate-limit headers on every response.
+
+    Each resource (core REST, graphql) has its own bucket. While plenty of budget remains, calls are
+    paced at GITHUB_MAX_RPS with bursts of GITHUB_RATE_BURST. Once X-RateLimit-Remaining drops below
+    GITHUB_RATE_LOW_WATER of the limit, the refill rate shrinks so the remaining budget is spread
+    evenly until X-RateLimit-Reset. When the budget is gone, or GitHub sends Retry-After, every caller
+    pauses until the window reopens and the rate-limited request is sent again.
+    A GITHUB_MAX_RPS of 0 (or less) means no pacing: calls are only held back by a low budget or a pause.
+    """
+
+    def __init__(self, max_rps: float = GITHUB_MAX_RPS, burst: int = GITHUB_RATE_BURST, low_water: float = GITHUB_RATE_LOW_WATER,
+                 max_wait: float = GITHUB_RATE_MAX_WAIT, retries: int = GITHUB_RATE_RETRIES):
+        # None paces nothing, a rate of 0 would never refill the bucket
+        self.max_rps = max_rps if max_rps > 0 else None
+        self.burst = burst
+        self.low_water = low_water
+        self.max_wait = max_wait
+        self.retries = retries
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.throttled = 0
+        self.paused = 0.0
+
+    def resource(self, url: str) -> str:
+        return 'graphql' if url.rstrip('/').endswith('/graphql') else 'core'
+
+    def bucket(self, resource: str) -> dict:
+        if resource not in self.buckets:
+            self.buckets[resource] = {
+                "tokens": float(self.burst), "rate": self.max_rps, "updated": time.time(),
+                "limit": None, "remaining": None, "reset": None, "paused_until": 0.0,
+            }
+        return self.buckets[resource]
+
+    def reserve(self, url: str) -> float:
+        """
+        Takes a token for a request and returns how long the caller must wait before sending it.
+
+        Args: url (str): The URL about to be requested.
+        Returns: float: The number of seconds to sleep before sending the request.
+        """
+
+        with self.lock:
+            now = time.time()
+            bucket = self.bucket(self.resource(url))
+            start = max(now, bucket["paused_until"])
+            if bucket["rate"] is not None:
+                bucket["tokens"] = min(self.burst, bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+                bucket["updated"] = now
+                bucket["tokens"] -= 1
+                start = max(now + max(-bucket["tokens"], 0) / bucket["rate"], start)
+            wait = start - now
+            if wait > 0:
+                self.throttled += 1
+                self.paused += wait
+            return wait
+
+    def observe(self, url: str, response, attempt: int = 0) -> bool:
+        """
+        Updates the bucket from a response's rate-limit headers.
+
+        Args:
+            url (str): The URL that was requested.
+            response: The response from the server.
+            attempt (int): How many times this request has already been re-sent after a rate limit.
+        Returns: bool: True if the request was rate limited and should be sent again once the pause is over.
+        """
+
+        headers = response.headers
+        with self.lock:
+            now = time.time()
+            bucket = self.bucket(headers.get('X-RateLimit-Resource') or self.resource(url))
+            if headers.get('X-RateLimit-Limit'): bucket["limit"] = int(headers['X-RateLimit-Limit'])
+            if headers.get('X-RateLimit-Remaining'): bucket["remaining"] = int(headers['X-RateLimit-Remaining'])
+            if headers.get('X-RateLimit-Reset'): bucket["reset"] = float(headers['X-RateLimit-Reset'])
+
+            # spread whatever is left of the budget over the rest of the window once it runs low
+            bucket["rate"] = self.max_rps
+            if bucket["remaining"] is not None and bucket["reset"] and bucket["limit"]:
+                window = max(bucket["reset"] - now, 1.0)
+                if bucket["remaining"] < bucket["limit"] * self.low_water:
+                    bucket["rate"] = max(min(self.max_rps or float('inf'), bucket["remaining"] / window), 1.0 / window)
+
+            if response.status_code not in (403, 429): return False
+
+            wait = None
+            if headers.get('Retry-After'):
+                wait = float(headers['Retry-After'])
+            elif headers.get('X-RateLimit-Remaining') == '0' and bucket["reset"]:
+                wait = max(bucket["reset"] - now, 0) + 1
+            if wait is None or wait > self.max_wait or attempt >= self.retries: return False
+
+            print(f"Rate limited on {url}, pausing {wait:.0f}s before resuming")
+            bucket["paused_until"] = max(bucket["paused_until"], now + wait)
+            return True
+
+    def estimate(self, calls: int, resource: str = 'core') -> dict:
+        """
+        Estimates how long `calls` requests would take at the current pace and whether they fit in the remaining budget.
+
+        Args:
+            calls (int): The number of requests.
+            resource (str): The rate-limit resource they count against.
+        Returns: dict: The remaining budget and reset time (None until GitHub has reported them), whether the calls fit
+            (None if unknown), and the seconds the bucket would pace them over.
+        """
+
+        with self.lock:
+            now = time.time()
+            bucket = self.bucket(resource)
+            seconds = max(bucket["paused_until"] - now, 0)
+            if bucket["rate"] is not None:
+                tokens = min(self.burst, bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+                seconds += max(calls - tokens, 0) / bucket["rate"]
+            remaining, limit, reset = bucket["remaining"], bucket["limit"], bucket["reset"]
+
+        fits = None if remaining is None else calls <= remaining
+        if fits is False and reset and limit:
+            # whatever does not fit waits for the window to reopen, once per window it overflows
+            windows = (calls - remaining - 1) // limit
+            seconds = max(seconds, reset - now + windows * 3600)
+        return {"remaining": remaining, "limit": limit, "reset": reset, "fits": fits, "seconds": round(seconds, 1)}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "throttled": self.throttled,
+                "paused_seconds": round(self.paused, 3),
+                "resources": {
+                    name: {key: bucket[key] for key in ("limit", "remaining", "reset", "rate", "paused_until")}
+                    for name, bucket in self.buckets.items()
+                },
+            }
+
+# one budget per token, shared by the sync and async transports
+default_rate_limiter = RateLimiter()
+
+class WriteQueue:
+    """
+    Paces mutating requests (collaborator PUTs, invitation PATCH / DELETE, ...) to stay clear of GitHub's secondary rate limits.
+
+    Writes draw from a token bucket of GITHUB_WRITE_BURST tokens. By default (GITHUB_WRITES_PER_SECOND=0) the bucket is not
+    metered, so writes go out as fast as the callers send them. A 403 / 429 whose body mentions the secondary rate limit
+    pauses all writes for Retry-After (or GITHUB_WRITE_BACKOFF seconds, doubling on every consecutive hit up to
+    GITHUB_WRITE_MAX_BACKOFF), drains the bucket and meters it at GITHUB_WRITE_THROTTLED_RATE, halved on every further hit.
+    The rate recovers as writes succeed, and the throttle lifts after a bucketful of them at the base throttled rate. The
+    limited write is sent again after the pause. With GITHUB_WRITES_PER_SECOND set, the bucket is always metered.
+    """
+
+    METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+    MARKERS = ('secondary rate limit', 'abuse detection')
+
+    def __init__(self, per_second: float = GITHUB_WRITES_PER_SECOND, burst: int = GITHUB_WRITE_BURST,
+                 throttled_rate: float = GITHUB_WRITE_THROTTLED_RATE, backoff: float = GITHUB_WRITE_BACKOFF,
+                 max_backoff: float = GITHUB_WRITE_MAX_BACKOFF, retries: int = GITHUB_RATE_RETRIES):
+        self.per_second = per_second
+        self.burst = max(burst, 1)
+        self.throttled_rate = throttled_rate
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = retries
+        self.lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.paused_until = 0.0
+        self.throttled = False
+        self.penalty = 1.0
+        self.streak = 0
+        self.calm = 0
+        self.writes = 0
+        self.secondary_limits = 0
+        self.waited = 0.0
+
+    def applies(self, method: str, idempotent: Optional[bool] = None) -> bool:
+        """True for mutating calls; a POST marked idempotent (e.g. a GraphQL query) is a read."""
+        return method.upper() in self.METHODS and not (method.upper() == 'POST' and idempotent)
+
+    def rate(self) -> float:
+        """The writes per second the bucket refills at, 0 while it is not metered."""
+        base = self.throttled_rate if self.throttled else 0.0
+        if self.per_second > 0: base = min(base, self.per_second) if base else self.per_second
+        return base / self.penalty
+
+    def refill(self, now: float) -> float:
+        rate = self.rate()
+        self.tokens = float(self.burst) if rate <= 0 else min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return rate
+
+    def reserve(self) -> float:
+        """Takes a write token and returns how long the caller must wait for it."""
+        with self.lock:
+            now = time.time()
+            rate = self.refill(now)
+            start = max(now, self.paused_until)
+            if rate > 0:
+                self.tokens -= 1
+                start = max(start, now + max(-self.tokens, 0) / rate)
+            self.writes += 1
+            self.waited += start - now
+            return start - now
+
+    def estimate(self, calls: int) -> float:
+        """The seconds `calls` writes would be paced over at the current rate (0 while the bucket is not metered)."""
+        with self.lock:
+            now = time.time()
+            rate = self.refill(now)
+            seconds = max(self.paused_until - now, 0)
+            return seconds + (max(calls - self.tokens, 0) / rate if rate > 0 else 0)
+
+    def is_secondary_limit(self, response) -> bool:
+        if response.status_code not in (403, 429): return False
+        try: body = response.text.lower()
+        except Exception: return False
+        return any(marker in body for marker in self.MARKERS)
+
+    def observe(self, response, attempt: int = 0) -> bool:
+        """
+        Adapts the write rate to a response.
+
+        Args:
+            response: The response to a write.
+            attempt (int): How many times this write has already been re-sent after a secondary limit.
+        Returns: bool: True if the write hit a secondary limit and should be sent again (after reserve()).
+        """
+
+        with self.lock:
+            now = time.time()
+            if not self.is_secondary_limit(response):
+                self.streak = 0
+                if self.throttled:
+                    self.refill(now)
+                    self.calm += 1
+                    self.penalty = max(1.0, self.penalty * 0.95)
+                    # a bucketful of writes in a row at the throttled rate without a limit lifts the throttle
+                    if self.penalty == 1.0 and self.calm >= self.burst: self.throttled = False
+                return False
+
+            self.refill(now)
+            self.secondary_limits += 1
+            self.streak += 1
+            self.calm = 0
+            self.penalty = min(self.penalty * 2, 64.0) if self.throttled else 1.0
+            self.throttled = True
+            self.tokens = 0.0
+            retry_after = response.headers.get('Retry-After')
+            wait = float(retry_after) if retry_after else min(self.backoff * 2 ** (self.streak - 1), self.max_backoff)
+            self.paused_until = max(self.paused_until, now + wait)
+            print(f"Secondary rate limit hit, pausing writes for {wait:.0f}s, then {self.rate():.2f} writes / s")
+            return attempt < self.retries
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "writes": self.writes,
+                "secondary_limits": self.secondary_limits,
+                "throttled": self.throttled,
+                "per_second": round(self.rate(), 3) or None,
+                "waited_seconds": round(self.waited, 3),
+            }
+
+# one queue per token, shared by the sync and async transports
+default_write_queue = WriteQueue()
+
+class RetryPolicy:
+    """
+    Decides whether a call that failed transiently is sent again, and how long to wait first.
+
+    Connection errors, timeouts and 500 / 502 / 503 / 504 responses are retried up to `retries` times, waiting a random
+    time between 0 and min(cap, base * 2^attempt) (capped exponential backoff with full jitter), or Retry-After when the
+    server sends one. Only idempotent methods are retried: GET, HEAD, OPTIONS, and the PUT / DELETE calls GitHub uses to set
+    a collaborator's permission or withdraw an invitation, which leave the same state however often they are sent.
+    PATCH and POST are only retried when the caller marks the call idempotent (e.g. a read-only GraphQL query).
+    Rate limits (403 / 429) are not handled here; the RateLimiter pauses and re-sends those.
+    """
+
+    IDEMPOTENT = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+    STATUSES = frozenset({500, 502, 503, 504})
+    ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError)
+
+    def __init__(self, retries: int = GITHUB_RETRIES, base: float = GITHUB_RETRY_BASE, cap: float = GITHUB_RETRY_CAP):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.lock = threading.Lock()
+        self.retried = 0
+        self.gave_up = 0
+
+    def should_retry(self, method: str, attempt: int, response=None, error: Optional[Exception] = None,
+                     idempotent: Optional[bool] = None) -> bool:
+        """
+        Args:
+            method (str): The HTTP method of the call.
+            attempt (int): How many times the call has already been retried.
+            response: The response, if one arrived.
+            error (Optional[Exception]): The exception, if the call raised.
+            idempotent (Optional[bool]): Overrides whether the call is safe to send twice.
+        Returns: bool: True if the call should be sent again after delay(attempt).
+        """
+
+        transient = isinstance(error, self.ERRORS) if error is not None else response.status_code in self.STATUSES
+        if not transient: return False
+        if not (idempotent if idempotent is not None else method.upper() in self.IDEMPOTENT): return False
+        with self.lock:
+            if attempt >= self.retries:
+                self.gave_up += 1
+                return False
+            self.retried += 1
+        return True
+
+    def delay(self, attempt: int, retry_after=None) -> float:
+        """Returns how long to wait before retry number attempt + 1, honouring Retry-After when given."""
+        if retry_after:
+            try: return float(retry_after)
+            except ValueError: pass
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def stats(self) -> dict:
+        return {"retries": self.retried, "gave_up": self.gave_up}
+
+# shared by the transports and the Slack client
+default_retry_policy = RetryPolicy()
+
+def note_retries(message, response) -> str:
+    """Appends how often a call had to be retried to a result message, so transient failures show up in the results."""
+    retries = getattr(response, 'retries', 0)
+    return f"{message} (after {retries} {'retry' if retries == 1 else 'retries'})" if retries and isinstance(message, str) else message
+
+class Transport:
+    """
+    A pooled, keep-alive HTTP transport shared by the GitHub clients.
+
+    Every request goes through one requests.Session, so connections to api.github.com are
+    kept open and reused instead of paying a fresh TCP + TLS handshake on every call.
+    """
+
+    def __init__(self, pool_size: int = GITHUB_POOL_SIZE, timeout: float = GITHUB_TIMEOUT, cache: Optional[ETagCache] = None,
+                 limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None, writes: Optional[WriteQueue] = None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache or ETagCache()
+        self.limiter = limiter or default_rate_limiter
+        self.retry = retry or default_retry_policy
+        self.writes = writes or default_write_queue
+        self.session = requests.Session()
+        self.adapter = CountingAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Sends a request over the pooled session, paced by the rate limiter and retried by the retry policy.
+        GET requests are made conditional on the ETag cache; writes go through the write queue.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The full URL to request.
+            timeout (Optional[float]): Per-call timeout in seconds, defaults to the transport timeout.
+            idempotent (Optional[bool]): Whether the call may be retried, by default decided from the method.
+        Returns: requests.Response: The response from the server, with the number of retries it took in response.retries.
+        Raises: requests.exceptions.RequestException: If the call still fails once retries are exhausted.
+        """
+
+        key, cached = None, None
+        if method == 'GET' and self.cache.size:
+            key = self.cache.key(url, kwargs.get('params'), kwargs.get('headers'))
+            kwargs['headers'], cached = self.cache.prepare(key, kwargs.get('headers'))
+
+        write = self.writes.applies(method, idempotent)
+        attempt, retries = 0, 0
+        while True:
+            time.sleep(self.limiter.reserve(url))
+            if write: time.sleep(self.writes.reserve())
+            with self.lock: self.requests += 1
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if not self.retry.should_retry(method, retries, error=e, idempotent=idempotent):
+                    if retries: e.args = (f"{e} (after {retries} retries)",)
+                    raise
+                time.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            if write and self.writes.observe(response, attempt):
+                attempt += 1
+            elif self.limiter.observe(url, response, attempt):
+                attempt += 1
+            elif self.retry.should_retry(method, retries, response=response, idempotent=idempotent):
+                time.sleep(self.retry.delay(retries, response.headers.get('Retry-After')))
+                retries += 1
+            else:
+                break
+
+        response.retries = retries
+        return self.cache.resolve(key, response, cached) if key else response
+
+    def get(self, url: str, **kwargs) -> requests.Response: return self.request('GET', url, **kwargs)
+    def post(self, url: str, **kwargs) -> requests.Response: return self.request('POST', url, **kwargs)
+    def put(self, url: str, **kwargs) -> requests.Response: return self.request('PUT', url, **kwargs)
+    def patch(self, url: str, **kwargs) -> requests.Response: return self.request('PATCH', url, **kwargs)
+    def delete(self, url: str, **kwargs) -> requests.Response: return self.request('DELETE', url, **kwargs)
+
+    def paginate(self, url: str, params: Optional[dict] = None, **kwargs) -> Iterator[requests.Response]:
+        """
+        Yields every page of a paginated GitHub listing, following the Link: rel="next" header.
+
+        The first request asks for per_page=100; the next links already carry the query string.
+        Iteration stops after the first non-200 page, which is still yielded so callers can handle it.
+
+        Args:
+            url (str): The full URL of the listing.
+            params (Optional[dict]): Extra query parameters for the first request.
+        Returns: Iterator[requests.Response]: The response for each page, as it arrives.
+        """
+
+        params = {'per_page': GITHUB_PER_PAGE, **(params or {})}
+        while url:
+            response = self.get(url, params=params, **kwargs)
+            yield response
+            if response.status_code != 200: return
+            url = response.links.get('next', {}).get('url')
+            params = None
+
+    def stats(self) -> dict:
+        """
+        Returns counters for the requests sent and the connections opened vs. reused.
+
+        Returns: dict: The pool size, timeout, and request / connection counters.
+        """
+
+        opened = self.adapter.opened
+        return {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "requests": self.requests,
+            "connections_opened": opened,
+            "connections_reused": max(self.requests - opened, 0),
+            "cache": self.cache.stats(),
+            "rate_limit": self.limiter.stats(),
+            "retry": self.retry.stats(),
+            "writes": self.writes.stats(),
+        }
+
+# shared by every client that is not handed its own transport
+default_transport = Transport()
+
+class AsyncTransport:
+    """
+    The asyncio counterpart of Transport, backed by a pooled httpx.AsyncClient.
+
+    The client is created lazily so that it binds to the event loop that first uses it.
+    """
+
+    def __init__(self, pool_size: int = GITHUB_POOL_SIZE, timeout: float = GITHUB_TIMEOUT, cache: Optional[ETagCache] = None,
+                 limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None, writes: Optional[WriteQueue] = None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache or ETagCache()
+        self.limiter = limiter or default_rate_limiter
+        self.retry = retry or default_retry_policy
+        self.writes = writes or default_write_queue
+        self.client = None
+        self.requests = 0
+
+    def session(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=self.timeout,
+            )
+        return self.client
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Sends a request over the pooled async client, paced by the rate limiter and retried by the retry policy.
+        GET requests are made conditional on the ETag cache; writes go through the write queue.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The full URL to request.
+            timeout (Optional[float]): Per-call timeout in seconds, defaults to the transport timeout.
+            idempotent (Optional[bool]): Whether the call may be retried, by default decided from the method.
+        Returns: httpx.Response: The response from the server, with the number of retries it took in response.retries.
+        Raises: httpx.TransportError: If the call still fails once retries are exhausted.
+        """
+
+        key, cached = None, None
+        if method == 'GET' and self.cache.size:
+            key = self.cache.key(url, kwargs.get('params'), kwargs.get('headers'))
+            kwargs['headers'], cached = self.cache.prepare(key, kwargs.get('headers'))
+
+        write = self.writes.applies(method, idempotent)
+        attempt, retries = 0, 0
+        while True:
+            await asyncio.sleep(self.limiter.reserve(url))
+            if write: await asyncio.sleep(self.writes.reserve())
+            self.requests += 1
+            try:
+                response = await self.session().request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except httpx.TransportError as e:
+                if not self.retry.should_retry(method, retries, error=e, idempotent=idempotent):
+                    if retries: e.args = (f"{e} (after {retries} retries)",)
+                    raise
+                await asyncio.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            if write and self.writes.observe(response, attempt):
+                attempt += 1
+            elif self.limiter.observe(url, response, attempt):
+                attempt += 1
+            elif self.retry.should_retry(method, retries, response=response, idempotent=idempotent):
+                await asyncio.sleep(self.retry.delay(retries, response.headers.get('Retry-After')))
+                retries += 1
+            else:
+                break
+
+        response.retries = retries
+        return self.cache.resolve(key, response, cached) if key else response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response: return await self.request('GET', url, **kwargs)
+    async def post(self, url: str, **kwargs) -> httpx.Response: return await self.request('POST', url, **kwargs)
+    async def put(self, url: str, **kwargs) -> httpx.Response: return await self.request('PUT', url, **kwargs)
+    async def patch(self, url: str, **kwargs) -> httpx.Response: return await self.request('PATCH', url, **kwargs)
+    async def delete(self, url: str, **kwargs) -> httpx.Response: return await self.request('DELETE', url, **kwargs)
+
+    async def paginate(self, url: str, params: Optional[dict] = None, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Async version of Transport.paginate."""
+
+        params = {'per_page': GITHUB_PER_PAGE, **(params or {})}
+        while url:
+            response = await self.get(url, params=params, **kwargs)
+            yield response
+            if response.status_code != 200: return
+            url = response.links.get('next', {}).get('url')
+            params = None
+
+    async def close(self):
+        if self.client is not None: await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "requests": self.requests,
+            "cache": self.cache.stats(),
+            "retry": self.retry.stats(),
+            "writes": self.writes.stats(),
+        }
+
+default_async_transport = AsyncTransport()
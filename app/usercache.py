@@ -0,0 +1,146 @@
+# =========================================== imports =============================================
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+# =========================================== app setup ===========================================
+
+# env
+load_dotenv()
+GITHUB_USER_CACHE_SIZE = int(os.getenv('GITHUB_USER_CACHE_SIZE', 10000))
+GITHUB_USER_CACHE_TTL = float(os.getenv('GITHUB_USER_CACHE_TTL', 86400))
+GITHUB_USER_CACHE_NEGATIVE_TTL = float(os.getenv('GITHUB_USER_CACHE_NEGATIVE_TTL', 300))
+
+# =========================================== user cache ==========================================
+
+class PostgresUserStore:
+    """
+    Persists user cache entries in the 'github_user' table so they survive restarts and are shared between workers.
+    The table is created by migrate.py like the rest of the schema.
+
+    Takes the same connect function database.py uses, so it goes through whatever connection handling that module has.
+    """
+
+    def __init__(self, connect: Callable):
+        self.connect = connect
+
+    def load(self, login: str) -> Optional[tuple[bool, Optional[int], float]]:
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT found, github_id, expires_at FROM github_user WHERE login = %s", (login,))
+            row = cursor.fetchone()
+            conn.commit()
+            return tuple(row) if row else None
+        finally:
+            cursor.close()
+            conn.close()
+
+    def save(self, login: str, exists: bool, github_id: Optional[int], expires_at: float):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO github_user (login, found, github_id, expires_at) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (login) DO UPDATE SET found = EXCLUDED.found, github_id = EXCLUDED.github_id, expires_at = EXCLUDED.expires_at",
+                (login, exists, github_id, expires_at)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+class UserCache:
+    """
+    A bounded LRU cache of GitHub login -> (exists, user id) with a TTL on every entry.
+
+    Logins that exist are kept for GITHUB_USER_CACHE_TTL; logins that do not (typos) are kept for the much shorter
+    GITHUB_USER_CACHE_NEGATIVE_TTL so a fixed typo or a newly created account is picked up quickly.
+    With a store attached, misses fall through to it and every new answer is written through to it.
+    """
+
+    def __init__(self, size: int = GITHUB_USER_CACHE_SIZE, ttl: float = GITHUB_USER_CACHE_TTL,
+                 negative_ttl: float = GITHUB_USER_CACHE_NEGATIVE_TTL, store: Optional[PostgresUserStore] = None):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.store = store
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+
+    def get(self, login: str) -> Optional[tuple[bool, Optional[int]]]:
+        """
+        Looks up a login.
+
+        Args: login (str): The GitHub username.
+        Returns: Optional[tuple[bool, Optional[int]]]: (exists, user id) if a live entry is cached, None otherwise.
+        """
+
+        key = login.lower()
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            if entry: del self.entries[key]
+
+        if self.store is not None:
+            try:
+                row = self.store.load(key)
+                if row and row[2] > now:
+                    with self.lock:
+                        self.remember(key, row)
+                        self.store_hits += 1
+                    return row[0], row[1]
+            except Exception as e:
+                print(f"User cache store lookup failed: {e}")
+
+        with self.lock: self.misses += 1
+        return None
+
+    def put(self, login: str, exists: bool, user_id: Optional[int] = None):
+        """
+        Caches whether a login exists.
+
+        Args:
+            login (str): The GitHub username.
+            exists (bool): Whether the user exists.
+            user_id (Optional[int]): The GitHub user id, if known.
+        """
+
+        key = login.lower()
+        entry = (exists, user_id, time.time() + (self.ttl if exists else self.negative_ttl))
+        with self.lock: self.remember(key, entry)
+
+        if self.store is not None:
+            try: self.store.save(key, *entry)
+            except Exception as e: print(f"User cache store write failed: {e}")
+
+    def remember(self, key: str, entry: tuple):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock: self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "persistent": self.store is not None,
+        }
+
+# shared by every client that is not handed its own cache
+default_user_cache = UserCache()
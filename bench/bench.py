@@ -0,0 +1,198 @@
+# =========================================== imports =============================================
+
+import io
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import contextlib
+from fakegithub import FakeGithub
+
+# =========================================== setup ===============================================
+
+parser = argparse.ArgumentParser(description="Times the app's bulk GitHub flows against a local fake GitHub.")
+parser.add_argument('--sizes', default='10,100,1000', help="comma-separated repository counts")
+parser.add_argument('--flows', default=None, help="comma-separated flow names, all by default")
+parser.add_argument('--latency', type=float, default=0.02, help="seconds added to every fake GitHub response")
+parser.add_argument('--jitter', type=float, default=0.0)
+parser.add_argument('--collaborators', type=int, default=5)
+parser.add_argument('--invitations', type=int, default=2)
+parser.add_argument('--max-rps', type=float, default=1e6, help="client-side rate limit, GITHUB_MAX_RPS in production")
+parser.add_argument('--writes-per-second', type=float, default=0, help="client-side write pace, 0 for none")
+parser.add_argument('--postgres', action='store_true',
+                    help="also run db.process() and /set_projects against POSTGRES_URL; writes bench rows, use a scratch database")
+parser.add_argument('--json', action='store_true', help="print the results as JSON")
+parser.add_argument('--verbose', action='store_true', help="show the app's own output")
+args = parser.parse_args()
+
+# the app reads its configuration at import time, so the fake has to be up (and the env set) before importing it
+os.environ.setdefault('USERNAME', 'bench')
+os.environ.setdefault('PASSWORD', 'bench')
+fake = FakeGithub('BU-Spark', args.latency, args.jitter, rate_limit=10 ** 9, graphql_rate_limit=10 ** 9)
+os.environ['GITHUB_API_URL'] = fake.start()
+os.environ['GITHUB_MAX_RPS'] = str(args.max_rps)
+os.environ['GITHUB_RATE_BURST'] = str(int(min(args.max_rps, 10 ** 6)))
+os.environ['GITHUB_WRITES_PER_SECOND'] = str(args.writes_per_second)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+import transport as tp
+import usercache as uc
+import github as git
+import github_rest as gh
+import github_async as agit
+import main
+
+PAT, ORG = 'bench-token', 'BU-Spark'
+
+# =========================================== flows ===============================================
+
+def automation() -> gh.Automation:
+    """A fresh client with its own connection pool, ETag cache and user cache, so runs don't warm each other up."""
+    return gh.Automation(PAT, ORG, tp.Transport(), uc.UserCache())
+
+def set_projects_body(size: int, action: str = 'pull') -> dict:
+    projects = [[repo.name, f"https://github.com/{ORG}/{repo.name}"] for repo in list(fake.repos.values())[:size]]
+    return {"projects": projects, "action": action, "snapshot": True}
+
+def auth() -> dict:
+    credentials = base64.b64encode(f"{os.getenv('USERNAME')}:{os.getenv('PASSWORD')}".encode()).decode()
+    return {"Authorization": f"Basic {credentials}"}
+
+def flow_snapshot(size: int):
+    return list(automation().graphql.snapshot(refresh=True).repos.values())
+
+def flow_repo_listing(size: int):
+    return automation().get_organization_repository_records(refresh=True)
+
+def flow_reinvite_serial(size: int):
+    return automation().reinvite_all_expired_users_to_repos(bulk=False)
+
+def flow_reinvite_bulk(size: int):
+    return automation().reinvite_all_expired_users_to_repos(bulk=True)
+
+def flow_read_only_serial(size: int):
+    return automation().set_all_repos_users_read_only(bulk=False)
+
+def flow_read_only_bulk(size: int):
+    return automation().set_all_repos_users_read_only(bulk=True)
+
+def flow_git_set_projects(size: int):
+    from fastapi.testclient import TestClient
+    main.automation = automation()
+    main.agithub = agit.AsyncGithub(PAT, ORG, tp.AsyncTransport(), uc.UserCache())
+    with TestClient(main.app) as client:
+        response = client.post('/git/set_projects', json=set_projects_body(size), headers=auth())
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+def seed_database(size: int):
+    """Loads one bench project per repository, with two existing collaborators and one new user each, through ucsv + ingest."""
+
+    import pandas as pd
+    import database as db
+
+    conn = db.connect()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO semester (semester_name, year, semester) VALUES ('bench', 2077, 'Fall') ON CONFLICT DO NOTHING")
+    cursor.execute("DELETE FROM user_project WHERE project_id IN (SELECT project_id FROM project WHERE project_name LIKE 'bench-%%')")
+    cursor.execute("DELETE FROM project WHERE project_name LIKE 'bench-%%'")
+    cursor.execute("DELETE FROM csv WHERE project LIKE 'bench-%%'")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    rows = []
+    for index, repo in enumerate(list(fake.repos.values())[:size]):
+        for login in list(repo.collaborators)[:2] + [f'bench-new-{index}']:
+            rows.append({
+                'Semester': 'bench', 'Course': 'bench', 'Project': f'bench-{repo.name}', 'Organization': 'bench',
+                'Team': 'bench', 'Role': 'student', 'First Name': login, 'Last Name': 'bench', 'Full Name': login,
+                'Email': f'{login}@bench.invalid', 'BUID': f'bench-{login}', 'Github Username': login,
+                'Project Github Url': f'https://github.com/{ORG}/{repo.name}',
+            })
+    db.ucsv(pd.DataFrame(rows))
+    db.ingest()
+
+def flow_process(size: int):
+    import database as db
+    db.github = git.Github(PAT, ORG, tp.Transport(), uc.UserCache())
+    return db.process()
+
+def flow_set_projects(size: int):
+    from fastapi.testclient import TestClient
+    main.agithub = agit.AsyncGithub(PAT, ORG, tp.AsyncTransport(), uc.UserCache())
+    body = set_projects_body(size, 'push')
+    body["projects"] = [[f"bench-{name}", url] for name, url in body["projects"]]
+    with TestClient(main.app) as client:
+        response = client.post('/set_projects', json=body, headers=auth())
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+FLOWS = {
+    'snapshot': flow_snapshot,
+    'repo_listing': flow_repo_listing,
+    'reinvite_serial': flow_reinvite_serial,
+    'reinvite_bulk': flow_reinvite_bulk,
+    'read_only_serial': flow_read_only_serial,
+    'read_only_bulk': flow_read_only_bulk,
+    'git_set_projects': flow_git_set_projects,
+}
+DATABASE_FLOWS = {
+    'process': flow_process,
+    'set_projects': flow_set_projects,
+}
+
+# =========================================== run =================================================
+
+def run(name: str, size: int) -> dict:
+    """Runs one flow against a freshly seeded fake organization and measures it."""
+
+    fake.seed(size, args.collaborators, args.invitations)
+    if name in DATABASE_FLOWS:
+        with contextlib.redirect_stdout(io.StringIO()): seed_database(size)
+        fake.reset_stats()
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    error = None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output): results = FLOWS.get(name, DATABASE_FLOWS.get(name))(size)
+    except Exception as e:
+        results, error = [], str(e)
+    seconds = time.perf_counter() - start
+
+    stats = fake.stats()
+    return {
+        "flow": name,
+        "repos": size,
+        "seconds": round(seconds, 3),
+        "requests": stats["requests"],
+        "not_modified": stats["not_modified"],
+        "requests_per_repo": round(stats["requests"] / max(size, 1), 2),
+        "results": len(results) if hasattr(results, '__len__') else None,
+        "routes": stats["routes"],
+        "error": error,
+    }
+
+def report(rows: list[dict]):
+    print(f"{'flow':<18} {'repos':>6} {'seconds':>9} {'requests':>9} {'per repo':>9} {'304s':>6} {'results':>8}")
+    for row in rows:
+        print(f"{row['flow']:<18} {row['repos']:>6} {row['seconds']:>9.3f} {row['requests']:>9} {row['requests_per_repo']:>9} "
+              f"{row['not_modified']:>6} {str(row['results']):>8}" + (f"  ERROR: {row['error']}" if row['error'] else ""))
+
+if __name__ == "__main__":
+    flows = list(FLOWS) + (list(DATABASE_FLOWS) if args.postgres else [])
+    if args.flows: flows = [flow for flow in args.flows.split(',') if flow in FLOWS or flow in DATABASE_FLOWS]
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    rows = []
+    for size in sizes:
+        for name in flows:
+            rows.append(run(name, size))
+            if not args.json: print(f"{name} @ {size} repos: {rows[-1]['seconds']}s, {rows[-1]['requests']} requests", file=sys.stderr)
+
+    if args.json: print(json.dumps(rows, indent=2))
+    else: report(rows)
+    fake.stop()
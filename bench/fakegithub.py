@@ -0,0 +1,417 @@
+# =========================================== imports =============================================
+
+import re
+import json
+import time
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+# =========================================== const ===============================================
+
+# what each permission looks like in the different corners of the API
+ROLE_NAMES = {'pull': 'read', 'triage': 'triage', 'push': 'write', 'maintain': 'maintain', 'admin': 'admin'}
+LEGACY_PERMISSIONS = {'pull': 'read', 'triage': 'read', 'push': 'write', 'maintain': 'write', 'admin': 'admin'}
+GRAPHQL_PERMISSIONS = {'pull': 'READ', 'triage': 'TRIAGE', 'push': 'WRITE', 'maintain': 'MAINTAIN', 'admin': 'ADMIN'}
+PERMISSION_ALIASES = {'read': 'pull', 'write': 'push'}
+
+# =========================================== state ===============================================
+
+@dataclass
+class FakeInvitation:
+    id: int
+    login: str
+    permission: str = 'push'
+    expired: bool = False
+
+@dataclass
+class FakeRepo:
+    id: int
+    name: str
+    collaborators: dict[str, str] = field(default_factory=dict)
+    invitations: dict[int, FakeInvitation] = field(default_factory=dict)
+    pushed_at: str = '2024-01-01T00:00:00Z'
+
+    def invitation(self, login: str) -> Optional[FakeInvitation]:
+        return next((invitation for invitation in self.invitations.values() if invitation.login.lower() == login.lower()), None)
+
+    def collaborator(self, login: str) -> Optional[str]:
+        return next((login_ for login_ in self.collaborators if login_.lower() == login.lower()), None)
+
+# =========================================== server ==============================================
+
+class FakeGithub:
+    """
+    A local stand-in for the parts of the GitHub REST and GraphQL APIs this app uses, for benchmarks and experiments.
+
+    Models one organization with repositories, collaborators and invitations, and answers like GitHub does: Link-header
+    pagination, ETags with 304 Not Modified (which, like on GitHub, do not count against the rate limit), X-RateLimit-*
+    headers with a 403 once the budget of a window is spent, and optionally a secondary limit on writes per second.
+    Every request waits `latency` seconds (plus up to `jitter`) before it is answered.
+
+    Run it in-process with start(), or standalone with `python bench/fakegithub.py --repos 100`, and point the app at it
+    with GITHUB_API_URL.
+    """
+
+    def __init__(self, org: str = 'BU-Spark', latency: float = 0.0, jitter: float = 0.0, rate_limit: int = 5000,
+                 graphql_rate_limit: int = 5000, window: float = 3600, writes_per_second: Optional[float] = None):
+        self.org = org
+        self.latency = latency
+        self.jitter = jitter
+        self.limits = {'core': rate_limit, 'graphql': graphql_rate_limit}
+        self.window = window
+        self.writes_per_second = writes_per_second
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.url = None
+        self.seed(0)
+        self.app = self.build_app()
+
+    # =========================================== data ============================================
+
+    def seed(self, repos: int, collaborators: int = 5, invitations: int = 2, expired: float = 0.5, seed: int = 0):
+        """
+        Replaces the organization's repositories with generated ones, and resets the request counters and rate limits.
+
+        Users are drawn from a pool of 4x as many logins as there are repositories, so most of them are on several repos.
+        Any login exists on the fake GitHub except those starting with 'ghost-'.
+
+        Args:
+            repos (int): How many repositories.
+            collaborators (int): Collaborators per repository, alternating push and pull.
+            invitations (int): Pending invitations per repository.
+            expired (float): The share of invitations that have expired.
+            seed (int): The random seed, so runs are comparable.
+        """
+
+        rng = random.Random(seed)
+        pool = [f'user-{index}' for index in range(max(repos * 4, collaborators + invitations))]
+        with self.lock:
+            self.repos: dict[str, FakeRepo] = {}
+            invitation_id = 1
+            for index in range(repos):
+                repo = FakeRepo(index + 1, f'repo-{index:05d}')
+                logins = rng.sample(pool, collaborators + invitations)
+                for position, login in enumerate(logins[:collaborators]):
+                    repo.collaborators[login] = 'push' if position % 2 == 0 else 'pull'
+                for login in logins[collaborators:]:
+                    repo.invitations[invitation_id] = FakeInvitation(invitation_id, login, 'push', rng.random() < expired)
+                    invitation_id += 1
+                self.repos[repo.name.lower()] = repo
+            self.next_id = invitation_id
+            self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.routes: dict[str, int] = {}
+        self.budgets = {resource: {"remaining": limit, "reset": time.time() + self.window} for resource, limit in self.limits.items()}
+        self.last_writes: list[float] = []
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+                "rate_limit_remaining": {resource: budget["remaining"] for resource, budget in self.budgets.items()},
+            }
+
+    def repo(self, owner: str, name: str) -> Optional[FakeRepo]:
+        if owner.lower() != self.org.lower(): return None
+        return self.repos.get(name.lower())
+
+    def exists(self, login: str) -> bool: return not login.lower().startswith('ghost-')
+
+    def repo_json(self, repo: FakeRepo) -> dict:
+        return {
+            "id": repo.id,
+            "name": repo.name,
+            "full_name": f"{self.org}/{repo.name}",
+            "ssh_url": f"git@github.com:{self.org}/{repo.name}.git",
+            "html_url": f"https://github.com/{self.org}/{repo.name}",
+            "pushed_at": repo.pushed_at,
+        }
+
+    def collaborator_json(self, login: str, permission: str) -> dict:
+        return {
+            "login": login,
+            "role_name": ROLE_NAMES.get(permission, permission),
+            "permissions": {name: rank <= list(ROLE_NAMES).index(permission) for rank, name in enumerate(ROLE_NAMES)},
+        }
+
+    def invitation_json(self, repo: FakeRepo, invitation: FakeInvitation) -> dict:
+        return {
+            "id": invitation.id,
+            "invitee": {"login": invitation.login},
+            "repository": self.repo_json(repo),
+            "permissions": ROLE_NAMES.get(invitation.permission, invitation.permission),
+            "expired": invitation.expired,
+        }
+
+    # =========================================== http ============================================
+
+    def paged(self, request: Request, items: list) -> tuple[list, dict]:
+        """Slices a listing by ?per_page / ?page and builds the Link header pointing at the next and last pages."""
+
+        per_page = min(int(request.query_params.get('per_page', 30)), 100)
+        page = int(request.query_params.get('page', 1))
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        headers = {}
+        if page < last:
+            base = str(request.url).split('?')[0]
+            headers['Link'] = f'<{base}?per_page={per_page}&page={page + 1}>; rel="next", <{base}?per_page={per_page}&page={last}>; rel="last"'
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def charge(self, resource: str, headers: dict) -> bool:
+        """Takes a request out of the rate-limit budget and sets the X-RateLimit-* headers; False once it is spent."""
+
+        budget = self.budgets[resource]
+        now = time.time()
+        if now >= budget["reset"]:
+            budget["remaining"], budget["reset"] = self.limits[resource], now + self.window
+        allowed = budget["remaining"] > 0
+        if allowed: budget["remaining"] -= 1
+        headers.update({
+            'X-RateLimit-Limit': str(self.limits[resource]),
+            'X-RateLimit-Remaining': str(budget["remaining"]),
+            'X-RateLimit-Used': str(self.limits[resource] - budget["remaining"]),
+            'X-RateLimit-Reset': str(int(budget["reset"])),
+            'X-RateLimit-Resource': resource,
+        })
+        return allowed
+
+    def secondary_limited(self) -> bool:
+        if not self.writes_per_second: return False
+        now = time.time()
+        self.last_writes = [at for at in self.last_writes if now - at < 1] + [now]
+        return len(self.last_writes) > self.writes_per_second
+
+    def build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.api_route('/{path:path}', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+        async def handle(path: str, request: Request):
+            if self.latency or self.jitter: await asyncio.sleep(self.latency + random.random() * self.jitter)
+            body = await request.body()
+            payload = json.loads(body) if body else {}
+            method = request.method
+            resource = 'graphql' if path == 'graphql' else 'core'
+
+            with self.lock:
+                self.requests += 1
+                route = self.route_name(method, path.split('/'))
+                self.routes[route] = self.routes.get(route, 0) + 1
+
+                headers = {}
+                if not self.charge(resource, headers):
+                    return self.respond(403, {"message": "API rate limit exceeded"}, headers)
+                if method != 'GET' and resource == 'core' and self.secondary_limited():
+                    return self.respond(403, {"message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."},
+                                        {**headers, 'Retry-After': '1'})
+
+                status, data, extra = self.route(method, path.split('/'), payload, request)
+                headers.update(extra)
+
+                if method == 'GET' and status == 200:
+                    etag = f'W/"{hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()}"'
+                    headers['ETag'] = etag
+                    if request.headers.get('If-None-Match') == etag:
+                        # conditional requests that come back 304 are free on GitHub
+                        self.budgets[resource]["remaining"] += 1
+                        headers['X-RateLimit-Remaining'] = str(self.budgets[resource]["remaining"])
+                        self.not_modified += 1
+                        return Response(status_code=304, headers=headers)
+                return self.respond(status, data, headers)
+
+        return app
+
+    def route_name(self, method: str, parts: list[str]) -> str:
+        """Groups requests by endpoint for the stats, e.g. 'PUT /repos/*/*/collaborators/*'."""
+
+        if parts[0] == 'repos': parts = ['repos', '*', '*'] + parts[3:4] + ['*'] * len(parts[4:5]) + parts[5:]
+        elif parts[0] == 'users': parts = ['users', '*']
+        elif parts[0] == 'orgs': parts = ['orgs', '*'] + parts[2:]
+        return f"{method} /{'/'.join(parts)}"
+
+    def respond(self, status: int, data, headers: dict) -> Response:
+        if data is None: return Response(status_code=status, headers=headers)
+        return Response(json.dumps(data), status_code=status, headers=headers, media_type='application/json')
+
+    def route(self, method: str, parts: list[str], payload: dict, request: Request) -> tuple[int, object, dict]:
+        """Answers one request against the in-memory organization: (status, JSON body or None, extra headers)."""
+
+        not_found = (404, {"message": "Not Found"}, {})
+
+        if parts == ['graphql'] and method == 'POST':
+            return 200, self.graphql(payload.get('query', ''), payload.get('variables') or {}), {}
+
+        if len(parts) == 2 and parts[0] == 'users' and method == 'GET':
+            if not self.exists(parts[1]): return not_found
+            return 200, {"login": parts[1], "id": abs(hash(parts[1])) % 10 ** 8}, {}
+
+        if len(parts) == 3 and parts[0] == 'orgs' and parts[2] == 'repos' and method == 'GET':
+            if parts[1].lower() != self.org.lower(): return not_found
+            items, headers = self.paged(request, [self.repo_json(repo) for repo in self.repos.values()])
+            return 200, items, headers
+
+        if len(parts) < 3 or parts[0] != 'repos': return not_found
+        repo = self.repo(parts[1], parts[2])
+        if repo is None: return not_found
+        rest = parts[3:]
+
+        if not rest and method == 'GET':
+            return 200, self.repo_json(repo), {}
+
+        if rest == ['collaborators'] and method == 'GET':
+            items, headers = self.paged(request, [self.collaborator_json(login, permission) for login, permission in repo.collaborators.items()])
+            return 200, items, headers
+
+        if rest == ['invitations'] and method == 'GET':
+            items, headers = self.paged(request, [self.invitation_json(repo, invitation) for invitation in repo.invitations.values()])
+            return 200, items, headers
+
+        if len(rest) == 3 and rest[0] == 'collaborators' and rest[2] == 'permission' and method == 'GET':
+            login = repo.collaborator(rest[1])
+            if login is None: return 404, {"message": f"{rest[1]} is not a collaborator"}, {}
+            permission = repo.collaborators[login]
+            return 200, {"permission": LEGACY_PERMISSIONS[permission], "role_name": ROLE_NAMES[permission], "user": {"login": login}}, {}
+
+        if len(rest) == 2 and rest[0] == 'collaborators':
+            login = repo.collaborator(rest[1])
+            if method == 'GET': return (204 if login else 404), None, {}
+            if method == 'DELETE':
+                if login: del repo.collaborators[login]
+                return 204, None, {}
+            if method == 'PUT':
+                if not self.exists(rest[1]): return 404, {"message": "Not Found"}, {}
+                permission = PERMISSION_ALIASES.get(payload.get('permission', 'push'), payload.get('permission', 'push'))
+                if permission not in ROLE_NAMES: return 422, {"message": f"Invalid permission {permission}"}, {}
+                if login:
+                    repo.collaborators[login] = permission
+                    return 204, None, {}
+                invitation = repo.invitation(rest[1])
+                if invitation is None:
+                    invitation = FakeInvitation(self.next_id, rest[1], permission)
+                    repo.invitations[invitation.id] = invitation
+                    self.next_id += 1
+                invitation.permission, invitation.expired = permission, False
+                return 201, self.invitation_json(repo, invitation), {}
+
+        if len(rest) == 2 and rest[0] == 'invitations' and rest[1].isdigit():
+            invitation = repo.invitations.get(int(rest[1]))
+            if invitation is None: return not_found
+            if method == 'DELETE':
+                del repo.invitations[invitation.id]
+                return 204, None, {}
+            if method == 'PATCH':
+                permission = payload.get('permissions', invitation.permission)
+                invitation.permission = PERMISSION_ALIASES.get(permission, permission)
+                return 200, self.invitation_json(repo, invitation), {}
+
+        return not_found
+
+    def graphql(self, query: str, variables: dict) -> dict:
+        """Answers the organization repositories query, the per-repository collaborators query and aliased user lookups."""
+
+        def collaborators(repo: FakeRepo, first: int, after: Optional[str]) -> dict:
+            edges = [{"permission": GRAPHQL_PERMISSIONS[permission], "node": {"login": login}} for login, permission in repo.collaborators.items()]
+            start = int(after or 0)
+            return {
+                "pageInfo": {"hasNextPage": start + first < len(edges), "endCursor": str(start + first)},
+                "edges": edges[start:start + first],
+            }
+
+        if 'organization(' in query:
+            if variables.get('org', '').lower() != self.org.lower():
+                return {"data": {"organization": None}, "errors": [{"message": f"Could not resolve to an Organization with the login of '{variables.get('org')}'."}]}
+            repos = list(self.repos.values())
+            start, first = int(variables.get('after') or 0), int(variables.get('repos', 50))
+            nodes = [{
+                "name": repo.name,
+                "sshUrl": f"git@github.com:{self.org}/{repo.name}.git",
+                "url": f"https://github.com/{self.org}/{repo.name}",
+                "databaseId": repo.id,
+                "pushedAt": repo.pushed_at,
+                "collaborators": collaborators(repo, int(variables.get('collaborators', 100)), None),
+            } for repo in repos[start:start + first]]
+            page = {"hasNextPage": start + first < len(repos), "endCursor": str(start + first)}
+            return {"data": {"organization": {"repositories": {"pageInfo": page, "nodes": nodes}}}}
+
+        if 'repository(' in query:
+            repo = self.repo(variables.get('org', ''), variables.get('name', ''))
+            if repo is None: return {"data": {"repository": None}, "errors": [{"message": "Could not resolve to a Repository"}]}
+            return {"data": {"repository": {"collaborators": collaborators(repo, 100, variables.get('after'))}}}
+
+        lookups = re.findall(r'(\w+)\s*:\s*user\(login:\s*\$(\w+)\)', query)
+        if lookups:
+            data, errors = {}, []
+            for alias, variable in lookups:
+                login = variables.get(variable, '')
+                if self.exists(login): data[alias] = {"login": login, "databaseId": abs(hash(login)) % 10 ** 8}
+                else:
+                    data[alias] = None
+                    errors.append({"type": "NOT_FOUND", "path": [alias], "message": f"Could not resolve to a User with the login of '{login}'."})
+            return {"data": data, "errors": errors} if errors else {"data": data}
+
+        return {"errors": [{"message": "Unsupported query"}]}
+
+    # =========================================== lifecycle =======================================
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """
+        Serves the fake API on a background thread.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port, or 0 for any free one.
+        Returns: str: The base URL to use as GITHUB_API_URL.
+        """
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # otherwise small responses sit out the client's delayed ACK, ~40ms each
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind((host, port))
+        self.server = uvicorn.Server(uvicorn.Config(self.app, log_level='warning', access_log=False))
+        self.thread = threading.Thread(target=self.server.run, kwargs={'sockets': [sock]}, name='fakegithub', daemon=True)
+        self.thread.start()
+        while not self.server.started: time.sleep(0.01)
+        self.url = f'http://{host}:{sock.getsockname()[1]}'
+        return self.url
+
+    def stop(self):
+        if self.server is None: return
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+        self.server = None
+
+# =========================================== main ================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake GitHub API for local runs of the app.")
+    parser.add_argument('--org', default='BU-Spark')
+    parser.add_argument('--repos', type=int, default=100)
+    parser.add_argument('--collaborators', type=int, default=5)
+    parser.add_argument('--invitations', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--rate-limit', type=int, default=5000, help="requests per window before 403s")
+    parser.add_argument('--writes-per-second', type=float, default=None, help="secondary limit on writes")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    fake = FakeGithub(args.org, args.latency, rate_limit=args.rate_limit, writes_per_second=args.writes_per_second)
+    fake.seed(args.repos, args.collaborators, args.invitations)
+    print(f"Fake GitHub for {args.org} with {args.repos} repos on {fake.start(port=args.port)}, Ctrl+C to stop")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -32,12 +32,19 @@ UPSTREAM = 'origin'
 # =====================================================================================================================
 
 
+# usernames already checked this run, errors are not remembered so they get retried
+checked_users = {}
+
+
 def check_valid_user(username: str) -> tuple[bool, bool]:
     """
     checks if a user exists on github takes a username and returns T/F, ERROR/NO_ERROR
+    results are memoized in checked_users
     :param username: the username to check
     :return: a tuple of two booleans, the first is if the user exists, the second is if there was an error
     """
+    if username.lower() in checked_users:
+        return checked_users[username.lower()]
     try:
         r = requests.get(
             f"https://api.github.com/users/{username}", 
@@ -46,14 +53,50 @@ def check_valid_user(username: str) -> tuple[bool, bool]:
 
         if r.status_code == 200:
             print(f'Verified user {username} exists')
-            return True, NO_ERROR
+            checked_users[username.lower()] = (True, NO_ERROR)
         else:
             print(f'Failed to verify user {username} exists with status code {r.status_code}')
-            return False, NO_ERROR
+            if r.status_code != 404:
+                return False, NO_ERROR
+            checked_users[username.lower()] = (False, NO_ERROR)
+        return checked_users[username.lower()]
     except:
         return False, ERROR
 
 
+def check_valid_users(usernames: list[str]) -> None:
+    """
+    checks up to 100 users per request through the graphql api, using one aliased user(login:) lookup per username
+    results are memoized in checked_users, so check_valid_user answers them without another request
+    if a batch fails, its users are left to check_valid_user
+    :param usernames: the usernames to check
+    """
+    usernames = [u for u in dict.fromkeys(usernames) if u.lower() not in checked_users]
+    for start in range(0, len(usernames), 100):
+        batch = usernames[start:start + 100]
+        query = 'query(' + ', '.join(f'$l{i}: String!' for i in range(len(batch))) + ') {' + \
+            ' '.join(f'u{i}: user(login: $l{i}) {{ login }}' for i in range(len(batch))) + '}'
+        try:
+            r = requests.post(
+                "https://api.github.com/graphql",
+                headers={'Authorization': f"Bearer {GITHUB_PAT}"},
+                json={'query': query, 'variables': {f'l{i}': u for i, u in enumerate(batch)}}
+            )
+            body = r.json()
+            if r.status_code != 200 or not body.get('data'):
+                print(f'Failed to verify users in bulk with status code {r.status_code}')
+                continue
+            missing = {e['path'][0] for e in body.get('errors', []) if e.get('type') == 'NOT_FOUND' and e.get('path')}
+            for i, username in enumerate(batch):
+                if body['data'].get(f'u{i}'):
+                    checked_users[username.lower()] = (True, NO_ERROR)
+                elif f'u{i}' in missing:
+                    checked_users[username.lower()] = (False, NO_ERROR)
+            print(f'Verified {len(batch)} users in one request')
+        except:
+            print('Failed to verify users in bulk: ' + traceback.format_exc())
+
+
 def add_collaborators(path, collaborators):
     try:
         # open the file with 'r' to first read the current collaborators
@@ -65,13 +108,18 @@ def add_collaborators(path, collaborators):
                 map(lambda x: x.replace('\n', ''), exisiting_collaborators))
             
             valid, invalid, errors = [], [], []
+            new_collaborators = list(filter(lambda x: x not in exisiting_collaborators, collaborators))
+
+            # check every new user in as few requests as possible, check_valid_user then answers from memory
+            check_valid_users(new_collaborators)
 
             # first check if the user is already in the file
-            for user in list(filter(lambda x: x not in exisiting_collaborators,collaborators)):
+            for user in new_collaborators:
                 # then check if the user exists through the github api, and filter them based on the result
-                if check_valid_user(user)[0]:
+                exists, error = check_valid_user(user)
+                if exists:
                     valid.append(user)
-                elif check_valid_user(user)[1] == ERROR:
+                elif error == ERROR:
                     errors.append(user)
                 else:
                     invalid.append(user)